@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Caption readers for SRT, WebVTT, Whisper JSON and plain text transcripts
+Detects the format from the first bytes and streams cues in one pass
+"""
+
+import re
+import sys
+import json
+import html
+import argparse
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from srt_parser import Cue, format_chapter_time, read_cues
+
+SNIFF_BYTES = 4096
+JSON_CHUNK_CHARS = 64 * 1024
+JSON_KEY_OVERLAP = 64   # keeps a "segments" key split across chunks findable
+UTF8_BOM = b'\xef\xbb\xbf'
+
+SRT_SNIFF = re.compile(rb'\d{2}:\d{2}:\d{2},\d{3}[ \t]*-->')
+# WebVTT timings use a dot before the milliseconds and may leave out the hours
+VTT_TIMING_LINE = re.compile(
+    r'(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})[ \t]+-->[ \t]+(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})'
+)
+VTT_TAG = re.compile(r'<[^>]*>')
+VTT_SKIPPED_BLOCKS = ('NOTE', 'STYLE', 'REGION')
+JSON_SEGMENTS_KEY = re.compile(r'"segments"\s*:\s*\[')
+# A segment list ([{...) or an object whose first key is quoted ({"...); a
+# plain transcript opening with "[Music]" or "{laughs}" is neither
+JSON_SNIFF = re.compile(rb'\s*(?:\[\s*[{\]]|\{\s*")')
+
+
+class CaptionReader(NamedTuple):
+    """A registered transcript format"""
+    name: str
+    sniff: Callable[[bytes], bool]
+    read: Callable[[str], Iterator[Cue]]
+    is_timed: bool
+
+
+# Sniffed in registration order; plain text is the catch-all and goes last
+READERS: Dict[str, CaptionReader] = {}
+
+
+def register_reader(name: str, sniff: Callable[[bytes], bool], is_timed: bool = True):
+    """Decorator adding a cue reader to the registry"""
+    def register(read: Callable[[str], Iterator[Cue]]) -> Callable[[str], Iterator[Cue]]:
+        READERS[name] = CaptionReader(name, sniff, read, is_timed)
+        return read
+    return register
+
+
+def detect_format(transcript_path: str) -> str:
+    """Name of the first registered reader whose sniff accepts the file head"""
+    with open(transcript_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(UTF8_BOM):
+        head = head[len(UTF8_BOM):]
+    for reader in READERS.values():
+        if reader.sniff(head):
+            return reader.name
+    raise ValueError(f"Unrecognised transcript format: {transcript_path}")
+
+
+def get_reader(transcript_path: str, format_name: Optional[str] = None) -> CaptionReader:
+    """Reader for a file, either named explicitly or sniffed"""
+    name = format_name or detect_format(transcript_path)
+    if name not in READERS:
+        raise ValueError(f"Unknown transcript format '{name}' (choose from {', '.join(READERS)})")
+    return READERS[name]
+
+
+def read_captions(transcript_path: str, format_name: Optional[str] = None) -> Iterator[Cue]:
+    """Stream cues from any registered transcript format"""
+    return get_reader(transcript_path, format_name).read(transcript_path)
+
+
+def _vtt_ms(hours: Optional[str], minutes: str, seconds: str, millis: str) -> int:
+    """Convert WebVTT time fields to milliseconds"""
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def _vtt_text(line: str) -> str:
+    """Drop voice, class and karaoke timestamp tags and decode entities"""
+    if '<' in line:
+        line = ' '.join(VTT_TAG.sub('', line).split())
+    if '&' in line:
+        line = html.unescape(line)
+    return line.strip()
+
+
+def iter_vtt_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    """Yield cues from WebVTT lines.
+
+    Blocks are separated by blank lines. The header and NOTE, STYLE and
+    REGION blocks are skipped; a numeric cue identifier becomes the index.
+    """
+    state = 'header'
+    index = 0
+    identifier = None
+    start_ms = end_ms = None
+    text_lines = []
+
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            if state == 'cue':
+                yield Cue(index, start_ms, end_ms, ' '.join(text_lines))
+            state, identifier = 'between', None
+            continue
+        if state in ('header', 'skip'):
+            continue
+        if state == 'cue':
+            text = _vtt_text(line)
+            if text:
+                text_lines.append(text)
+            continue
+
+        match = VTT_TIMING_LINE.match(line) if '-->' in line else None
+        if match:
+            fields = match.groups()
+            index = int(identifier) if identifier and identifier.isdigit() else index + 1
+            start_ms, end_ms = _vtt_ms(*fields[:4]), _vtt_ms(*fields[4:])
+            text_lines = []
+            state = 'cue'
+        elif identifier is None and line.split(None, 1)[0] in VTT_SKIPPED_BLOCKS:
+            state = 'skip'
+        else:
+            identifier = line
+
+    if state == 'cue':
+        yield Cue(index, start_ms, end_ms, ' '.join(text_lines))
+
+
+def _iter_json_array(f, decoder: json.JSONDecoder) -> Iterator[object]:
+    """Yield the elements of the first segment array in a JSON stream.
+
+    The file is read in chunks and each element is decoded as soon as it
+    is complete, so only one segment needs to be buffered at a time.
+    """
+    buffer = f.read(JSON_CHUNK_CHARS)
+    is_eof = not buffer
+    start = len(buffer) - len(buffer.lstrip())
+    if buffer[start:start + 1] == '[':
+        pos = start + 1
+    else:
+        # Whisper output: {"text": "...", "segments": [...], ...}
+        match = JSON_SEGMENTS_KEY.search(buffer)
+        while match is None and not is_eof:
+            chunk = f.read(JSON_CHUNK_CHARS)
+            is_eof = not chunk
+            buffer = buffer[-JSON_KEY_OVERLAP:] + chunk
+            match = JSON_SEGMENTS_KEY.search(buffer)
+        if match is None:
+            raise ValueError("JSON transcript has no segments array")
+        pos = match.end()
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if buffer[pos:pos + 1] == ']':
+            return
+        try:
+            element, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if is_eof:
+                raise
+            chunk = f.read(JSON_CHUNK_CHARS)
+            is_eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield element
+
+
+def _sniff_vtt(head: bytes) -> bool:
+    return head.startswith(b'WEBVTT')
+
+
+def _sniff_json(head: bytes) -> bool:
+    return JSON_SNIFF.match(head) is not None
+
+
+def _sniff_srt(head: bytes) -> bool:
+    return SRT_SNIFF.search(head) is not None
+
+
+def _sniff_text(head: bytes) -> bool:
+    return True
+
+
+@register_reader('vtt', _sniff_vtt)
+def read_vtt_cues(transcript_path: str) -> Iterator[Cue]:
+    """Stream cues from a WebVTT file"""
+    with open(transcript_path, 'r', encoding='utf-8-sig') as f:
+        yield from iter_vtt_cues(f)
+
+
+@register_reader('json', _sniff_json)
+def read_json_cues(transcript_path: str) -> Iterator[Cue]:
+    """Stream cues from Whisper-style JSON segments (start/end in seconds)"""
+    decoder = json.JSONDecoder()
+    with open(transcript_path, 'r', encoding='utf-8-sig') as f:
+        for position, segment in enumerate(_iter_json_array(f, decoder)):
+            yield Cue(
+                position + 1,
+                round(float(segment.get('start', 0)) * 1000),
+                round(float(segment.get('end', 0)) * 1000),
+                ' '.join(filter(None, map(str.strip, str(segment.get('text', '')).splitlines()))),
+            )
+
+
+register_reader('srt', _sniff_srt)(read_cues)
+
+
+@register_reader('txt', _sniff_text, is_timed=False)
+def read_text_cues(transcript_path: str) -> Iterator[Cue]:
+    """Stream each non-empty line of a plain transcript as an untimed cue"""
+    with open(transcript_path, 'r', encoding='utf-8-sig') as f:
+        position = 0
+        for raw in f:
+            line = raw.strip()
+            if line:
+                position += 1
+                yield Cue(position, 0, 0, line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read cues from any supported transcript format')
+    parser.add_argument('transcript_path', help='Path to .srt, .vtt, .txt or Whisper .json transcript')
+    parser.add_argument('--format', choices=list(READERS), help='Skip detection and use this reader')
+
+    args = parser.parse_args()
+
+    try:
+        reader = get_reader(args.transcript_path, args.format)
+        print(f"Format: {reader.name}")
+        for cue in reader.read(args.transcript_path):
+            timing = format_chapter_time(cue.start_ms) if reader.is_timed else '-'
+            print(f"{cue.index}\t{timing}\t{cue.text}")
+    except FileNotFoundError:
+        print(f"Error: File {args.transcript_path} not found")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
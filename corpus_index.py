@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Corpus index of past transcripts for BM25 keyword and phrase extraction
+Stores term document frequencies in SQLite and updates them incrementally
+"""
+
+import math
+import sys
+import zlib
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from caption_readers import read_captions
+from keyword_matcher import WORD
+
+MAX_NGRAM = 3
+MIN_WORD_CHARS = 3
+MIN_PHRASE_COUNT = 2      # phrases said once are mostly chance word pairs
+SQL_BATCH = 500            # stays under SQLite's bound-parameter limit
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_TOP_TERMS = 20
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing don down during each few for from further get
+got had has have having he her here hers him his how i if in into is it its itself just know let
+like me more most my no nor not now of off on once only or other our ours out over own really
+right same she should so some such than that the their theirs them then there these they thing
+things this those through to too um uh under until up us very was we were what when where which
+while who whom why will with would yeah you your yours gonna want going okay oh well actually see
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE NOT NULL,
+    digest TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    terms BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_digest ON documents (digest);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _numpy():
+    """NumPy if installed, imported on first use so plain runs skip the cost"""
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def term_counts(text: str, max_ngram: int = MAX_NGRAM) -> Tuple[Counter, int]:
+    """Counts of candidate terms and phrases, plus the document length in words.
+
+    Unigrams drop stopwords, numbers and very short words; phrases may
+    contain stopwords inside ("edge of the network") but not at either end,
+    and stutters that start and end on the same word are skipped.
+    """
+    words = WORD.findall(text.lower())
+    is_edge = [word not in STOPWORDS and not word.isdigit() for word in words]
+    counts = Counter(
+        word for word, ok in zip(words, is_edge) if ok and len(word) >= MIN_WORD_CHARS
+    )
+    for n in range(2, max_ngram + 1):
+        counts.update(
+            ' '.join(words[i:i + n])
+            for i in range(len(words) - n + 1)
+            if is_edge[i] and is_edge[i + n - 1] and words[i] != words[i + n - 1]
+        )
+    return counts, len(words)
+
+
+def _pack_terms(terms: Iterable[str]) -> bytes:
+    return zlib.compress('\n'.join(sorted(terms)).encode('utf-8'))
+
+
+def _unpack_terms(blob: bytes) -> List[str]:
+    text = zlib.decompress(blob).decode('utf-8')
+    return text.split('\n') if text else []
+
+
+def bm25_scores(tf: Sequence[int], df: Sequence[int], doc_count: int, length: int,
+                average_length: float) -> List[float]:
+    """BM25 weight of each term for one document, vectorized when NumPy is available"""
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / max(average_length, 1.0))
+    np = _numpy()
+    if np is None:
+        return [
+            math.log(1 + (doc_count - d + 0.5) / (d + 0.5)) * t * (BM25_K1 + 1) / (t + norm)
+            for t, d in zip(tf, df)
+        ]
+    tf_array = np.asarray(tf, dtype=np.float64)
+    df_array = np.asarray(df, dtype=np.float64)
+    idf = np.log1p((doc_count - df_array + 0.5) / (df_array + 0.5))
+    return (idf * tf_array * (BM25_K1 + 1) / (tf_array + norm)).tolist()
+
+
+class CorpusIndex:
+    """Document frequencies of words and phrases across past transcripts.
+
+    Each document keeps its compressed term set, so re-adding a changed
+    transcript under the same source first takes its old terms back out.
+    Only create=True makes a new database; otherwise a missing file raises
+    FileNotFoundError instead of leaving an empty corpus behind. A file that
+    is not a usable SQLite database raises ValueError.
+    """
+
+    def __init__(self, path: str, create: bool = False):
+        self.path = path
+        mode = 'rwc' if create else 'rw'
+        try:
+            self._db = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode={mode}", uri=True)
+        except sqlite3.OperationalError as e:
+            raise FileNotFoundError(f"Corpus {path} not found") from e
+        try:
+            self._db.executescript(SCHEMA)
+        except sqlite3.DatabaseError as e:
+            self._db.close()
+            raise ValueError(f"Cannot open corpus {path}: {e}") from e
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self) -> 'CorpusIndex':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self) -> Tuple[int, int, int]:
+        """(documents, total words, distinct terms)"""
+        documents, words = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+        terms, = self._db.execute("SELECT COUNT(*) FROM terms").fetchone()
+        return documents, words, terms
+
+    def add_document(self, source: str, text: str) -> bool:
+        """Add or refresh a transcript; returns False if it was already current"""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        row = self._db.execute("SELECT id, digest, terms FROM documents WHERE source = ?", (source,)).fetchone()
+        if row and row[1] == digest:
+            return False
+
+        counts, length = term_counts(text)
+        with self._db:
+            if row:
+                self._adjust_df(_unpack_terms(row[2]), -1)
+                self._db.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+            self._db.execute(
+                "INSERT INTO documents (source, digest, length, terms) VALUES (?, ?, ?, ?)",
+                (source, digest, length, _pack_terms(counts)))
+            self._adjust_df(counts, 1)
+        return True
+
+    def _adjust_df(self, terms: Iterable[str], delta: int):
+        """Add delta to the document frequency of each term"""
+        if delta > 0:
+            self._db.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?) "
+                "ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                ((term, delta) for term in terms))
+        else:
+            self._db.executemany("UPDATE terms SET df = df + ? WHERE term = ?",
+                                 ((delta, term) for term in terms))
+            self._db.execute("DELETE FROM terms WHERE df <= 0")
+
+    def document_frequencies(self, terms: Sequence[str]) -> Dict[str, int]:
+        """df for each of the given terms that the corpus has seen"""
+        found: Dict[str, int] = {}
+        for start in range(0, len(terms), SQL_BATCH):
+            batch = terms[start:start + SQL_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            found.update(self._db.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({placeholders})", batch))
+        return found
+
+    def top_terms(self, text: str, limit: int = DEFAULT_TOP_TERMS) -> List[Tuple[str, float]]:
+        """Most distinctive words and phrases of a transcript, best first.
+
+        The transcript's own entry is left out of the statistics if it is
+        already in the corpus, and a term is skipped when a higher-ranked
+        phrase already contains it.
+        """
+        counts, length = term_counts(text)
+        if not counts:
+            return []
+        terms = [t for t, c in counts.items() if c >= MIN_PHRASE_COUNT or ' ' not in t]
+        if not terms:
+            return []
+        dfs = self.document_frequencies(terms)
+        doc_count, total_words, _ = self.stats()
+
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        is_indexed = self._db.execute(
+            "SELECT 1 FROM documents WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None
+        if is_indexed:
+            doc_count, total_words = doc_count - 1, total_words - length
+            dfs = {term: df - 1 for term, df in dfs.items()}
+
+        average_length = total_words / doc_count if doc_count else length
+        scores = bm25_scores([counts[t] for t in terms], [dfs.get(t, 0) for t in terms],
+                             doc_count, length, average_length)
+        return _distinct_top(sorted(zip(terms, scores), key=lambda item: (-item[1], item[0])), limit)
+
+
+def _distinct_top(ranked: Iterable[Tuple[str, float]], limit: int) -> List[Tuple[str, float]]:
+    """First terms of a ranking, skipping any contained in a term already chosen"""
+    chosen: List[Tuple[str, float]] = []
+    for term, score in ranked:
+        padded = f" {term} "
+        if any(padded in f" {kept} " for kept, _ in chosen):
+            continue
+        chosen.append((term, score))
+        if len(chosen) == limit:
+            break
+    return chosen
+
+
+def distinctive_terms(text: str, corpus_path: str, limit: int = DEFAULT_TOP_TERMS) -> List[str]:
+    """Top words and phrases of a transcript against a corpus file"""
+    with CorpusIndex(corpus_path) as corpus:
+        return [term for term, _ in corpus.top_terms(text, limit)]
+
+
+def _transcript_text(transcript_path: str) -> Optional[str]:
+    """Clean text of any supported transcript, or None after reporting an error"""
+    try:
+        return ' '.join(cue.text for cue in read_captions(transcript_path) if cue.text)
+    except (OSError, ValueError) as e:
+        print(f"Error reading file {transcript_path}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query a BM25 corpus of past transcripts')
+    parser.add_argument('corpus_path', help='SQLite corpus file (--add creates it if missing)')
+    parser.add_argument('--add', nargs='+', metavar='TRANSCRIPT', help='Add or refresh transcripts')
+    parser.add_argument('--top', metavar='TRANSCRIPT', help='Show the most distinctive terms of a transcript')
+    parser.add_argument('--limit', type=int, default=DEFAULT_TOP_TERMS, help='Number of terms to show')
+
+    args = parser.parse_args()
+
+    try:
+        corpus = CorpusIndex(args.corpus_path, create=bool(args.add))
+    except FileNotFoundError:
+        print(f"Error: Corpus {args.corpus_path} not found (build it with --add)")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    with corpus:
+        for path in args.add or []:
+            text = _transcript_text(path)
+            if text is not None:
+                print(f"{'Added' if corpus.add_document(path, text) else 'Unchanged'}: {path}")
+        if args.top:
+            text = _transcript_text(args.top)
+            if text is None:
+                sys.exit(1)
+            for term, score in corpus.top_terms(text, args.limit):
+                print(f"{score:8.2f}  {term}")
+        documents, words, terms = corpus.stats()
+        print(f"Corpus: {documents} transcripts, {words} words, {terms} terms")
+
+
+if __name__ == "__main__":
+    main()
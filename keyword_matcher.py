@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Word-level Aho-Corasick keyword matcher for transcripts
+Finds every vocabulary term in one pass, on whole-word boundaries only
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import marshal
+import hashlib
+import argparse
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from srt_parser import format_chapter_time
+from transcript import Transcript
+
+# Words as matched: "Node.js" is node + js, "C++" and "C#" keep their suffix
+WORD = re.compile(r"\w+(?:\+\+|#)?")
+
+VOCAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vocab')
+DEFAULT_VOCABULARY = 'cloudflare'
+INDEX_SUFFIX = '.idx'
+INDEX_FORMAT = 1   # bump when the compiled table layout changes
+
+BENCHMARK_TERMS = 5000
+INDEX_BENCHMARK_TERMS = 50000
+BENCHMARK_WORDS = 200000
+
+
+class KeywordHit(NamedTuple):
+    """One keyword occurrence as character offsets into the searched text"""
+    keyword: str
+    start: int
+    end: int
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of a keyword or phrase"""
+    return WORD.findall(text.lower())
+
+
+def _insert(goto: List[Dict[str, int]], out: List[list], words: Sequence[str], keyword_id: int):
+    """Add a term's word path to a dict trie"""
+    state = 0
+    for word in words:
+        next_state = goto[state].get(word)
+        if next_state is None:
+            next_state = len(goto)
+            goto[state][word] = next_state
+            goto.append({})
+            out.append([])
+        state = next_state
+    out[state].append((keyword_id, len(words)))
+
+
+def _failure_links(goto: List[Dict[str, int]], out: List[list]) -> List[int]:
+    """Breadth-first failure links, merging outputs of suffix states"""
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for word, child in goto[state].items():
+            fallback = fail[state]
+            while fallback and word not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[child] = goto[fallback].get(word, 0)
+            out[child] = out[child] + out[fail[child]]
+            queue.append(child)
+    return fail
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over words rather than characters.
+
+    Terms are split into the same words as the text, so a term can only
+    start and end on word boundaries ("Bun" does not match "bundle") and
+    a pass costs a few lookups per word however many terms there are.
+
+    The compiled automaton is flat: words are interned to ids, and each
+    state's transitions and outputs are sorted runs in array('i')
+    columns, indexed by offset arrays (CSR layout). Root transitions,
+    which nearly every lookup starts from, are also kept as a dict. A
+    saved index therefore loads with array.frombytes plus one list of
+    words instead of rebuilding tens of thousands of dicts.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[int, int]]] = [[]]
+
+        seen = set()
+        for keyword in keywords:
+            words = tuple(tokenize(keyword))
+            if words and words not in seen:
+                seen.add(words)
+                _insert(goto, out, words, len(self.keywords))
+                self.keywords.append(keyword.strip())
+        self._freeze(goto, _failure_links(goto, out), out)
+
+    def _freeze(self, goto: List[Dict[str, int]], fail: List[int], out: List[List[Tuple[int, int]]]):
+        """Flatten the dict trie into interned words and CSR arrays"""
+        self._words: List[str] = []
+        word_ids: Dict[str, int] = {}
+        for transitions in goto:
+            for word in transitions:
+                if word not in word_ids:
+                    word_ids[word] = len(self._words)
+                    self._words.append(word)
+
+        self._edge_offsets, self._edge_word, self._edge_target = array('i', [0]), array('i'), array('i')
+        self._out_offsets, self._out_keyword, self._out_words = array('i', [0]), array('i'), array('i')
+        for transitions, outputs in zip(goto, out):
+            for word_id, target in sorted((word_ids[word], target) for word, target in transitions.items()):
+                self._edge_word.append(word_id)
+                self._edge_target.append(target)
+            self._edge_offsets.append(len(self._edge_word))
+            for keyword_id, words in outputs:
+                self._out_keyword.append(keyword_id)
+                self._out_words.append(words)
+            self._out_offsets.append(len(self._out_keyword))
+        self._fail = array('i', fail)
+        self._index_words()
+
+    def _index_words(self):
+        """Lookup dicts derived from the flat tables"""
+        self._word_ids = dict(zip(self._words, range(len(self._words))))
+        root_end = self._edge_offsets[1]
+        self._root = dict(zip(self._edge_word[:root_end], self._edge_target[:root_end]))
+        self._max_words = max(self._out_words, default=1)
+
+    @classmethod
+    def from_tables(cls, tables: tuple) -> 'KeywordMatcher':
+        """Rebuild a matcher from the output of tables()"""
+        matcher = cls.__new__(cls)
+        matcher.keywords, matcher._words, *columns = tables
+        names = ('_edge_offsets', '_edge_word', '_edge_target', '_fail',
+                 '_out_offsets', '_out_keyword', '_out_words')
+        for name, raw in zip(names, columns):
+            column = array('i')
+            column.frombytes(raw)
+            setattr(matcher, name, column)
+        matcher._index_words()
+        return matcher
+
+    @classmethod
+    def from_file(cls, vocab_path: str) -> 'KeywordMatcher':
+        """Compile a vocabulary file: one term per line, '#' starts a comment"""
+        with open(vocab_path, 'r', encoding='utf-8') as f:
+            return cls(read_vocabulary(f))
+
+    def tables(self) -> tuple:
+        """Compiled tables as lists of str and bytes, ready for marshal"""
+        return (self.keywords, self._words,
+                self._edge_offsets.tobytes(), self._edge_word.tobytes(), self._edge_target.tobytes(),
+                self._fail.tobytes(), self._out_offsets.tobytes(), self._out_keyword.tobytes(),
+                self._out_words.tobytes())
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _scan(self, text: str) -> Iterator[tuple]:
+        """Yield (keyword id, start, end) for every match, overlaps included"""
+        word_ids, root = self._word_ids, self._root
+        offsets, edge_word, edge_target, fail = self._edge_offsets, self._edge_word, self._edge_target, self._fail
+        out_offsets, out_keyword, out_words = self._out_offsets, self._out_keyword, self._out_words
+        ring = self._max_words
+        starts = [0] * ring
+        state = 0
+        # Words are lowercased one by one, so offsets stay those of text even
+        # where lowercasing would change its length (e.g. 'İ')
+        for count, match in enumerate(WORD.finditer(text)):
+            word_id = word_ids.get(match.group().lower())
+            if word_id is None:
+                state = 0
+                continue
+            # Follow the word's edge, falling back along failure links to the root
+            while state:
+                lo, hi = offsets[state], offsets[state + 1]
+                i = bisect_left(edge_word, word_id, lo, hi) if lo < hi else hi
+                if i < hi and edge_word[i] == word_id:
+                    state = edge_target[i]
+                    break
+                state = fail[state]
+            else:
+                state = root.get(word_id, 0)
+            if not state:
+                continue
+            starts[count % ring] = match.start()
+            for j in range(out_offsets[state], out_offsets[state + 1]):
+                yield out_keyword[j], starts[(count - out_words[j] + 1) % ring], match.end()
+
+    def finditer(self, text: str) -> Iterator[KeywordHit]:
+        """Every keyword occurrence in text, in order of where it ends"""
+        keywords = self.keywords
+        for keyword_id, start, end in self._scan(text):
+            yield KeywordHit(keywords[keyword_id], start, end)
+
+    def counts(self, text: str) -> Counter:
+        """Occurrences per keyword"""
+        found = Counter(keyword_id for keyword_id, _, _ in self._scan(text))
+        return Counter({self.keywords[keyword_id]: n for keyword_id, n in found.items()})
+
+    def cue_positions(self, transcript) -> Dict[str, List[int]]:
+        """Cue positions in a Transcript where each keyword starts"""
+        positions: Dict[str, List[int]] = {}
+        for keyword_id, start, _ in self._scan(transcript.text):
+            cue = bisect_right(transcript.text_start, start) - 1
+            hits = positions.setdefault(self.keywords[keyword_id], [])
+            if not hits or hits[-1] != cue:
+                hits.append(cue)
+        return positions
+
+
+# vocab path -> ((mtime_ns, size), matcher) for matchers loaded in this process
+_LOADED_VOCABULARIES: Dict[str, Tuple[Tuple[int, int], KeywordMatcher]] = {}
+
+
+def read_vocabulary(lines: Iterable[str]) -> Iterator[str]:
+    """Terms from vocabulary lines, skipping blanks and '#' comments"""
+    for line in lines:
+        term = line.split('#', 1)[0].strip()
+        if term:
+            yield term
+
+
+def resolve_vocabulary(name_or_path: str) -> str:
+    """Path of a vocabulary given as a file path or a name under vocab/"""
+    if os.path.isfile(name_or_path):
+        return name_or_path
+    return os.path.join(VOCAB_DIR, f"{name_or_path}.txt")
+
+
+def index_path(vocab_path: str) -> str:
+    """Compiled index stored next to its vocabulary file"""
+    return os.path.splitext(vocab_path)[0] + INDEX_SUFFIX
+
+
+def _read_index(path: str, digest: str) -> Optional[KeywordMatcher]:
+    """Matcher from a compiled index, or None if it is missing or stale"""
+    try:
+        with open(path, 'rb') as f:
+            if marshal.load(f) != (INDEX_FORMAT, digest):
+                return None
+            return KeywordMatcher.from_tables(marshal.loads(f.read()))
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_index(path: str, digest: str, matcher: KeywordMatcher):
+    """Save compiled tables atomically; an unwritable directory just means no cache"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            marshal.dump((INDEX_FORMAT, digest), f)
+            marshal.dump(matcher.tables(), f)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_vocabulary(name_or_path: str) -> KeywordMatcher:
+    """Matcher for a vocabulary, compiled at most once per content version.
+
+    The index next to the file is keyed by a hash of the vocabulary text,
+    so editing the file triggers one recompile and later runs load the
+    tables with marshal. Within a process the matcher is cached and
+    reloaded only when the file's size or modification time changes.
+    """
+    vocab_path = resolve_vocabulary(name_or_path)
+    stat = os.stat(vocab_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _LOADED_VOCABULARIES.get(vocab_path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with open(vocab_path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    compiled_path = index_path(vocab_path)
+    matcher = _read_index(compiled_path, digest)
+    if matcher is None:
+        matcher = KeywordMatcher(read_vocabulary(content.decode('utf-8').splitlines()))
+        _write_index(compiled_path, digest, matcher)
+    _LOADED_VOCABULARIES[vocab_path] = (version, matcher)
+    return matcher
+
+
+def _substring_counts(keywords: List[str], text: str) -> Dict[str, int]:
+    """Reference scan: one lowercase substring count per keyword"""
+    text_lower = text.lower()
+    return {keyword: text_lower.count(keyword.lower()) for keyword in keywords}
+
+
+def run_benchmark(term_count: int) -> bool:
+    """Compare per-keyword substring scans with the automaton"""
+    rng = random.Random(0)
+    words = [f"w{n}" for n in range(term_count)]
+    keywords = [' '.join(rng.sample(words, rng.choice((1, 1, 2, 3)))) for _ in range(term_count)]
+    text = ' '.join(rng.choice(words) for _ in range(BENCHMARK_WORDS))
+
+    started = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = _substring_counts(keywords, text)
+    substring_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    counts = matcher.counts(text)
+    automaton_time = time.perf_counter() - started
+
+    # Substring counts also hit inside longer words ("w1" in "w12"), so
+    # compare against exact n-gram counts instead
+    tokens = text.split()
+    ngrams = Counter(' '.join(tokens[i:i + n]) for n in (1, 2, 3) for i in range(len(tokens) - n + 1))
+    exact = all(ngrams[keyword] == counts[keyword] for keyword in matcher.keywords)
+    inflated = sum(expected.values()) - sum(counts.values())
+
+    print(f"Vocabulary: {len(matcher)} terms, text: {BENCHMARK_WORDS} words")
+    print(f"  Substring scans: {substring_time * 1000:8.1f} ms ({inflated} extra partial-word hits)")
+    print(f"  Automaton:       {automaton_time * 1000:8.1f} ms (build {build_time * 1000:.1f} ms)")
+    print(f"  Whole-word counts {'match' if exact else 'DIFFER'} for every term")
+    return exact
+
+
+def run_index_benchmark(term_count: int) -> bool:
+    """Time compiling a vocabulary against loading its saved index"""
+    rng = random.Random(0)
+    words = [f"term{n}" for n in range(term_count)]
+    terms = {' '.join(rng.sample(words, rng.choice((1, 1, 2, 3)))) for _ in range(term_count)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        vocab_path = os.path.join(directory, 'benchmark.txt')
+        with open(vocab_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(sorted(terms)) + '\n')
+
+        started = time.perf_counter()
+        compiled = load_vocabulary(vocab_path)
+        compile_time = time.perf_counter() - started
+
+        _LOADED_VOCABULARIES.clear()
+        started = time.perf_counter()
+        loaded = load_vocabulary(vocab_path)
+        load_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cached = load_vocabulary(vocab_path)
+        cached_time = time.perf_counter() - started
+        index_size = os.path.getsize(index_path(vocab_path))
+
+    matches = loaded.tables() == compiled.tables() and cached is loaded
+    print(f"Vocabulary: {len(compiled)} terms, index {index_size / 1e6:.1f} MB")
+    print(f"  Compile and save: {compile_time * 1000:8.1f} ms")
+    print(f"  Load from index:  {load_time * 1000:8.1f} ms")
+    print(f"  Cached reuse:     {cached_time * 1000:8.3f} ms")
+    print(f"  Loaded tables {'identical' if matches else 'DIFFER'}")
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count vocabulary keywords in a transcript')
+    parser.add_argument('transcript_path', nargs='?', help='Path to .srt, .vtt, .txt or Whisper .json transcript')
+    parser.add_argument('--vocab', default=DEFAULT_VOCABULARY,
+                        help=f'Vocabulary name under vocab/ or file path (default: {DEFAULT_VOCABULARY})')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=BENCHMARK_TERMS, metavar='TERMS',
+                        help=f'Benchmark against substring scans (default: {BENCHMARK_TERMS} terms)')
+    parser.add_argument('--index-benchmark', type=int, nargs='?', const=INDEX_BENCHMARK_TERMS, metavar='TERMS',
+                        help=f'Time compiling versus loading a saved index (default: {INDEX_BENCHMARK_TERMS} terms)')
+
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        sys.exit(0 if run_benchmark(args.benchmark) else 1)
+    if args.index_benchmark is not None:
+        sys.exit(0 if run_index_benchmark(args.index_benchmark) else 1)
+    if not args.transcript_path:
+        parser.error("transcript_path is required unless a benchmark is requested")
+
+    try:
+        matcher = load_vocabulary(args.vocab)
+        transcript = Transcript.from_file(args.transcript_path)
+    except FileNotFoundError as e:
+        print(f"Error: File {e.filename} not found")
+        sys.exit(1)
+
+    positions = matcher.cue_positions(transcript)
+    for keyword, count in matcher.counts(transcript.text).most_common():
+        times = ', '.join(format_chapter_time(transcript.start_ms[cue]) for cue in positions[keyword][:5])
+        print(f"{count:6d}  {keyword}  ({times})")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,40 @@ Cuca: Virtual Microphone Audio Delay Tool
 Creates a virtual microphone with delayed audio for recording software like your recording software
 """
 
-import pyaudio
 import numpy as np
 from collections import deque
 import sys
 import threading
 import time
-from typing import Optional, List 
+from typing import Optional, List, Tuple
 import signal
 import atexit
 import subprocess
 import platform
+import wave
+import json
+import gc
+import tracemalloc
+import os
+import io
+import contextlib
+import itertools
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    pyaudio = None
+    PYAUDIO_AVAILABLE = False
+
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    soundfile = None
+    SOUNDFILE_AVAILABLE = False
 
 
 def show_macos_alert(title: str, message: str, alert_type: str = "warning"):
@@ -50,58 +73,2037 @@ def show_macos_alert(title: str, message: str, alert_type: str = "warning"):
         return False
 
 
+# PortAudio constants, mirrored here so the fake backend works without PyAudio
+PA_FLOAT32 = 1
+PA_CONTINUE = 0
+PA_INPUT_OVERFLOW = 0x2          # callback status flag
+PA_OUTPUT_UNDERFLOW = 0x4        # callback status flag
+PA_INPUT_OVERFLOWED = -9981      # blocking read error code
+PA_OUTPUT_UNDERFLOWED = -9980    # blocking write error code
+
+
+def read_input(stream, num_frames: int) -> Tuple[bytes, bool]:
+    """Blocking read; returns (audio, whether PortAudio reported an input overflow).
+
+    PyAudio raises paInputOverflowed and drops the chunk it read. After an
+    overflow the device buffer is full, so the chunk is read again at once:
+    the overrun is PortAudio's own signal and the output still gets captured
+    audio instead of a chunk of silence.
+    """
+    try:
+        return stream.read(num_frames, exception_on_overflow=True), False
+    except IOError as e:
+        if getattr(e, 'errno', None) != PA_INPUT_OVERFLOWED:
+            raise
+    return stream.read(num_frames, exception_on_overflow=False), True
+
+
+class AudioBackend(ABC):
+    """Device layer used by the tool: the subset of the PyAudio API it relies on.
+
+    Streams returned by ``open`` follow the PyAudio stream interface
+    (read/write, start_stream/stop_stream/close, is_active and the latency
+    getters), in blocking or callback mode. A backend missing one of the
+    abstract methods fails when it is created, not mid-stream.
+    """
+
+    name = "base"
+    # Whether the device table follows hotplug events while the backend is
+    # open; PortAudio snapshots it at initialisation
+    live_device_scan = False
+
+    @abstractmethod
+    def get_device_count(self) -> int:
+        """Number of devices in the device table"""
+
+    @abstractmethod
+    def get_device_info_by_index(self, index: int) -> dict:
+        """PyAudio-style info dict for device index"""
+
+    @abstractmethod
+    def get_host_api_count(self) -> int:
+        """Number of host APIs"""
+
+    @abstractmethod
+    def get_host_api_info_by_index(self, index: int) -> dict:
+        """PyAudio-style info dict for host API index"""
+
+    @abstractmethod
+    def get_default_input_device_info(self) -> dict:
+        """Info dict of the default input device"""
+
+    @abstractmethod
+    def get_default_output_device_info(self) -> dict:
+        """Info dict of the default output device"""
+
+    @abstractmethod
+    def open(self, **kwargs):
+        """Open a stream with PyAudio's open() arguments"""
+
+    def terminate(self):
+        """Release the backend; nothing to do unless overridden"""
+
+
+class PyAudioBackend(AudioBackend):
+    """AudioBackend backed by PortAudio through PyAudio"""
+
+    name = "pyaudio"
+
+    def __init__(self):
+        if not PYAUDIO_AVAILABLE:
+            raise RuntimeError("PyAudio is not installed")
+        self._pa = pyaudio.PyAudio()
+
+    def get_device_count(self) -> int:
+        return self._pa.get_device_count()
+
+    def get_device_info_by_index(self, index: int) -> dict:
+        return self._pa.get_device_info_by_index(index)
+
+    def get_host_api_count(self) -> int:
+        return self._pa.get_host_api_count()
+
+    def get_host_api_info_by_index(self, index: int) -> dict:
+        return self._pa.get_host_api_info_by_index(index)
+
+    def get_default_input_device_info(self) -> dict:
+        return self._pa.get_default_input_device_info()
+
+    def get_default_output_device_info(self) -> dict:
+        return self._pa.get_default_output_device_info()
+
+    def open(self, **kwargs):
+        return self._pa.open(**kwargs)
+
+    def terminate(self):
+        self._pa.terminate()
+
+
+class FakeAudioDevice:
+    """Simulated device shared by the fake backend and its streams"""
+
+    def __init__(self, name: str, inputs: int, outputs: int, host_api: int = 0):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.host_api = host_api
+        self.connected = True
+
+    def info(self, index: int) -> dict:
+        return {
+            'index': index,
+            'name': self.name,
+            'hostApi': self.host_api,
+            'maxInputChannels': self.inputs if self.connected else 0,
+            'maxOutputChannels': self.outputs if self.connected else 0,
+            'defaultSampleRate': 48000.0,
+            'defaultLowInputLatency': 0.005,
+            'defaultLowOutputLatency': 0.005,
+        }
+
+
+class FakeAudioStream:
+    """Deterministic PyAudio-style stream driven by a (possibly sped-up) virtual clock.
+
+    Device timing follows ``frames_per_buffer / rate / speed`` per buffer with
+    seeded jitter. A simulated device buffer of ``device_buffers`` periods
+    overflows (input) or underflows (output) when the caller falls behind,
+    exactly as PortAudio would report it.
+    """
+
+    def __init__(self, backend: 'FakeAudioBackend', rate: int, channels: int,
+                 frames_per_buffer: int = 1024, input: bool = False, output: bool = False,
+                 input_device_index: Optional[int] = None,
+                 output_device_index: Optional[int] = None,
+                 stream_callback=None, start: bool = True, format: int = PA_FLOAT32, **kwargs):
+        self._backend = backend
+        self._rate = rate
+        self._channels = channels
+        self._frames = frames_per_buffer
+        self._input = input
+        self._output = output
+        self._callback = stream_callback
+        self._period = frames_per_buffer / rate / backend.speed
+        self._rng = np.random.default_rng(backend.seed + len(backend.streams))
+        self._devices = []
+        self._input_device = None
+        if input:
+            self._input_device = backend.device(input_device_index, "input")
+            self._devices.append(self._input_device)
+        if output:
+            self._devices.append(backend.device(output_device_index, "output"))
+        self._phase = 0
+        self._frequencies = 220.0 * (1 + np.arange(channels))
+        self._active = False
+        self._stopped = threading.Event()
+        self._thread = None
+        self._start_time = 0.0
+        self._in_frames = 0
+        self._out_frames = 0
+        self.output_frames = 0
+        self.captured = [] if backend.capture_output else None
+        if start:
+            self.start_stream()
+
+    # Simulated device -------------------------------------------------
+
+    def _stream_time(self) -> float:
+        """Audio seconds elapsed on the device clock"""
+        return (time.perf_counter() - self._start_time) * self._backend.speed
+
+    def _check_connected(self):
+        if self._input_device is not None:
+            self._backend.maybe_disconnect(self._input_device, self._stream_time())
+        if not all(device.connected for device in self._devices):
+            self._active = False
+            raise OSError("[Errno -9988] Stream closed: device unavailable")
+
+    def _generate(self, frames: int) -> bytes:
+        """Deterministic multi-tone test signal, one tone per channel"""
+        t = (self._phase + np.arange(frames)) / self._rate
+        audio = 0.5 * np.sin(2 * np.pi * t[:, None] * self._frequencies[None, :])
+        self._phase += frames
+        return audio.astype(np.float32).tobytes()
+
+    def _wait_until(self, due: float):
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _jitter(self) -> float:
+        return self._rng.uniform(0, self._backend.jitter_ms / 1000) / self._backend.speed
+
+    def _capture(self, data):
+        self.output_frames += len(data) // (4 * self._channels)
+        if self.captured is not None:
+            self.captured.append(bytes(data))
+
+    # PyAudio stream interface ----------------------------------------
+
+    def start_stream(self):
+        self._start_time = time.perf_counter()
+        self._active = True
+        self._stopped.clear()
+        if self._callback is not None:
+            self._thread = threading.Thread(target=self._run_callbacks, name="FakeAudioDevice", daemon=True)
+            self._thread.start()
+
+    def stop_stream(self):
+        self._active = False
+        self._stopped.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        self.stop_stream()
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def get_input_latency(self) -> float:
+        return self._backend.latency if self._input else 0.0
+
+    def get_time(self) -> float:
+        return self._stream_time()
+
+    def get_output_latency(self) -> float:
+        return self._backend.latency if self._output else 0.0
+
+    def read(self, num_frames: int, exception_on_overflow: bool = True) -> bytes:
+        self._check_connected()
+        # Samples exist once the device clock has passed them
+        due = self._start_time + (self._in_frames + num_frames) / self._rate / self._backend.speed
+        self._wait_until(due + self._jitter())
+        capacity = self._backend.device_buffers * self._frames
+        behind = self._stream_time() * self._rate - (self._in_frames + num_frames)
+        overflowed = behind > capacity
+        if overflowed:
+            # The device buffer wrapped: the oldest audio is lost, a full buffer remains
+            lost = int(behind) - capacity
+            self._in_frames += lost
+            self._phase += lost
+        self._in_frames += num_frames
+        self._backend.forced_overflow_counter += 1
+        forced = (self._backend.overflow_every
+                  and self._backend.forced_overflow_counter % self._backend.overflow_every == 0)
+        data = self._generate(num_frames)
+        if forced and not overflowed:
+            # A forced overflow stands for a device buffer that filled up:
+            # its audio is lost and the next chunk is already waiting
+            self._in_frames -= num_frames
+        if (overflowed or forced) and exception_on_overflow:
+            # Like PyAudio, the chunk that was read is dropped with the error
+            error = IOError("[Errno -9981] Input overflowed")
+            error.errno = PA_INPUT_OVERFLOWED
+            raise error
+        return data
+
+    def write(self, frames, num_frames: Optional[int] = None, exception_on_underflow: bool = False):
+        self._check_connected()
+        data = frames
+        frames_written = len(data) // (4 * self._channels)
+        # Playback trails the written audio by the device's output latency
+        played = max(0.0, self._stream_time() - self._backend.latency) * self._rate
+        if self._out_frames == 0:
+            # The device plays silence until the first write lands
+            self._out_frames = int(self._stream_time() * self._rate)
+        underflowed = played > self._out_frames
+        if underflowed:
+            # The device ran dry: it restarts from what is written now
+            self._out_frames = int(played)
+        # Block while the device buffer is full
+        buffered_limit = self._backend.device_buffers * self._frames
+        due = self._start_time + (self._out_frames - buffered_limit) / self._rate / self._backend.speed
+        self._wait_until(due)
+        self._out_frames = max(self._out_frames, int(played)) + frames_written
+        self._capture(data)
+        if underflowed and exception_on_underflow:
+            error = IOError("[Errno -9980] Output underflowed")
+            error.errno = PA_OUTPUT_UNDERFLOWED
+            raise error
+
+    def _run_callbacks(self):
+        """Fire the stream callback once per device period until stopped"""
+        period_index = 0
+        status = 0
+        while self._active and not self._stopped.is_set():
+            period_index += 1
+            due = self._start_time + period_index * self._period
+            self._wait_until(due + self._jitter())
+            try:
+                self._check_connected()
+            except OSError:
+                break
+            in_data = self._generate(self._frames) if self._input else None
+            result = self._callback(in_data, self._frames, {}, status)
+            out_data, flag = result
+            if self._output and out_data is not None:
+                self._capture(out_data)
+            # A callback that overruns its period makes the device miss a buffer
+            late = time.perf_counter() - (due + self._period)
+            status = 0
+            if late > 0:
+                if self._input:
+                    status |= PA_INPUT_OVERFLOW
+                if self._output:
+                    status |= PA_OUTPUT_UNDERFLOW
+                period_index += int(late / self._period) + 1
+            if flag != PA_CONTINUE:
+                break
+        self._active = False
+
+
+class FakeAudioBackend(AudioBackend):
+    """Deterministic in-memory audio backend for headless testing and load tests.
+
+    Simulates a microphone and a virtual output device with configurable
+    clock speed (``speed`` times real time), callback jitter, an input device
+    disconnect after ``disconnect_after`` seconds of audio (replugged after
+    another ``reconnect_after`` seconds, at the end of the device list so
+    indices shift as they do on real hotplug), and forced input overflows
+    every ``overflow_every`` reads. With ``live_device_scan=False`` callers
+    must reinitialise the backend to see hotplug, as with PortAudio.
+    """
+
+    name = "fake"
+    live_device_scan = True
+
+    def __init__(self, speed: float = 1.0, jitter_ms: float = 0.0, latency: float = 0.005,
+                 disconnect_after: Optional[float] = None, overflow_every: int = 0,
+                 device_buffers: int = 4, capture_output: bool = False, seed: int = 0,
+                 devices: Optional[List[FakeAudioDevice]] = None,
+                 reconnect_after: Optional[float] = None, live_device_scan: bool = True):
+        self.speed = speed
+        self.jitter_ms = jitter_ms
+        self.latency = latency
+        self.disconnect_after = disconnect_after
+        self.reconnect_after = reconnect_after
+        self.live_device_scan = live_device_scan
+        self._replug_due = None
+        self.overflow_every = overflow_every
+        self.device_buffers = device_buffers
+        self.capture_output = capture_output
+        self.seed = seed
+        self.forced_overflow_counter = 0
+        self.devices = devices if devices is not None else [
+            FakeAudioDevice("Fake Microphone", inputs=2, outputs=0),
+            FakeAudioDevice("Fake BlackHole 2ch", inputs=2, outputs=2),
+        ]
+        self.streams = []
+
+    def maybe_disconnect(self, device: FakeAudioDevice, stream_time: float):
+        """Unplug device once a stream using it has run for disconnect_after seconds"""
+        if self.disconnect_after is None or stream_time < self.disconnect_after:
+            return
+        self.disconnect_after = None
+        device.connected = False
+        if self.reconnect_after is not None:
+            self._replug_due = time.perf_counter() + self.reconnect_after / self.speed
+
+    def _replug(self):
+        """Reconnect unplugged devices once reconnect_after has elapsed"""
+        if self._replug_due is None or time.perf_counter() < self._replug_due:
+            return
+        self._replug_due = None
+        for device in [d for d in self.devices if not d.connected]:
+            device.connected = True
+            self.devices.remove(device)
+            self.devices.append(device)
+
+    def device(self, index: Optional[int], direction: str) -> FakeAudioDevice:
+        self._replug()
+        if index is None:
+            index = 0 if direction == "input" else 1
+        if not 0 <= index < len(self.devices):
+            raise OSError(f"[Errno -9996] Invalid {direction} device")
+        return self.devices[index]
+
+    def get_device_count(self) -> int:
+        self._replug()
+        return len(self.devices)
+
+    def get_device_info_by_index(self, index: int) -> dict:
+        return self.device(index, "input").info(index)
+
+    def get_host_api_count(self) -> int:
+        return 1
+
+    def get_host_api_info_by_index(self, index: int) -> dict:
+        return {'index': index, 'name': 'Fake Audio', 'deviceCount': len(self.devices)}
+
+    def get_default_input_device_info(self) -> dict:
+        return self.get_device_info_by_index(0)
+
+    def get_default_output_device_info(self) -> dict:
+        return self.get_device_info_by_index(1)
+
+    def open(self, **kwargs):
+        stream = FakeAudioStream(self, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def captured_output(self) -> bytes:
+        """All audio written to output streams, when capture_output is enabled"""
+        return b''.join(b''.join(stream.captured or []) for stream in self.streams if stream._output)
+
+
+_backend_factory = PyAudioBackend
+
+
+def set_audio_backend(factory):
+    """Choose the backend factory used for every device query and stream"""
+    global _backend_factory
+    _backend_factory = factory
+    _device_registry.invalidate()
+
+
+def create_audio_backend() -> AudioBackend:
+    """Instantiate the configured audio backend"""
+    return _backend_factory()
+
+
+class DeviceRegistry:
+    """Process-wide cache of the device and host-API tables.
+
+    Every backend instantiation makes PortAudio re-scan all host APIs, which
+    takes seconds on machines with many aggregate devices. The registry
+    enumerates once and serves lookups from memory; the tables are rebuilt
+    only by refresh(), after invalidate() (e.g. when a stream reports a
+    vanished device), or when detect_hotplug() sees the device set change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Optional[List[dict]] = None
+        self._host_apis: List[dict] = []
+        self._defaults = {'input': None, 'output': None}
+        self.generation = 0
+
+    def _enumerate(self):
+        """Scan the backend once and return fresh device/host-API tables"""
+        p = create_audio_backend()
+        try:
+            host_apis = [dict(p.get_host_api_info_by_index(i)) for i in range(p.get_host_api_count())]
+            devices = []
+            for i in range(p.get_device_count()):
+                try:
+                    devices.append(dict(p.get_device_info_by_index(i)))
+                except Exception:
+                    devices.append({'index': i, 'name': f'Device {i}',
+                                    'maxInputChannels': 0, 'maxOutputChannels': 0})
+            defaults = {}
+            for direction, getter in (("input", p.get_default_input_device_info),
+                                      ("output", p.get_default_output_device_info)):
+                try:
+                    defaults[direction] = dict(getter())
+                except Exception:
+                    defaults[direction] = None
+        finally:
+            p.terminate()
+        return devices, host_apis, defaults
+
+    @staticmethod
+    def _signature(devices: List[dict]) -> tuple:
+        return tuple(
+            (str(d.get('name', '')), int(d.get('maxInputChannels', 0)), int(d.get('maxOutputChannels', 0)))
+            for d in devices
+        )
+
+    def refresh(self) -> bool:
+        """Re-enumerate devices; return True if the device set changed"""
+        devices, host_apis, defaults = self._enumerate()
+        with self._lock:
+            changed = self._devices is None or self._signature(devices) != self._signature(self._devices)
+            self._devices = devices
+            self._host_apis = host_apis
+            self._defaults = defaults
+            if changed:
+                self.generation += 1
+        return changed
+
+    def invalidate(self):
+        """Drop the cached tables so the next lookup re-enumerates"""
+        with self._lock:
+            self._devices = None
+
+    def detect_hotplug(self) -> bool:
+        """Re-scan and report whether devices were added, removed or changed.
+
+        This costs one enumeration, so call it from a supervisor thread at a
+        modest interval rather than from lookups or the audio path.
+        """
+        first_scan = self._devices is None
+        changed = self.refresh()
+        return changed and not first_scan
+
+    def _tables(self):
+        devices = self._devices
+        if devices is None:
+            self.refresh()
+            devices = self._devices
+        return devices, self._host_apis, self._defaults
+
+    def devices(self) -> List[dict]:
+        """Cached info dicts for every device, indexed by device id"""
+        return self._tables()[0]
+
+    def host_apis(self) -> List[dict]:
+        """Cached info dicts for every host API"""
+        return self._tables()[1]
+
+    def device_info(self, device_index: int) -> Optional[dict]:
+        devices = self.devices()
+        if 0 <= device_index < len(devices):
+            return devices[device_index]
+        return None
+
+    def default_device_info(self, direction: str = "input") -> Optional[dict]:
+        return self._tables()[2].get(direction)
+
+    def find_device(self, name: str, direction: str = "input") -> Optional[int]:
+        """Index of the first device with this name and channels in direction"""
+        key = 'maxInputChannels' if direction == "input" else 'maxOutputChannels'
+        for i, info in enumerate(self.devices()):
+            if str(info.get('name', '')) == name and int(info.get(key, 0)) > 0:
+                return i
+        return None
+
+
+_device_registry = DeviceRegistry()
+
+
+def get_device_registry() -> DeviceRegistry:
+    """The shared device registry for this process"""
+    return _device_registry
+
+
 def _get_device_name(device_index: Optional[int], direction: str = "input") -> str:
     """Return human-readable device name for a given index."""
-    p = pyaudio.PyAudio()
+    registry = get_device_registry()
     try:
         if device_index is None:
-            try:
-                info = (
-                    p.get_default_input_device_info()
-                    if direction == "input"
-                    else p.get_default_output_device_info()
-                )
-                name = info.get("name", "Default")
-                return str(name) if name is not None else "Default"
-            except Exception:
+            info = registry.default_device_info(direction)
+            if info is None:
                 return "Default"
-        try:
-            info = p.get_device_info_by_index(device_index)
-            name = info.get("name", f"Device {device_index}")
-            return str(name) if name is not None else f"Device {device_index}"
-        except Exception:
+            name = info.get("name", "Default")
+            return str(name) if name is not None else "Default"
+        info = registry.device_info(device_index)
+        if info is None:
             return f"Device {device_index}"
-    finally:
-        p.terminate()
+        name = info.get("name", f"Device {device_index}")
+        return str(name) if name is not None else f"Device {device_index}"
+    except Exception:
+        return "Default" if device_index is None else f"Device {device_index}"
 
 
 def _get_default_device_index(direction: str = "input") -> Optional[int]:
     """Return the default device index for the given direction if available."""
-    p = pyaudio.PyAudio()
     try:
-        try:
-            info = (
-                p.get_default_input_device_info()
-                if direction == "input"
-                else p.get_default_output_device_info()
-            )
-            return int(info.get("index")) if "index" in info else None
-        except Exception:
-            return None
+        info = get_device_registry().default_device_info(direction)
+    except Exception:
+        return None
+    if info is None:
+        return None
+    return int(info.get("index")) if "index" in info else None
+
+
+def ms_to_delay_samples(delay_ms: float, sample_rate: int) -> int:
+    """Delay-line length for a delay in milliseconds, shared by the live and offline paths"""
+    # The newest sample occupied one slot of the original
+    # deque(maxlen=delay_samples), so the effective delay is one sample
+    # shorter than the slot count.
+    return max(1, int(delay_ms * sample_rate / 1000)) - 1
+
+
+class DelayLine:
+    """Delay line backed by a preallocated NumPy ring buffer.
+
+    Each block is written into the ring and the delayed block is read back
+    with at most two slice copies per direction, so the cost per chunk does
+    not depend on the delay length and delays may be shorter or longer than
+    the block size. Multi-channel audio is handled as interleaved
+    ``(frames, channels)`` blocks; optional per-channel offsets are read with
+    a single vectorized gather instead of a loop over channels.
+
+    The ring keeps ``max_delay_samples`` of history, so ``set_delay`` only
+    moves the read offset. The move is applied at the next block boundary and
+    crossfaded from the old offset to the new one with a precomputed ramp.
+    """
+
+    def __init__(self, delay_samples: int, max_block_size: int = 1024, channels: int = 1,
+                 channel_offsets: Optional[List[int]] = None,
+                 max_delay_samples: Optional[int] = None, fade_samples: int = 0):
+        self.channels = max(1, int(channels))
+        self._frame_shape = () if self.channels == 1 else (self.channels,)
+        self._max_block_size = max(1, int(max_block_size))
+
+        offsets = [max(0, int(o)) for o in (channel_offsets or [])]
+        if offsets and len(offsets) != self.channels:
+            raise ValueError(f"Expected {self.channels} channel offsets, got {len(offsets)}")
+        # A mono offset is just a longer delay
+        self._extra_delay = offsets[0] if self.channels == 1 and offsets else 0
+        if self.channels == 1:
+            offsets = []
+        self._offsets = np.array(offsets, dtype=np.int64) if any(offsets) else None
+
+        self.delay_samples = max(0, int(delay_samples))
+        self.max_delay_samples = max(self.delay_samples, int(max_delay_samples or 0))
+        self._history = (self.max_delay_samples + self._extra_delay
+                         + (int(self._offsets.max()) if self._offsets is not None else 0))
+
+        self._capacity = self._history + self._max_block_size
+        self._ring = np.zeros((self._capacity,) + self._frame_shape, dtype=np.float32)
+        self._write_pos = 0
+        self.frames_written = 0
+        if self._offsets is not None:
+            self._allocate_gather_buffers()
+
+        # Live delay changes: set_delay() parks a request under the lock and
+        # the audio thread picks it up at the start of a block
+        self._lock = threading.Lock()
+        self._pending_delay = None
+        self._fade_samples = max(0, int(fade_samples))
+        self._fade_from = None
+        self._fade_pos = 0
+        self._allocate_fade_buffers()
+
+    def _allocate_gather_buffers(self):
+        """Preallocate the index arrays used by the per-channel gather"""
+        # Both planes are materialized: ufuncs buffer broadcast operands
+        shape = (self._max_block_size, self.channels)
+        frames = np.arange(self._max_block_size, dtype=np.int64)[:, None]
+        self._frame_index = np.ascontiguousarray(np.broadcast_to(frames - self._offsets, shape))
+        self._channel_index = np.ascontiguousarray(
+            np.broadcast_to(np.arange(self.channels, dtype=np.int64), shape))
+        self._gather_index = np.empty(shape, dtype=np.int64)
+
+    def _allocate_fade_buffers(self):
+        """Preallocate the crossfade ramp (padded with ones) and the old-offset scratch block"""
+        if not self._fade_samples:
+            self._fade_ramp = None
+            self._fade_scratch = None
+            return
+        ramp = np.ones(self._fade_samples + self._max_block_size, dtype=np.float32)
+        ramp[:self._fade_samples] = np.linspace(0.0, 1.0, self._fade_samples, endpoint=False)
+        self._fade_ramp = ramp if self.channels == 1 else ramp[:, None]
+        self._fade_scratch = np.empty((self._max_block_size,) + self._frame_shape, dtype=np.float32)
+
+    def _ensure_capacity(self, block_size: int):
+        """Grow the ring (keeping its history) if a block would overlap the read window"""
+        needed = self._history + block_size
+        if needed <= self._capacity and block_size <= self._max_block_size:
+            return
+        history = np.empty((self._history,) + self._frame_shape, dtype=np.float32)
+        self._read((self._write_pos - self._history) % self._capacity, history)
+        self._max_block_size = max(self._max_block_size, block_size)
+        self._capacity = max(self._capacity, needed)
+        self._ring = np.zeros((self._capacity,) + self._frame_shape, dtype=np.float32)
+        self._ring[:self._history] = history
+        self._write_pos = self._history % self._capacity
+        if self._offsets is not None:
+            self._allocate_gather_buffers()
+        self._allocate_fade_buffers()
+
+    def _write(self, start: int, data: np.ndarray):
+        """Copy data into the ring starting at start, wrapping once if needed"""
+        first = min(len(data), self._capacity - start)
+        self._ring[start:start + first] = data[:first]
+        self._ring[:len(data) - first] = data[first:]
+
+    def _read(self, start: int, out: np.ndarray):
+        """Copy len(out) frames out of the ring starting at start, wrapping once if needed"""
+        first = min(len(out), self._capacity - start)
+        out[:first] = self._ring[start:start + first]
+        out[first:] = self._ring[:len(out) - first]
+
+    def _read_per_channel(self, start: int, out: np.ndarray):
+        """Gather len(out) frames with each channel shifted back by its own offset"""
+        n = len(out)
+        index = self._gather_index[:n]
+        np.add(self._frame_index[:n], start, out=index)
+        np.remainder(index, self._capacity, out=index)
+        # Flatten (frame, channel) pairs so one np.take fills the whole block
+        np.multiply(index, self.channels, out=index)
+        np.add(index, self._channel_index[:n], out=index)
+        # Indices are in range; mode='raise' would buffer the output
+        np.take(self._ring.reshape(-1), index, out=out, mode='clip')
+
+    def _read_delayed(self, delay: int, out: np.ndarray):
+        """Read the block that sits delay frames behind the current write position"""
+        start = (self._write_pos - delay - self._extra_delay) % self._capacity
+        if self._offsets is None:
+            self._read(start, out)
+        else:
+            self._read_per_channel(start, out)
+
+    def set_delay(self, delay_samples: int) -> int:
+        """Request a new delay (thread-safe); returns the delay that will be applied"""
+        delay_samples = min(max(0, int(delay_samples)), self.max_delay_samples)
+        with self._lock:
+            self._pending_delay = delay_samples
+        return delay_samples
+
+    def _apply_pending_delay(self):
+        """Switch to a requested delay, starting a crossfade from the old read offset"""
+        with self._lock:
+            delay, self._pending_delay = self._pending_delay, None
+        if delay == self.delay_samples:
+            return
+        if self._fade_samples:
+            self._fade_from = self.delay_samples
+            self._fade_pos = 0
+        self.delay_samples = delay
+
+    def process(self, block: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Push a block through the delay line and return the delayed block"""
+        if out is None:
+            out = np.empty_like(block)
+        n = len(block)
+        self._ensure_capacity(n)
+        # New delays wait for any running crossfade to finish, so rapid
+        # changes coalesce instead of cutting a fade short
+        if self._pending_delay is not None and self._fade_from is None:
+            self._apply_pending_delay()
+        self._write(self._write_pos, block)
+        self._read_delayed(self.delay_samples, out)
+        if self._fade_from is not None:
+            old = self._fade_scratch[:n]
+            self._read_delayed(self._fade_from, old)
+            ramp = self._fade_ramp[self._fade_pos:self._fade_pos + n]
+            # out = old + (new - old) * ramp, computed in place
+            np.subtract(out, old, out=out)
+            np.multiply(out, ramp, out=out)
+            np.add(out, old, out=out)
+            self._fade_pos += n
+            if self._fade_pos >= self._fade_samples:
+                self._fade_from = None
+        self._write_pos = (self._write_pos + n) % self._capacity
+        self.frames_written += n
+        return out
+
+    def fill_frames(self) -> int:
+        """Frames of real audio held for the current delay (below it only while priming)"""
+        return min(self.frames_written, self.delay_samples + self._extra_delay)
+
+    def reset(self):
+        """Clear the delay line back to silence"""
+        self._ring.fill(0.0)
+        self._write_pos = 0
+        self.frames_written = 0
+        self._fade_from = None
+
+
+class GainStage:
+    """Static gain in dB"""
+
+    def __init__(self, gain_db: float):
+        self.gain_db = gain_db
+        self._gain = np.float32(10 ** (gain_db / 20))
+
+    def process(self, block: np.ndarray):
+        np.multiply(block, self._gain, out=block)
+
+    def reset(self):
+        pass
+
+    def describe(self) -> str:
+        return f"gain {self.gain_db:+g}dB"
+
+
+class HighPassFilter:
+    """Biquad high-pass (RBJ cookbook) evaluated in segments with precomputed matrices.
+
+    The filter runs in state-space form on segments of L samples. Stacking
+    the two state values above the segment's input gives ``z = [s; x]``. The
+    output is ``[O | T] @ z`` and the next state is ``[P | G] @ z``. Here
+    ``T`` is the lower-triangular impulse-response matrix and ``O`` the free
+    response from the state. Each segment costs two small dot products, is
+    exact up to float64 rounding, and needs no per-sample Python or SciPy.
+    """
+
+    SEGMENT = 128
+
+    def __init__(self, cutoff_hz: float, sample_rate: int, channels: int = 1, q: float = 0.7071):
+        self.cutoff_hz = cutoff_hz
+        w0 = 2 * np.pi * cutoff_hz / sample_rate
+        cos_w0, alpha = np.cos(w0), np.sin(w0) / (2 * q)
+        a0 = 1 + alpha
+        b0 = b2 = (1 + cos_w0) / 2 / a0
+        b1 = -(1 + cos_w0) / a0
+        a1, a2 = -2 * cos_w0 / a0, (1 - alpha) / a0
+        self.coefficients = (b0, b1, b2, a1, a2)
+
+        # Transposed direct form II as state space: y = s[0] + b0 x
+        A = np.array([[-a1, 1.0], [-a2, 0.0]])
+        B = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        L = self.SEGMENT
+        powers = np.empty((L + 1, 2, 2))
+        powers[0] = np.eye(2)
+        for k in range(1, L + 1):
+            powers[k] = A @ powers[k - 1]
+        impulse = np.empty(L)
+        impulse[0] = b0
+        impulse[1:] = (powers[:L - 1] @ B)[:, 0]
+        lags = np.arange(L)[:, None] - np.arange(L)[None, :]
+        self._T = np.where(lags >= 0, impulse[np.maximum(lags, 0)], 0.0)
+        self._O = powers[:L, 0, :]                    # (L, 2): row n is C A^n
+        self._P = powers                              # state carried over n samples
+        self._G = (powers[L - 1::-1] @ B).T           # (2, L): column k is A^(L-1-k) B
+        # Contiguous per-length matrices, since np.dot copies strided operands
+        self._segment_matrices = {}
+        self._z = np.zeros((L + 2, channels))         # rows 0-1 hold the filter state
+        self._y = np.empty((L, channels))
+        self._next_state = np.empty((2, channels))
+
+    def _matrices(self, n: int):
+        """Output and state-update matrices for an n-sample segment"""
+        matrices = self._segment_matrices.get(n)
+        if matrices is None:
+            L = self.SEGMENT
+            response = np.ascontiguousarray(np.hstack([self._O[:n], self._T[:n, :n]]))
+            update = np.ascontiguousarray(np.hstack([self._P[n], self._G[:, L - n:]]))
+            matrices = self._segment_matrices[n] = (response, update)
+        return matrices
+
+    def process(self, block: np.ndarray):
+        frames = block.reshape(len(block), -1)
+        L = self.SEGMENT
+        z = self._z
+        for start in range(0, len(frames), L):
+            segment = frames[start:start + L]
+            n = len(segment)
+            response, update = self._matrices(n)
+            stacked = z[:2 + n]
+            stacked[2:] = segment
+            y = self._y[:n]
+            np.dot(response, stacked, out=y)
+            np.dot(update, stacked, out=self._next_state)
+            z[:2] = self._next_state
+            segment[:] = y
+
+    def reset(self):
+        self._z.fill(0.0)
+
+    def describe(self) -> str:
+        return f"high-pass {self.cutoff_hz:g}Hz"
+
+
+class NoiseGate:
+    """Block-level noise gate with hysteresis, hold and ramped gain changes.
+
+    The gate decides once per block from the block's RMS across channels,
+    then ramps linearly from the previous gain towards the target, limited by
+    the attack and release times, so gain changes never click.
+    """
+
+    def __init__(self, threshold_db: float, sample_rate: int, hysteresis_db: float = 6.0,
+                 hold_ms: float = 80.0, attack_ms: float = 2.0, release_ms: float = 120.0):
+        self.threshold_db = threshold_db
+        self._open_level = 10 ** (threshold_db / 20)
+        self._close_level = 10 ** ((threshold_db - hysteresis_db) / 20)
+        self._hold = int(hold_ms * sample_rate / 1000)
+        self._attack = max(1, int(attack_ms * sample_rate / 1000))
+        self._release = max(1, int(release_ms * sample_rate / 1000))
+        self._steps = np.arange(1, 1025, dtype=np.float32)
+        self._ramp = np.empty(1024, dtype=np.float32)
+        self.reset()
+
+    def process(self, block: np.ndarray):
+        n = len(block)
+        flat = block.reshape(-1)
+        level = np.sqrt(float(np.dot(flat, flat)) / max(1, flat.size))
+        if level >= self._open_level or (self.is_open and level >= self._close_level):
+            self.is_open = True
+            self._hold_left = self._hold
+        elif self.is_open:
+            self._hold_left -= n
+            self.is_open = self._hold_left > 0
+        target = 1.0 if self.is_open else 0.0
+        limit = n / (self._attack if target > self._gain else self._release)
+        gain = self._gain + max(-limit, min(limit, target - self._gain))
+        if gain == self._gain:
+            if gain != 1.0:
+                np.multiply(block, np.float32(gain), out=block)
+        else:
+            if n > len(self._steps):
+                self._steps = np.arange(1, n + 1, dtype=np.float32)
+                self._ramp = np.empty(n, dtype=np.float32)
+            ramp = self._ramp[:n]
+            np.multiply(self._steps[:n], np.float32((gain - self._gain) / n), out=ramp)
+            np.add(ramp, np.float32(self._gain), out=ramp)
+            # Column by column: a broadcast multiply would buffer a copy of the block
+            frames = block.reshape(n, -1)
+            for channel in range(frames.shape[1]):
+                np.multiply(frames[:, channel], ramp, out=frames[:, channel])
+        self._gain = gain
+
+    def reset(self):
+        self.is_open = False
+        self._hold_left = 0
+        self._gain = 0.0
+
+    def describe(self) -> str:
+        return f"noise gate {self.threshold_db:g}dBFS"
+
+
+class PeakLimiter:
+    """Brickwall peak limiter with instant attack and a constant release rate in dB.
+
+    The gain follows ``g[k] = min(1, ceiling/|x[k]|, g[k-1] * r)``. In the log
+    domain this is a running minimum of ``log(req[j]) - c*j`` shifted back by
+    ``c*k``. One ``np.minimum.accumulate`` computes it per sample for the
+    whole block. Channels are linked so the stereo image does not shift.
+    """
+
+    def __init__(self, ceiling_db: float, sample_rate: int, release_ms: float = 80.0):
+        self.ceiling_db = ceiling_db
+        self._ceiling = np.float32(10 ** (ceiling_db / 20))
+        # release_ms is the time to recover from 6dB of gain reduction
+        self._rate = np.log(2.0) / max(1.0, release_ms * sample_rate / 1000)
+        self._ensure(1024)
+        self.reset()
+
+    def _ensure(self, n: int):
+        self._ramp = (self._rate * np.arange(n)).astype(np.float32)
+        self._log_gain = np.empty(n, dtype=np.float32)
+        self._peak = np.empty(n, dtype=np.float32)
+        self._abs = np.empty(n, dtype=np.float32)
+
+    def process(self, block: np.ndarray):
+        n = len(block)
+        if n > len(self._ramp):
+            self._ensure(n)
+        frames = block.reshape(n, -1)
+        peak, log_gain, ramp = self._peak[:n], self._log_gain[:n], self._ramp[:n]
+        # Linked peak across channels, one column at a time: axis reductions
+        # and broadcasts would allocate a buffer per block
+        np.abs(frames[:, 0], out=peak)
+        for channel in range(1, frames.shape[1]):
+            magnitude = self._abs[:n]
+            np.abs(frames[:, channel], out=magnitude)
+            np.maximum(peak, magnitude, out=peak)
+        if peak[peak.argmax()] <= self._ceiling and self._last == 0.0:
+            return  # Nothing to limit and fully released
+        np.maximum(peak, self._ceiling, out=peak)
+        np.divide(self._ceiling, peak, out=log_gain)
+        np.log(log_gain, out=log_gain)                   # required gain, <= 0
+        np.subtract(log_gain, ramp, out=log_gain)
+        np.minimum.accumulate(log_gain, out=log_gain)
+        np.add(log_gain, ramp, out=log_gain)
+        # Carry the previous block's gain and release it sample by sample
+        np.add(ramp, self._last + self._rate, out=peak)
+        np.minimum(log_gain, peak, out=log_gain)
+        np.minimum(log_gain, 0.0, out=log_gain)
+        self._last = float(log_gain[-1])
+        np.exp(log_gain, out=peak)
+        for channel in range(frames.shape[1]):
+            np.multiply(frames[:, channel], peak, out=frames[:, channel])
+
+    def reset(self):
+        self._last = 0.0
+
+    def describe(self) -> str:
+        return f"limiter {self.ceiling_db:g}dBFS"
+
+
+class DSPChain:
+    """Cleanup stages applied in place to each delayed block.
+
+    The order is fixed: high-pass, gain, noise gate, limiter. Rumble is
+    removed before the gate measures the level, and the limiter runs last as
+    the safety stage.
+    """
+
+    def __init__(self, stages: list):
+        self.stages = stages
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        for stage in self.stages:
+            stage.process(block)
+        return block
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def describe(self) -> str:
+        return " → ".join(stage.describe() for stage in self.stages)
+
+
+def build_dsp_chain(sample_rate: int, channels: int = 1, gain_db: float = 0.0,
+                    highpass_hz: Optional[float] = None, noise_gate_db: Optional[float] = None,
+                    limiter_db: Optional[float] = None) -> Optional[DSPChain]:
+    """Build the cleanup chain for the enabled stages, or None if none are enabled"""
+    stages = []
+    if highpass_hz:
+        if not 0 < highpass_hz < sample_rate / 2:
+            raise ValueError(f"High-pass cutoff must be between 0 and {sample_rate // 2}Hz")
+        stages.append(HighPassFilter(highpass_hz, sample_rate, channels))
+    if gain_db:
+        stages.append(GainStage(gain_db))
+    if noise_gate_db is not None:
+        stages.append(NoiseGate(noise_gate_db, sample_rate))
+    if limiter_db is not None:
+        stages.append(PeakLimiter(limiter_db, sample_rate))
+    return DSPChain(stages) if stages else None
+
+
+def _deque_delay_reference(delay_buffer: deque, input_audio: np.ndarray) -> np.ndarray:
+    """Original per-sample deque delay loop, kept as a reference for benchmarking"""
+    output_audio = np.zeros_like(input_audio)
+    for i, sample in enumerate(input_audio):
+        delay_buffer.append(sample)
+        output_audio[i] = delay_buffer[0]
+    return output_audio
+
+
+def benchmark_delay_engines(delay_ms: int = 140, sample_rate: int = 44100,
+                            chunk_size: int = 1024, seconds: float = 10.0) -> dict:
+    """Measure CPU time per second of audio for the deque and ring-buffer delay paths"""
+    delay_samples = max(1, int(delay_ms * sample_rate / 1000))
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-1.0, 1.0, int(seconds * sample_rate)).astype(np.float32)
+    chunks = [audio[i:i + chunk_size] for i in range(0, len(audio), chunk_size)]
+
+    delay_buffer = deque([0.0] * delay_samples, maxlen=delay_samples)
+    start = time.process_time()
+    deque_output = [_deque_delay_reference(delay_buffer, chunk) for chunk in chunks]
+    deque_cpu = time.process_time() - start
+
+    delay_line = DelayLine(delay_samples - 1, max_block_size=chunk_size)
+    out = np.empty(chunk_size, dtype=np.float32)
+    ring_output = []
+    start = time.process_time()
+    for chunk in chunks:
+        ring_output.append(delay_line.process(chunk, out[:len(chunk)]).copy())
+    ring_cpu = time.process_time() - start
+
+    return {
+        'seconds_of_audio': len(audio) / sample_rate,
+        'deque_cpu_per_second': deque_cpu / seconds,
+        'ring_cpu_per_second': ring_cpu / seconds,
+        'identical': all(np.array_equal(a, b) for a, b in zip(deque_output, ring_output)),
+    }
+
+
+def _biquad_reference(coefficients: tuple, audio: np.ndarray) -> np.ndarray:
+    """Per-sample transposed direct form II biquad, kept as a reference for benchmarking"""
+    b0, b1, b2, a1, a2 = coefficients
+    z1 = z2 = 0.0
+    output = np.zeros(len(audio))
+    for i, x in enumerate(audio.astype(np.float64)):
+        y = b0 * x + z1
+        z1 = b1 * x - a1 * y + z2
+        z2 = b2 * x - a2 * y
+        output[i] = y
+    return output
+
+
+def benchmark_dsp_chain(sample_rate: int = 48000, chunk_size: int = 1024, seconds: float = 10.0) -> dict:
+    """Measure CPU time per second of audio for the full cleanup chain"""
+    rng = np.random.default_rng(0)
+    frames = int(seconds * sample_rate)
+    # Speech-like bursts over a quiet floor, loud enough for the limiter to work
+    envelope = np.where(np.sin(2 * np.pi * 1.5 * np.arange(frames) / sample_rate) > 0, 0.9, 0.002)
+    audio = (rng.uniform(-1.0, 1.0, frames) * envelope).astype(np.float32)
+
+    chain = build_dsp_chain(sample_rate, gain_db=6.0, highpass_hz=80.0, noise_gate_db=-50.0, limiter_db=-1.0)
+    processed = audio.copy()
+    start = time.process_time()
+    for i in range(0, frames, chunk_size):
+        chain.process(processed[i:i + chunk_size])
+    cpu = time.process_time() - start
+
+    # The block high-pass must match the per-sample recursion
+    check = audio[:sample_rate].copy()
+    highpass = HighPassFilter(80.0, sample_rate)
+    for i in range(0, len(check), chunk_size):
+        highpass.process(check[i:i + chunk_size])
+    reference = _biquad_reference(highpass.coefficients, audio[:sample_rate])
+
+    return {
+        'seconds_of_audio': frames / sample_rate,
+        'chain': chain.describe(),
+        'cpu_per_second': cpu / seconds,
+        'highpass_max_error': float(np.max(np.abs(check - reference))),
+        'peak_dbfs': 20 * np.log10(float(np.max(np.abs(processed)))),
+    }
+
+
+def run_benchmark(delay_ms: int, sample_rate: int, chunk_size: int):
+    """Print delay engine benchmark results"""
+    print(f"⏱️  Benchmarking delay engines ({delay_ms}ms delay, {sample_rate}Hz, {chunk_size}-frame chunks)")
+    results = benchmark_delay_engines(delay_ms, sample_rate, chunk_size)
+    print(f"   Audio processed:   {results['seconds_of_audio']:.1f}s")
+    print(f"   Deque loop:        {results['deque_cpu_per_second'] * 1000:.3f} ms CPU per second of audio")
+    print(f"   NumPy ring buffer: {results['ring_cpu_per_second'] * 1000:.3f} ms CPU per second of audio")
+    print(f"   Sample-identical:  {'yes' if results['identical'] else 'NO'}")
+    
+    dsp = benchmark_dsp_chain(48000, chunk_size)
+    print(f"⏱️  Benchmarking DSP chain (48000Hz, {chunk_size}-frame chunks)")
+    print(f"   Stages:            {dsp['chain']}")
+    print(f"   DSP chain:         {dsp['cpu_per_second'] * 1000:.3f} ms CPU per second of audio "
+          f"({dsp['cpu_per_second'] * 100:.2f}% of real time)")
+    print(f"   High-pass error:   {dsp['highpass_max_error']:.2e} vs per-sample biquad")
+    print(f"   Output peak:       {dsp['peak_dbfs']:.2f} dBFS (limiter at -1 dBFS)")
+
+
+def _pcm_to_float(data: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Convert interleaved little-endian PCM frames to float32 (frames[, channels])"""
+    if sample_width == 1:
+        audio = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        audio = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+        audio = samples.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        audio = np.frombuffer(data, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    return audio.reshape(-1, channels) if channels > 1 else audio
+
+
+def _float_to_pcm(audio: np.ndarray, sample_width: int) -> bytes:
+    """Convert float32 audio back to interleaved little-endian PCM bytes"""
+    if sample_width not in (1, 2, 3, 4):
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    # Same full-scale factor as _pcm_to_float, so unprocessed samples round-trip exactly
+    full_scale = float(1 << (8 * sample_width - 1))
+    samples = np.clip(np.round(audio.reshape(-1).astype(np.float64) * full_scale),
+                      -full_scale, full_scale - 1).astype('<i4')
+    if sample_width == 1:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if sample_width == 2:
+        return samples.astype('<i2').tobytes()
+    if sample_width == 3:
+        return samples.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.tobytes()
+
+
+def delay_wav_file(input_path: str, output_path: str, delay_ms: float, block_size: int = 4096,
+                   channel_map: Optional[List[int]] = None,
+                   channel_offsets_ms: Optional[List[float]] = None,
+                   trim: bool = False) -> dict:
+    """Stream a PCM WAV file through the delay line in fixed-size blocks.
+
+    Only one block is held in memory at a time. Unless trim is set, the
+    delayed tail is flushed so no audio is lost at the end of the file.
+    """
+    with wave.open(input_path, 'rb') as src:
+        channels = src.getnchannels()
+        sample_width = src.getsampwidth()
+        sample_rate = src.getframerate()
+        total_frames = src.getnframes()
+        if channel_map and max(channel_map) >= channels:
+            raise ValueError(f"Channel map refers to input channel {max(channel_map)}, "
+                             f"but the file has {channels} channel(s)")
+        output_channels = len(channel_map) if channel_map else channels
+        offsets = None
+        if channel_offsets_ms:
+            offsets = [int(ms * sample_rate / 1000) for ms in channel_offsets_ms]
+        delay_samples = ms_to_delay_samples(delay_ms, sample_rate)
+        delay_line = DelayLine(delay_samples, max_block_size=block_size,
+                               channels=output_channels, channel_offsets=offsets)
+        frame_shape = () if output_channels == 1 else (output_channels,)
+        out = np.empty((block_size,) + frame_shape, dtype=np.float32)
+        tail = delay_samples + (max(offsets) if offsets else 0)
+
+        start = time.process_time()
+        written = 0
+        with wave.open(output_path, 'wb') as dst:
+            dst.setnchannels(output_channels)
+            dst.setsampwidth(sample_width)
+            dst.setframerate(sample_rate)
+            while True:
+                data = src.readframes(block_size)
+                if not data:
+                    break
+                block = _pcm_to_float(data, sample_width, channels)
+                if channel_map:
+                    block = block.reshape(len(block), -1)[:, channel_map]
+                    block = block if output_channels > 1 else block.reshape(-1)
+                delayed = delay_line.process(block, out[:len(block)])
+                dst.writeframes(_float_to_pcm(delayed, sample_width))
+                written += len(block)
+
+            if not trim:
+                silence = np.zeros((block_size,) + frame_shape, dtype=np.float32)
+                while tail > 0:
+                    n = min(block_size, tail)
+                    delayed = delay_line.process(silence[:n], out[:n])
+                    dst.writeframes(_float_to_pcm(delayed, sample_width))
+                    written += n
+                    tail -= n
+        cpu = time.process_time() - start
+
+    return {
+        'input_frames': total_frames,
+        'output_frames': written,
+        'sample_rate': sample_rate,
+        'channels': output_channels,
+        'cpu_seconds': cpu,
+    }
+
+
+def run_offline(args):
+    """Delay a WAV file and print a summary"""
+    print(f"🎞️  Delaying {args.input_wav} by {args.delay}ms → {args.output_wav}")
+    try:
+        results = delay_wav_file(
+            args.input_wav,
+            args.output_wav,
+            args.delay,
+            block_size=args.buffer,
+            channel_map=args.channel_map,
+            channel_offsets_ms=args.channel_offsets,
+            trim=args.trim
+        )
+    except FileNotFoundError:
+        print(f"❌ File not found: {args.input_wav}")
+        sys.exit(1)
+    except (wave.Error, ValueError) as e:
+        print(f"❌ Cannot process {args.input_wav}: {e}")
+        sys.exit(1)
+    
+    duration = results['input_frames'] / results['sample_rate']
+    speed = duration / results['cpu_seconds'] if results['cpu_seconds'] > 0 else float('inf')
+    print(f"✅ Wrote {results['output_frames']} frames ({results['channels']} channel(s), {results['sample_rate']}Hz)")
+    print(f"⏱️  {duration:.1f}s of audio in {results['cpu_seconds']:.2f}s CPU ({speed:.0f}x real time)")
+
+
+DEFAULT_CHUNK_SIZE = 1024
+TUNE_CHUNK_SIZES = (64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _profile_path() -> str:
+    """Location of the saved per-device tuning profiles"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(config_home, 'virtual-mic-delay', 'profiles.json')
+
+
+def _profile_key(input_name: str, output_name: str, sample_rate: int, engine: str) -> str:
+    return f"{input_name} -> {output_name} @ {sample_rate}Hz ({engine})"
+
+
+def _load_profiles() -> dict:
+    try:
+        with open(_profile_path()) as f:
+            profiles = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return profiles if isinstance(profiles, dict) else {}
+
+
+def load_device_profile(input_name: str, output_name: str, sample_rate: int, engine: str) -> Optional[dict]:
+    """Saved auto-tune profile for a device pair, or None"""
+    return _load_profiles().get(_profile_key(input_name, output_name, sample_rate, engine))
+
+
+def save_device_profile(input_name: str, output_name: str, sample_rate: int, engine: str,
+                        profile: dict) -> str:
+    """Store an auto-tune profile for a device pair; returns the profile file path"""
+    path = _profile_path()
+    profiles = _load_profiles()
+    profiles[_profile_key(input_name, output_name, sample_rate, engine)] = profile
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write next to the target and rename so a crash never leaves half a file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _histogram_quantile(before: dict, after: dict, quantile: float) -> float:
+    """Upper bucket bound below which quantile of the chunks between two snapshots fell"""
+    buckets = after['chunk_seconds_buckets']
+    total = after['chunks'] - before['chunks']
+    for bound, count in buckets.items():
+        if count - before['chunk_seconds_buckets'][bound] >= quantile * total:
+            return float(bound)
+    return float('inf')
+
+
+def measure_chunk_size(chunk_size: int, seconds: float = 3.0, warmup_seconds: float = 0.5,
+                       **mic_kwargs) -> dict:
+    """Run the real pipeline at one chunk size and report its stability.
+
+    Xruns and processing times are counted after a warm-up, so stream start
+    transients do not count against the buffer size. A chunk size is stable
+    when nothing under- or overran and 99% of chunks were processed within
+    half of the chunk period.
+    """
+    virtual_mic = VirtualMicrophone(chunk_size=chunk_size, **mic_kwargs)
+    period = chunk_size / virtual_mic.sample_rate
+    # Trials run the normal engine; keep its status lines out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        virtual_mic.start()
+        time.sleep(warmup_seconds)
+        before = virtual_mic.metrics_snapshot()
+        time.sleep(seconds)
+        after = virtual_mic.metrics_snapshot()
+        running = bool(virtual_mic.is_running())
+        virtual_mic.stop()
+    xruns = (after['input_overflows'] + after['output_underruns']
+             - before['input_overflows'] - before['output_underruns'])
+    chunks = after['chunks'] - before['chunks']
+    p99 = _histogram_quantile(before, after, 0.99) if chunks else float('inf')
+    mean = (after['chunk_seconds_sum'] - before['chunk_seconds_sum']) / chunks if chunks else float('inf')
+    return {
+        'chunk_size': chunk_size,
+        'period_ms': period * 1000,
+        'xruns': xruns,
+        'chunks': chunks,
+        'mean_ms': mean * 1000,
+        'p99_ms': p99 * 1000,
+        'stable': running and chunks > 0 and xruns == 0 and p99 <= period / 2,
+    }
+
+
+def auto_tune_chunk_size(start_chunk_size: int = DEFAULT_CHUNK_SIZE, seconds: float = 3.0,
+                         on_trial=None, **mic_kwargs):
+    """Find the smallest stable chunk size, walking down from start or up until stable.
+
+    Returns (chunk_size, trials); chunk_size is None when no candidate was stable.
+    """
+    sizes = sorted(set(TUNE_CHUNK_SIZES) | {start_chunk_size})
+    index = sizes.index(start_chunk_size)
+    trials = []
+
+    def trial(i):
+        result = measure_chunk_size(sizes[i], seconds=seconds, **mic_kwargs)
+        trials.append(result)
+        if on_trial is not None:
+            on_trial(result)
+        return result['stable']
+
+    if trial(index):
+        # Walk down while smaller buffers stay stable
+        best = sizes[index]
+        while index > 0 and trial(index - 1):
+            index -= 1
+            best = sizes[index]
+        return best, trials
+    # Walk up until a buffer holds
+    while index + 1 < len(sizes):
+        index += 1
+        if trial(index):
+            return sizes[index], trials
+    return None, trials
+
+
+def run_auto_tune(args, input_name: str, output_name: str):
+    """Benchmark the chosen devices, pick the smallest stable buffer and save it as their profile"""
+    start = args.buffer if args.buffer is not None else DEFAULT_CHUNK_SIZE
+    print(f"🎛️  Auto-tuning buffer size for '{input_name}' → '{output_name}' "
+          f"({args.engine} engine, {args.rate}Hz, {args.tune_seconds:g}s per trial)")
+
+    def report(result):
+        verdict = "stable  " if result['stable'] else "unstable"
+        print(f"   {result['chunk_size']:5d} frames ({result['period_ms']:5.1f}ms): {verdict} - "
+              f"xruns {result['xruns']}, processing p99 ≤ {result['p99_ms']:.2f}ms, "
+              f"mean {result['mean_ms']:.3f}ms")
+
+    best, trials = auto_tune_chunk_size(
+        start,
+        seconds=args.tune_seconds,
+        on_trial=report,
+        delay_ms=args.delay,
+        sample_rate=args.rate,
+        input_device=args.input_device,
+        output_device=args.output_device,
+        engine=args.engine,
+        channels=args.channels,
+        channel_map=args.channel_map,
+        channel_offsets_ms=args.channel_offsets,
+        drift_compensation=args.drift_compensation,
+        **_dsp_kwargs(args)
+    )
+    if best is None:
+        print("❌ No buffer size ran without xruns - check CPU load and device settings")
+        sys.exit(1)
+    print(f"✅ Smallest stable buffer: {best} frames ({best / args.rate * 1000:.1f}ms per chunk)")
+    path = save_device_profile(input_name, output_name, args.rate, args.engine, {
+        'chunk_size': best,
+        'tuned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'trials': trials,
+    })
+    print(f"💾 Saved profile to {path}")
+    print("💡 Later launches with these devices use it unless -b is given")
+
+
+def _dsp_kwargs(args) -> dict:
+    """VirtualMicrophone cleanup-chain settings from the command line"""
+    return {
+        'gain_db': args.gain,
+        'highpass_hz': args.highpass,
+        'noise_gate_db': args.noise_gate,
+        'limiter_db': args.limiter,
+    }
+
+
+def _trace_chunk_allocations(step, chunks: int, warmup_chunks: int):
+    """Run step under tracemalloc; returns (bytes retained in steady state, largest transient)"""
+    for _ in range(warmup_chunks):
+        step()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # Warm up again under tracing, so objects replaced per chunk are traced on both sides
+        for _ in range(warmup_chunks):
+            step()
+        largest = before = midpoint = 0
+        measured = itertools.repeat(None, chunks)
+        for index, _ in enumerate(measured):
+            if index == chunks // 2:
+                # One-off objects settle in the first half; growth shows in the second
+                midpoint = tracemalloc.get_traced_memory()[0]
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            step()
+            largest = max(largest, tracemalloc.get_traced_memory()[1] - before)
+        retained = tracemalloc.get_traced_memory()[0] - midpoint
     finally:
-        p.terminate()
+        tracemalloc.stop()
+    return retained, largest
+
+
+def _engine_chunk_step(engine: str, chunk_size: int, **mic_kwargs):
+    """Build a VirtualMicrophone and return a function that runs one chunk through its engine path"""
+    mic = VirtualMicrophone(chunk_size=chunk_size, engine=engine, **mic_kwargs)
+    mic._allocate_engine_buffers()
+    rng = np.random.default_rng(0)
+    in_data = rng.uniform(-0.5, 0.5, chunk_size * mic.input_channels).astype(np.float32).tobytes()
+    if engine == "callback":
+        mic._prepare_fifo()
+
+        def step():
+            mic._input_callback(in_data, chunk_size, None, 0)
+            mic._output_callback(None, chunk_size, None, 0)
+    elif engine == "duplex":
+        def step():
+            mic._duplex_callback(in_data, chunk_size, None, 0)
+    else:
+        def step():
+            mic._process_block(mic._to_frames(in_data))
+    return step, chunk_size * mic.output_channels * 4
+
+
+def measure_steady_state_allocations(engine: str = "blocking", chunk_size: int = 256,
+                                     chunks: int = 2000, warmup_chunks: int = 200,
+                                     **mic_kwargs) -> dict:
+    """Run an engine's per-chunk path under tracemalloc, without streams.
+
+    The engine's own chunk methods are driven directly with a prebuilt input
+    buffer, so backend I/O does not count. A path counts as allocation-free
+    when the heap does not grow in steady state and the largest per-chunk
+    allocation does not grow with the block, i.e. no audio buffer is
+    allocated per chunk; the path is run at the chunk size and at four times
+    that size to tell the two apart.
+
+    The transient bytes that remain (a few hundred per chunk) are object
+    headers, not sample data: the ndarray that np.frombuffer wraps around the
+    incoming bytes (112 B), one 96 B view (160 B for 2-D blocks) per slice
+    the delay line, FIFO and cleanup chain take, and ints past CPython's
+    small-int cache for ring positions (about 32 B each). All of them are
+    freed before the chunk returns, so none reach the garbage collector.
+    """
+    step, block_bytes = _engine_chunk_step(engine, chunk_size, **mic_kwargs)
+    retained, largest = _trace_chunk_allocations(step, chunks, warmup_chunks)
+    step, _ = _engine_chunk_step(engine, chunk_size * 4, **mic_kwargs)
+    retained_large, largest_large = _trace_chunk_allocations(step, chunks // 4, warmup_chunks)
+    scaling = largest_large - largest
+    # Scalars changing size leave a few bytes of jitter; anything kept per
+    # chunk would add at least one 16-byte block per chunk
+    retained_per_chunk = max(retained / (chunks // 2), retained_large / (chunks // 8))
+    return {
+        'engine': engine,
+        'chunks': chunks,
+        'retained_bytes_per_chunk': retained_per_chunk,
+        'largest_transient_bytes': largest,
+        'block_scaling_bytes': scaling,
+        'block_bytes': block_bytes,
+        'allocation_free': retained_per_chunk < 1.0 and scaling < block_bytes,
+    }
+
+
+def run_allocation_check(args) -> bool:
+    """Print steady-state allocations for every engine; returns True when all are allocation-free"""
+    print(f"🧮 Steady-state allocations per chunk ({args.buffer}-frame chunks, tracemalloc)")
+    passed = True
+    for engine in ("blocking", "callback", "duplex"):
+        result = measure_steady_state_allocations(
+            engine,
+            chunk_size=args.buffer,
+            delay_ms=args.delay,
+            sample_rate=args.rate,
+            channels=args.channels,
+            channel_map=args.channel_map if engine != "duplex" else None,
+            channel_offsets_ms=args.channel_offsets,
+            **_dsp_kwargs(args)
+        )
+        status = "✅" if result['allocation_free'] else "❌"
+        print(f"   {status} {engine:8s} retained {max(0.0, result['retained_bytes_per_chunk']):.1f} B/chunk, "
+              f"largest transient {result['largest_transient_bytes']} B, "
+              f"{result['block_scaling_bytes']:+d} B at 4x the block (one block is {result['block_bytes']} B)")
+        passed = passed and result['allocation_free']
+    return passed
+
+
+def run_load_test(args):
+    """Drive VirtualMicrophone against the fake backend at many times real time"""
+    backend = _fake_backend_from_args(args, speed=args.load_test)
+    set_audio_backend(lambda: backend)
+    print(f"🏋️  Load test: {args.load_seconds:g}s of audio at {args.load_test:g}x real time "
+          f"({args.engine} engine, {args.buffer}-frame chunks, {args.rate}Hz)")
+    
+    virtual_mic = VirtualMicrophone(
+        delay_ms=args.delay,
+        sample_rate=args.rate,
+        chunk_size=args.buffer,
+        input_device=0,
+        output_device=1,
+        engine=args.engine,
+        channels=args.channels,
+        channel_map=args.channel_map,
+        channel_offsets_ms=args.channel_offsets,
+        drift_compensation=args.drift_compensation,
+        record_path=args.record,
+        **_dsp_kwargs(args)
+    )
+    
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    virtual_mic.start()
+    exporter = _start_metrics_exporter(args, virtual_mic)
+    deadline = wall_start + args.load_seconds / args.load_test
+    while virtual_mic.is_running() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    virtual_mic.stop()
+    if exporter is not None:
+        exporter.stop()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    
+    audio_seconds = sum(stream.output_frames for stream in backend.streams) / args.rate
+    print(f"   Audio delivered: {audio_seconds:.1f}s in {wall:.2f}s wall ({audio_seconds / wall:.1f}x real time)")
+    if audio_seconds > 0:
+        print(f"   CPU cost:        {cpu / audio_seconds * 1000:.2f} ms per second of audio")
+
+
+def _fake_backend_from_args(args, speed: float = 1.0) -> 'FakeAudioBackend':
+    """Build a fake backend from the --fake-* options"""
+    return FakeAudioBackend(
+        speed=speed,
+        jitter_ms=args.fake_jitter,
+        disconnect_after=args.fake_disconnect_after,
+        reconnect_after=args.fake_reconnect_after,
+        overflow_every=args.fake_overflow_every
+    )
+
+
+def run_drift_simulation(drift_ppm: float, sample_rate: int, chunk_size: int):
+    """Print offline clock-drift compensation results"""
+    print(f"🧪 Simulating {drift_ppm:+g} ppm input clock drift over 10 minutes ({sample_rate}Hz, {chunk_size}-frame chunks)")
+    for compensate in (False, True):
+        results = simulate_clock_drift(drift_ppm, 600.0, sample_rate, chunk_size, compensate=compensate)
+        label = "Compensated:  " if compensate else "Uncompensated:"
+        print(f"   {label} max delay error {results['max_delay_error_ms']:.2f}ms, "
+              f"estimated drift {results['estimated_ppm']:+.1f} ppm, "
+              f"underruns {results['underruns']}, overruns {results['overruns']}")
+
+
+class SPSCRingBuffer:
+    """Preallocated single-producer/single-consumer frame FIFO.
+
+    The producer only advances the write counter and the consumer only
+    advances the read counter, so the input and output callback threads can
+    hand audio over without taking a lock.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self._capacity = int(capacity)
+        frame_shape = () if channels == 1 else (channels,)
+        self._buffer = np.zeros((self._capacity,) + frame_shape, dtype=np.float32)
+        self._write_count = 0
+        self._read_count = 0
+
+    def available(self) -> int:
+        """Number of frames ready to be read"""
+        return self._write_count - self._read_count
+
+    def free(self) -> int:
+        """Number of frames that can be written without overwriting unread data"""
+        return self._capacity - self.available()
+
+    def write(self, data: np.ndarray) -> int:
+        """Copy as much of data as fits and return the number of frames written"""
+        n = min(len(data), self.free())
+        start = self._write_count % self._capacity
+        first = min(n, self._capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        self._buffer[:n - first] = data[first:n]
+        # Publish only after the samples are in place
+        self._write_count += n
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Fill out with up to len(out) frames and return how many were read"""
+        n = min(len(out), self.available())
+        start = self._read_count % self._capacity
+        first = min(n, self._capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        out[first:n] = self._buffer[:n - first]
+        self._read_count += n
+        return n
+
+
+class BlockBytes:
+    """Read-only byte views of a preallocated block buffer.
+
+    Streams and PortAudio callbacks accept any read-only bytes-like object
+    and copy it straight into the device buffer, so handing them a view
+    replaces a ``tobytes()`` copy per chunk. The full-chunk view is created
+    once, so steady-state chunks build no new objects here.
+    """
+
+    def __init__(self, buffer: np.ndarray, chunk_size: int):
+        self._all = memoryview(buffer).cast('B').toreadonly()
+        self._frame_bytes = buffer.itemsize * (buffer.shape[1] if buffer.ndim > 1 else 1)
+        self._chunk_bytes = chunk_size * self._frame_bytes
+        self._chunk = self._all[:self._chunk_bytes]
+
+    def frames(self, count: int) -> memoryview:
+        """View of the first count frames"""
+        nbytes = count * self._frame_bytes
+        return self._chunk if nbytes == self._chunk_bytes else self._all[:nbytes]
+
+
+class DriftCompensator:
+    """Clock-drift monitor with a vectorized fractional resampler.
+
+    The input and output devices run on independent clocks, so the FIFO
+    between them slowly fills or drains. The compensator learns the FIFO's
+    natural fill level during a short warm-up, then turns any deviation from
+    it into a small rate correction (in ppm) with a PI controller and
+    resamples each input block by that ratio using linear interpolation over
+    the whole block at once.
+
+    Fill is sampled on the input side and corrected for the output frames
+    consumed since the last output callback, so the estimate does not depend
+    on the phase between the two callback clocks.
+    """
+
+    def __init__(self, sample_rate: int, max_block_size: int = 1024, channels: int = 1,
+                 warmup_seconds: float = 1.0, max_correction_ppm: float = 2000.0):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_correction_ppm = max_correction_ppm
+        self.correction_ppm = 0.0
+        self.drift_ppm = 0.0
+        self.min_correction_ppm = 0.0
+        self.max_correction_ppm_seen = 0.0
+        self.fill_error_ms = 0.0
+        self.max_fill_error_ms = 0.0
+        self.target_fill = None
+
+        self._warmup_frames = int(warmup_seconds * sample_rate)
+        self._seen_frames = 0
+        self._warmup_fill_sum = 0.0
+        self._warmup_blocks = 0
+        self._smoothed_fill = 0.0
+        self._integral_ppm = 0.0
+        self._last_output_time = None
+
+        # Resampler state: ext[0] holds the previous block's last frame so
+        # interpolation is continuous across blocks; _position is where the
+        # next output frame falls in ext coordinates
+        frame_shape = () if channels == 1 else (channels,)
+        max_out = 2 * max_block_size + 2
+        self._ext = np.zeros((max_block_size + 2,) + frame_shape, dtype=np.float32)
+        self._position = 1.0
+        self._steps = np.arange(max_out, dtype=np.float64)
+        self._positions = np.empty(max_out, dtype=np.float64)
+        self._floor = np.empty(max_out, dtype=np.float64)
+        self._index = np.empty(max_out, dtype=np.intp)
+        self._frac = np.empty(max_out, dtype=np.float32)
+        self._next = np.empty((max_out,) + frame_shape, dtype=np.float32)
+
+    def relearn(self):
+        """Re-learn the target fill, e.g. after the input stream was reopened at a new phase.
+
+        The integral term and the drift estimate are kept, so an established
+        correction carries over while the new target is measured.
+        """
+        self.target_fill = None
+        self._seen_frames = 0
+        self._warmup_fill_sum = 0.0
+        self._warmup_blocks = 0
+
+    def note_output(self, now: float):
+        """Record when the output side last drained the FIFO"""
+        self._last_output_time = now
+
+    def update(self, fill: int, block_frames: int, now: float):
+        """Feed the FIFO fill level seen by the input side and refresh the rate correction"""
+        if self._last_output_time is not None:
+            fill -= (now - self._last_output_time) * self.sample_rate
+        self._seen_frames += block_frames
+        if self.target_fill is None:
+            self._warmup_fill_sum += fill
+            self._warmup_blocks += 1
+            if self._seen_frames >= self._warmup_frames:
+                self.target_fill = self._warmup_fill_sum / self._warmup_blocks
+                self._smoothed_fill = self.target_fill
+            return
+
+        dt = block_frames / self.sample_rate
+        # Smooth callback timing jitter with a ~0.2 s time constant
+        alpha = min(1.0, dt / 0.2)
+        self._smoothed_fill += alpha * (fill - self._smoothed_fill)
+        self.fill_error_ms = (self._smoothed_fill - self.target_fill) * 1000 / self.sample_rate
+        self.max_fill_error_ms = max(self.max_fill_error_ms, abs(self.fill_error_ms))
+
+        # PI controller (ppm per ms of fill error): a fuller FIFO means the
+        # input clock runs fast. Gains settle a step in drift within ~10 s.
+        self._integral_ppm += 100.0 * self.fill_error_ms * dt
+        self._integral_ppm = min(max(self._integral_ppm, -self.max_correction_ppm), self.max_correction_ppm)
+        ppm = 400.0 * self.fill_error_ms + self._integral_ppm
+        self.correction_ppm = min(max(ppm, -self.max_correction_ppm), self.max_correction_ppm)
+        self.min_correction_ppm = min(self.min_correction_ppm, self.correction_ppm)
+        self.max_correction_ppm_seen = max(self.max_correction_ppm_seen, self.correction_ppm)
+        # The long-run average correction is the drift estimate
+        self.drift_ppm += min(1.0, dt / 10.0) * (self.correction_ppm - self.drift_ppm)
+
+    def stats(self) -> dict:
+        """Drift statistics for reporting"""
+        return {
+            'drift_ppm': self.drift_ppm,
+            'correction_ppm': self.correction_ppm,
+            'min_correction_ppm': self.min_correction_ppm,
+            'max_correction_ppm': self.max_correction_ppm_seen,
+            'delay_error_ms': self.fill_error_ms,
+            'max_delay_error_ms': self.max_fill_error_ms,
+        }
+
+    def process(self, block: np.ndarray, out: np.ndarray) -> int:
+        """Resample block by the current correction into out; returns frames written"""
+        n = len(block)
+        if n == 0:
+            return 0
+        # Input frames consumed per output frame
+        step = 1.0 / (1.0 - self.correction_ppm * 1e-6)
+        ext = self._ext
+        ext[1:n + 1] = block
+        ext[n + 1] = block[-1]
+
+        m = int((n - self._position) // step) + 1 if self._position <= n else 0
+        positions = self._positions[:m]
+        np.multiply(self._steps[:m], step, out=positions)
+        np.add(positions, self._position, out=positions)
+        floor = self._floor[:m]
+        np.floor(positions, out=floor)
+        index = self._index[:m]
+        np.copyto(index, floor, casting='unsafe')
+        frac = self._frac[:m]
+        np.subtract(positions, floor, out=frac, casting='unsafe')
+
+        # out = ext[i] + (ext[i + 1] - ext[i]) * frac
+        current = out[:m]
+        nxt = self._next[:m]
+        np.take(ext, index, axis=0, out=current, mode='clip')
+        np.add(index, 1, out=index)
+        np.take(ext, index, axis=0, out=nxt, mode='clip')
+        np.subtract(nxt, current, out=nxt)
+        if self.channels > 1:
+            # Column by column: a broadcast multiply would buffer a copy of the block
+            for channel in range(self.channels):
+                np.multiply(nxt[:, channel], frac, out=nxt[:, channel])
+        else:
+            np.multiply(nxt, frac, out=nxt)
+        np.add(current, nxt, out=current)
+
+        self._position += m * step - n
+        ext[0] = block[-1]
+        return m
+
+
+def simulate_clock_drift(drift_ppm: float = 100.0, seconds: float = 300.0,
+                         sample_rate: int = 44100, chunk_size: int = 512,
+                         compensate: bool = True, jitter_ms: float = 0.5) -> dict:
+    """Run the callback FIFO offline with an input clock drift_ppm faster than the output"""
+    input_rate = sample_rate * (1 + drift_ppm * 1e-6)
+    rng = np.random.default_rng(0)
+    fifo = SPSCRingBuffer(chunk_size * 16)
+    # Two chunks of cushion leave room for the resampler's +/-1 frame blocks
+    fifo.write(np.zeros(chunk_size * 2, dtype=np.float32))
+    compensator = DriftCompensator(sample_rate, max_block_size=chunk_size)
+    block = np.zeros(chunk_size, dtype=np.float32)
+    resampled = np.empty(chunk_size * 2 + 2, dtype=np.float32)
+    out = np.empty(chunk_size, dtype=np.float32)
+
+    underruns = overruns = 0
+    in_clock = out_clock = last_out_clock = 0.0
+    # Callbacks fire on their device clock plus scheduling jitter
+    next_in = next_out = 0.0
+    delays = []
+    while min(next_in, next_out) < seconds:
+        if next_in <= next_out:
+            # True queueing delay in frames: FIFO contents minus what the
+            # output device has played since its last callback
+            delays.append(fifo.available() - (in_clock - last_out_clock) * sample_rate)
+            data = block
+            if compensate:
+                compensator.update(fifo.available(), chunk_size, next_in)
+                data = resampled[:compensator.process(block, resampled)]
+            if fifo.write(data) < len(data):
+                overruns += 1
+            in_clock += chunk_size / input_rate
+            next_in = in_clock + rng.uniform(0, jitter_ms / 1000)
+        else:
+            if fifo.read_into(out) < chunk_size:
+                underruns += 1
+            compensator.note_output(next_out)
+            last_out_clock = out_clock
+            out_clock += chunk_size / sample_rate
+            next_out = out_clock + rng.uniform(0, jitter_ms / 1000)
+
+    # Compare the delay (averaged over 100 ms, once the first fifth of the
+    # run has settled) with the delay at the start
+    window = max(1, int(0.1 * sample_rate / chunk_size))
+    smoothed = np.convolve(np.array(delays, dtype=np.float64), np.ones(window) / window, mode='valid')
+    baseline = np.median(smoothed[:int(sample_rate / chunk_size)])
+    settled = smoothed[len(smoothed) // 5:]
+    return {
+        'drift_ppm': drift_ppm,
+        'estimated_ppm': compensator.drift_ppm if compensate else 0.0,
+        'max_delay_error_ms': float(np.max(np.abs(settled - baseline)) * 1000 / sample_rate),
+        'underruns': underruns,
+        'overruns': overruns,
+    }
+
+
+class RecordingTap:
+    """Safety recording of the emitted stream, written off the audio thread.
+
+    push() runs on the audio thread and only copies the block into a
+    lock-free SPSC ring. Frames that do not fit are dropped and counted, so
+    a disk stall can never block audio. A writer thread drains the ring in
+    large sequential writes: 24-bit WAV through the wave module, or FLAC
+    through soundfile when it is installed.
+    """
+
+    def __init__(self, path: str, sample_rate: int, channels: int = 1,
+                 buffer_seconds: float = 10.0, poll_interval: float = 0.25):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.format = 'flac' if path.lower().endswith('.flac') else 'wav'
+        if self.format == 'flac' and not SOUNDFILE_AVAILABLE:
+            raise RuntimeError("FLAC recording needs soundfile: pip3 install soundfile")
+        self._fifo = SPSCRingBuffer(int(buffer_seconds * sample_rate), channels=channels)
+        self._poll_interval = poll_interval
+        frame_shape = () if channels == 1 else (channels,)
+        # Drain up to a second per write, so disk writes stay large and sequential
+        self._scratch = np.empty((sample_rate,) + frame_shape, dtype=np.float32)
+        self._file = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.frames_written = 0
+        self.dropped_frames = 0      # audio thread: ring was full
+        self.discarded_frames = 0    # writer thread: the file stopped accepting data
+        self.error = None
+
+    def start(self):
+        """Open the output file and start the writer thread"""
+        if self.format == 'flac':
+            self._file = soundfile.SoundFile(self.path, 'w', samplerate=self.sample_rate,
+                                             channels=self.channels, format='FLAC', subtype='PCM_24')
+        else:
+            self._file = wave.open(self.path, 'wb')
+            self._file.setnchannels(self.channels)
+            self._file.setsampwidth(3)
+            self._file.setframerate(self.sample_rate)
+        self._thread = threading.Thread(target=self._run, name="RecordingWriter", daemon=True)
+        self._thread.start()
+
+    def push(self, block: np.ndarray):
+        """Queue a block for writing; never blocks (audio thread)"""
+        written = self._fifo.write(block)
+        if written < len(block):
+            self.dropped_frames += len(block) - written
+
+    def _run(self):
+        while not self._stop_event.wait(self._poll_interval):
+            self._drain()
+        self._drain()
+        try:
+            self._file.close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def _drain(self):
+        """Write everything queued so far"""
+        while True:
+            frames = self._fifo.read_into(self._scratch)
+            if not frames:
+                return
+            if self.error is not None:
+                self.discarded_frames += frames
+                continue
+            block = self._scratch[:frames]
+            try:
+                if self.format == 'flac':
+                    self._file.write(block)
+                else:
+                    self._file.writeframesraw(_float_to_pcm(block, 3))
+                self.frames_written += frames
+            except Exception as e:
+                # Keep draining so the audio thread sees the same backpressure as before
+                self.error = e
+                self.discarded_frames += frames
+                print(f"⚠️ Recording stopped: {e}")
+
+    def close(self):
+        """Flush everything queued and close the file"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def lost_frames(self) -> int:
+        return self.dropped_frames + self.discarded_frames
+
+    def report(self):
+        seconds = self.frames_written / self.sample_rate
+        line = f"💾 Recorded {seconds:.1f}s to {self.path}"
+        lost = self.lost_frames()
+        if lost:
+            line += f" ({lost} frames dropped, {lost / self.sample_rate:.2f}s)"
+        print(line)
+
+
+class AudioMetrics:
+    """Preallocated per-chunk processing-time histogram filled by the audio thread.
+
+    ``observe_chunk`` is the only call on the audio path: a bisect over a
+    short tuple of bucket bounds and a few in-place additions to a list
+    allocated up front. Snapshots are taken on the reader's thread.
+    """
+
+    # Upper bounds in seconds, Prometheus ``le`` style; the last bucket is +Inf
+    BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(self.BUCKETS) + 1)
+        self.chunks = 0
+        self.seconds_sum = 0.0
+        self.seconds_max = 0.0
+
+    def observe_chunk(self, seconds: float):
+        """Record the time spent processing one chunk"""
+        self.bucket_counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.chunks += 1
+        self.seconds_sum += seconds
+        if seconds > self.seconds_max:
+            self.seconds_max = seconds
+
+    def histogram(self) -> dict:
+        """Cumulative bucket counts keyed by upper bound (as strings, '+Inf' last)"""
+        counts = list(self.bucket_counts)
+        cumulative = {}
+        total = 0
+        for bound, count in zip(self.BUCKETS + (float('inf'),), counts):
+            total += count
+            cumulative['+Inf' if bound == float('inf') else repr(bound)] = total
+        return cumulative
 
 
 class VirtualMicrophone:
     """Virtual microphone with proper cleanup and thread management"""
     
     def __init__(self, delay_ms=200, sample_rate=44100, chunk_size=1024,
-                 input_device=None, output_device=None):
+                 input_device=None, output_device=None, engine="blocking",
+                 compensate_latency=False, channels=1, channel_map=None,
+                 channel_offsets_ms=None, max_delay_ms=None, fade_ms=20,
+                 drift_compensation=False, gain_db=0.0, highpass_hz=None,
+                 noise_gate_db=None, limiter_db=None, record_path=None):
         self.delay_ms = delay_ms
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         self.input_device = input_device
         self.output_device = output_device
+        self.engine = engine
+        self.compensate_latency = compensate_latency
+        self.measured_latency_ms = None
+        self.max_delay_ms = max(delay_ms, max_delay_ms if max_delay_ms is not None else 2000)
+        self.fade_ms = fade_ms
+        self._device_latency_ms = 0.0
+        self.drift_compensation = drift_compensation
+        self._drift = None
+        self._resample_buffer = None
+        
+        # Channel layout: output channel j carries input channel channel_map[j]
+        self.input_channels = channels
+        self.channel_map = list(channel_map) if channel_map else None
+        self.output_channels = len(self.channel_map) if self.channel_map else channels
+        if self.channel_map and max(self.channel_map) >= channels:
+            raise ValueError(f"Channel map refers to input channel {max(self.channel_map)}, "
+                             f"but only {channels} input channel(s) are open")
+        self.channel_offsets_ms = list(channel_offsets_ms) if channel_offsets_ms else None
+        self._channel_index = np.array(self.channel_map, dtype=np.intp) if self.channel_map else None
+        self._map_buffer = (
+            np.empty((chunk_size * 2, self.output_channels), dtype=np.float32)
+            if self.channel_map else None
+        )
+        
+        # Stream health counters
+        self.underruns = 0
+        self.overruns = 0
+        self.metrics = AudioMetrics()
         
         # Threading control
         self._stop_event = threading.Event()
@@ -111,158 +2113,782 @@ class VirtualMicrophone:
         self._pa = None
         self._input_stream = None
         self._output_stream = None
+        self._fifo = None
+        self._fifo_cushion = 0
+        self._callback_in_buffer = None
+        self._callback_out_buffer = None
+        self._callback_out_bytes = None
+        self._block_out = None
+        self._block_out_bytes = None
         
-        # Device monitoring
+        # Device monitoring runs on a watchdog thread; the audio thread only
+        # raises _watchdog_wake and leaves the failure in _stream_failure
         self._device_check_interval = 2.0  # Check every 2 seconds
-        self._last_device_check = 0
         self._last_alert_time = 0  # Track last alert to avoid spamming
         self._alert_cooldown = 30.0  # Wait 30 seconds between alerts
+        self._watchdog_thread = None
+        self._watchdog_wake = threading.Event()
+        self._device_lost = threading.Event()
+        self._stream_failure = None
         
-        # Calculate buffer size needed for delay
-        delay_samples = max(1, int(delay_ms * sample_rate / 1000))
-        buffer_list = [0.0] * delay_samples
-        self._delay_buffer = deque(buffer_list, maxlen=int(delay_samples))
+        # Hot-reconnect: while the input is detached the output keeps running
+        # and silence feeds the delay line; the watchdog reopens the device by
+        # name and hands the new stream over through _pending_input
+        self._active_engine = engine
+        self._input_device_name = None
+        self._output_device_name = None
+        self._input_detached = False
+        self._pending_input = None
+        self._reattach_requested = False
+        self._reattach_done = threading.Event()
+        self._restart_requested = False
+        self._silence = None
+        self._lost_at = None
+        self._dropped_at_loss = 0
+        self._reconnect_backoff_min = 0.25
+        self._reconnect_backoff_max = 4.0
+        self._reconnect_backoff = self._reconnect_backoff_min
+        self._next_reconnect_at = 0.0
+        self._reconnect_report = None
+        self.reconnect_times_ms = []
+        self.dropped_frames = 0
+        
+        self._delay_line = self._create_delay_line(delay_ms)
+        # Optional safety copy of the emitted stream, written off the audio thread
+        self.record_path = record_path
+        self._recorder = None
+        
+        # Optional cleanup after the delay, so no extra app hop is needed
+        self._dsp = build_dsp_chain(sample_rate, self.output_channels, gain_db=gain_db,
+                                    highpass_hz=highpass_hz, noise_gate_db=noise_gate_db,
+                                    limiter_db=limiter_db)
+    
+    def _delay(self, block: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Run a block through the delay line and the cleanup chain"""
+        delayed = self._delay_line.process(block, out)
+        if self._dsp is not None:
+            self._dsp.process(delayed)
+        return delayed
+    
+    def _create_delay_line(self, delay_ms: float) -> DelayLine:
+        """Build a delay line for the output channel layout"""
+        offsets = None
+        if self.channel_offsets_ms:
+            offsets = [int(ms * self.sample_rate / 1000) for ms in self.channel_offsets_ms]
+        return DelayLine(
+            self._delay_samples(delay_ms),
+            max_block_size=self.chunk_size,
+            channels=self.output_channels,
+            channel_offsets=offsets,
+            max_delay_samples=self._delay_samples(self.max_delay_ms),
+            fade_samples=int(self.fade_ms * self.sample_rate / 1000)
+        )
+    
+    def set_delay(self, delay_ms: float) -> float:
+        """Change the delay while running, crossfading to avoid clicks; returns the applied delay"""
+        delay_ms = min(max(0.0, delay_ms), self.max_delay_ms)
+        line_ms = delay_ms
+        if self.compensate_latency:
+            line_ms = max(0.0, delay_ms - self._device_latency_ms)
+        self._delay_line.set_delay(self._delay_samples(line_ms))
+        self.delay_ms = delay_ms
+        if self.measured_latency_ms is not None:
+            self.measured_latency_ms = line_ms + self._device_latency_ms
+        return delay_ms
+    
+    def _to_frames(self, data) -> np.ndarray:
+        """View raw float32 stream data as (frames, channels), routed through the channel map"""
+        audio = np.frombuffer(data, dtype=np.float32)
+        if self.input_channels > 1:
+            audio = audio.reshape(-1, self.input_channels)
+        if self._channel_index is None:
+            return audio
+        if audio.ndim == 1:
+            audio = audio.reshape(-1, 1)
+        routed = self._map_buffer[:len(audio)]
+        np.take(audio, self._channel_index, axis=1, out=routed, mode='clip')
+        return routed if self.output_channels > 1 else routed.reshape(-1)
+    
+    def _delay_samples(self, delay_ms: float) -> int:
+        """Convert a delay in milliseconds to delay-line samples"""
+        return ms_to_delay_samples(delay_ms, self.sample_rate)
     
     def _get_input_device_name(self) -> str:
         """Get the name of the input device"""
         if self.input_device is None:
             return "Default Device"
         
-        try:
-            if not self._pa:
-                self._pa = pyaudio.PyAudio()
-            device_info = self._pa.get_device_info_by_index(self.input_device)
-            return str(device_info.get('name', f'Device {self.input_device}'))
-        except Exception:
-            return f'Device {self.input_device}'
+        return _get_device_name(self.input_device, "input")
     
     def _check_input_device_available(self) -> bool:
         """Check if the input device is still available"""
         if self.input_device is None:
             return True  # Default device, assume available
         
+        pa = self._pa
+        if pa is None:
+            return True  # Streams not open yet - nothing to check
+        
         try:
-            if not self._pa:
-                self._pa = pyaudio.PyAudio()
-            
-            # Try to get device info - will fail if device is disconnected
-            device_info = self._pa.get_device_info_by_index(self.input_device)
+            # Ask the live backend - will fail if device is disconnected
+            device_info = pa.get_device_info_by_index(self.input_device)
             # Check if device has input channels
             max_input_channels = int(device_info.get('maxInputChannels', 0))
-            return max_input_channels > 0
+            available = max_input_channels > 0
         except Exception:
-            return False
+            available = False
+        if not available:
+            # The cached device table is stale once a device vanishes
+            get_device_registry().invalidate()
+        return available
+    
+    def _check_device_health(self, current_time: float):
+        """Warn (and alert on macOS) when the input device disappears or comes back"""
+        if self._input_detached:
+            return  # Already lost; the reconnect logic owns the device now
+        available = self._check_input_device_available()
+        if not available and not self._device_lost.is_set():
+            self._device_lost.set()
+            device_name = self._get_input_device_name()
+            print(f"⚠️ WARNING: Microphone '{device_name}' has been disconnected!")
+            print("🔧 Please reconnect your microphone or restart the application")
+            print("🛑 Continuing with silence until device is reconnected...")
+            self._raise_alert(
+                current_time,
+                "Microphone Disconnected",
+                f"The microphone '{device_name}' has been disconnected. Please reconnect it or restart the application.",
+                "warning"
+            )
+        elif available and self._device_lost.is_set():
+            self._device_lost.clear()
+            print(f"✅ Microphone '{self._get_input_device_name()}' is available again")
+    
+    def _raise_alert(self, current_time: float, title: str, message: str, alert_type: str):
+        """Show a macOS alert on its own thread, rate-limited by the alert cooldown"""
+        if current_time - self._last_alert_time <= self._alert_cooldown:
+            return
+        self._last_alert_time = current_time
+        # The dialog blocks until dismissed (up to its timeout), so it must
+        # not hold up the watchdog, let alone the audio thread
+        threading.Thread(
+            target=show_macos_alert,
+            args=(title, message, alert_type),
+            name="DeviceAlert",
+            daemon=True
+        ).start()
+    
+    def _notify_stream_error(self, e: Exception):
+        """Hand a stream failure to the watchdog without blocking the audio thread"""
+        self._stream_failure = e
+        self._watchdog_wake.set()
+    
+    def _run_watchdog(self):
+        """Supervise device health and report stream failures off the audio path"""
+        while not self._stop_event.is_set():
+            timeout = self._device_check_interval
+            if self._input_detached:
+                timeout = min(timeout, max(0.01, self._next_reconnect_at - time.perf_counter()))
+            self._watchdog_wake.wait(timeout)
+            self._watchdog_wake.clear()
+            self._service_watchdog()
+        # Report a failure that arrived together with the stop request
+        self._service_watchdog()
+    
+    def _service_watchdog(self):
+        """Run one watchdog pass: report events, then reconnect or poll the device"""
+        failure, self._stream_failure = self._stream_failure, None
+        if failure is not None:
+            self._handle_stream_error(failure)
+        report, self._reconnect_report = self._reconnect_report, None
+        if report is not None:
+            elapsed_ms, dropped = report
+            self._device_lost.clear()
+            print(f"✅ Microphone '{self._input_device_name}' reconnected after {elapsed_ms:.0f}ms "
+                  f"({dropped / self.sample_rate:.2f}s replaced with silence)")
+        if self._stop_event.is_set():
+            return
+        now = time.perf_counter()
+        if self._input_detached:
+            if (self._pending_input is None and not self._restart_requested
+                    and now >= self._next_reconnect_at):
+                self._attempt_reconnect(now)
+        else:
+            self._check_device_health(time.time())
+    
+    def _handle_stream_error(self, e: Exception):
+        """Report an audio stream error, distinguishing device disconnects"""
+        error_str = str(e).lower()
+        # Check if this is a device disconnection or PortAudio/AUHAL error
+        is_device_error = (
+            "device" in error_str or 
+            "unavailable" in error_str or
+            "pamaccore" in error_str or
+            "auhal" in error_str or
+            "audio unit" in error_str or
+            "-10863" in error_str or
+            "cannot do in current context" in error_str
+        )
+        
+        if is_device_error:
+            device_name = self._get_input_device_name()
+            print(f"⚠️ WARNING: Microphone '{device_name}' appears to be disconnected!")
+            print("🔧 Please check your microphone connection")
+            print("🔄 Attempting to continue...")
+            
+            # Show macOS alert for device errors
+            self._raise_alert(
+                time.time(),
+                "Microphone Error",
+                f"The microphone '{device_name}' is not responding. Please check the connection.",
+                "error"
+            )
+        else:
+            print(f"❌ Audio processing error: {e}")
     
     def _process_audio(self):
         """Process audio in separate thread with proper cleanup"""
         try:
-            self._pa = pyaudio.PyAudio()
-            
-            # Input stream (physical microphone)
-            self._input_stream = self._pa.open(
-                format=pyaudio.paFloat32,
-                channels=1,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=self.chunk_size,
-                input_device_index=self.input_device
-            )
+            self._pa = create_audio_backend()
             
-            # Output stream (virtual audio device)
-            self._output_stream = self._pa.open(
-                format=pyaudio.paFloat32,
-                channels=1,
-                rate=self.sample_rate,
-                output=True,
-                frames_per_buffer=self.chunk_size,
-                output_device_index=self.output_device
-            )
+            engine = self.engine
+            if engine == "duplex" and not self._shares_host_api():
+                print("⚠️ Input and output devices use different host APIs - falling back to callback engine")
+                engine = "callback"
+            if engine == "duplex" and self.input_channels != self.output_channels:
+                print("⚠️ Duplex streams need matching input/output channel counts - falling back to callback engine")
+                engine = "callback"
+            self._active_engine = engine
             
-            print("🎤 Virtual microphone active - audio processing started")
+            # Reconnects look devices up by name, since indices shift on hotplug
+            self._input_device_name = _get_device_name(self.input_device, "input")
+            self._output_device_name = _get_device_name(self.output_device, "output")
+            self._allocate_engine_buffers()
             
             while not self._stop_event.is_set():
-                try:
-                    # Check if input device is still available (every 2 seconds)
-                    current_time = time.time()
-                    if current_time - self._last_device_check > self._device_check_interval:
-                        self._last_device_check = current_time
-                        if not self._check_input_device_available():
-                            device_name = self._get_input_device_name()
-                            print(f"⚠️ WARNING: Microphone '{device_name}' has been disconnected!")
-                            print("🔧 Please reconnect your microphone or restart the application")
-                            print("🛑 Continuing with silence until device is reconnected...")
-                            
-                            # Show macOS alert if enough time has passed since last alert
-                            if current_time - self._last_alert_time > self._alert_cooldown:
-                                show_macos_alert(
-                                    "Microphone Disconnected",
-                                    f"The microphone '{device_name}' has been disconnected. Please reconnect it or restart the application.",
-                                    "warning"
-                                )
-                                self._last_alert_time = current_time
-                    
-                    # Read from physical microphone with timeout
-                    input_data = self._input_stream.read(
-                        self.chunk_size, 
-                        exception_on_overflow=False
-                    )
-                    
-                    if self._stop_event.is_set():
-                        break
-                        
-                    input_audio = np.frombuffer(input_data, dtype=np.float32)
-                    
-                    # Process through delay buffer
-                    output_audio = np.zeros_like(input_audio)
-                    for i, sample in enumerate(input_audio):
-                        self._delay_buffer.append(sample)
-                        output_audio[i] = self._delay_buffer[0]
-                    
-                    # Write to virtual audio device
-                    if not self._stop_event.is_set():
-                        self._output_stream.write(output_audio.tobytes())
-                        
-                except Exception as e:
-                    if not self._stop_event.is_set():
-                        error_str = str(e).lower()
-                        # Check if this is a device disconnection or PortAudio/AUHAL error
-                        is_device_error = (
-                            "device" in error_str or 
-                            "unavailable" in error_str or
-                            "pamaccore" in error_str or
-                            "auhal" in error_str or
-                            "audio unit" in error_str or
-                            "-10863" in error_str or
-                            "cannot do in current context" in error_str
-                        )
-                        
-                        if is_device_error:
-                            device_name = self._get_input_device_name()
-                            print(f"⚠️ WARNING: Microphone '{device_name}' appears to be disconnected!")
-                            print("🔧 Please check your microphone connection")
-                            print("🔄 Attempting to continue...")
-                            
-                            # Show macOS alert for device errors
-                            current_time = time.time()
-                            if current_time - self._last_alert_time > self._alert_cooldown:
-                                show_macos_alert(
-                                    "Microphone Error",
-                                    f"The microphone '{device_name}' is not responding. Please check the connection.",
-                                    "error"
-                                )
-                                self._last_alert_time = current_time
-                        else:
-                            print(f"❌ Audio processing error: {e}")
+                if engine == "duplex" and self._input_detached:
+                    # A duplex stream cannot run without its input; wait and rescan
+                    self._stop_event.wait(self._reconnect_backoff)
+                    self._reconnect_backoff = min(self._reconnect_backoff * 2, self._reconnect_backoff_max)
+                elif engine == "duplex":
+                    self._run_duplex_engine()
+                elif engine == "callback":
+                    self._run_callback_engine()
+                else:
+                    self._run_blocking_engine()
+                if not self._restart_requested:
                     break
+                self._restart_streams()
                     
         except Exception as e:
             print(f"❌ Failed to initialize audio streams: {e}")
         finally:
             self._cleanup_streams()
+            self._report_xruns()
+    
+    def _open_input_stream(self, device_index: Optional[int]):
+        """Open (but do not start) the input stream for the running engine"""
+        kwargs = {}
+        if self._active_engine == "callback":
+            kwargs['stream_callback'] = self._input_callback
+        return self._pa.open(
+            format=PA_FLOAT32,
+            channels=self.input_channels,
+            rate=self.sample_rate,
+            input=True,
+            frames_per_buffer=self.chunk_size,
+            input_device_index=device_index,
+            start=False,
+            **kwargs
+        )
+    
+    def _run_blocking_engine(self):
+        """Read, delay and write each chunk on this thread with blocking stream calls"""
+        # Input stream (physical microphone); absent while reconnecting
+        if not self._input_detached:
+            self._input_stream = self._open_input_stream(self.input_device)
+        
+        # Output stream (virtual audio device)
+        self._output_stream = self._pa.open(
+            format=PA_FLOAT32,
+            channels=self.output_channels,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.chunk_size,
+            output_device_index=self.output_device
+        )
+        
+        if self._input_stream is not None:
+            self._input_stream.start_stream()
+        
+        if self.measured_latency_ms is None:
+            # Each blocking read hands over a whole chunk, which adds one chunk of queueing
+            self._apply_device_latency(
+                self._input_stream.get_input_latency()
+                + self._output_stream.get_output_latency()
+                + self.chunk_size / self.sample_rate
+            )
+            print("🎤 Virtual microphone active - audio processing started")
+        
+        silence = self._silence[:self.chunk_size]
+        period = self.chunk_size / self.sample_rate
+        silence_due = None  # output stream time at which the next silent chunk is due
+        last_write = None   # output stream time of the last write
+        while not self._stop_event.is_set() and not self._restart_requested:
+            try:
+                if self._pending_input is not None:
+                    self._attach_input(self._pending_input)
+                
+                if self._input_stream is None:
+                    # No microphone: clock silence through the delay line on the
+                    # output stream's own clock, keeping its queue depth unchanged
+                    if silence_due is None:
+                        silence_due = (last_write + period if last_write is not None
+                                       else self._output_stream.get_time())
+                    self._wait_for_stream_time(silence_due)
+                    silence_due += period
+                    input_audio = silence
+                    self.dropped_frames += self.chunk_size
+                else:
+                    silence_due = None
+                    # Read from physical microphone. Overflows are counted, and the
+                    # chunk PyAudio drops with the error is read again (see read_input)
+                    try:
+                        input_data, overflowed = read_input(self._input_stream, self.chunk_size)
+                    except IOError as e:
+                        if self._stop_event.is_set():
+                            break
+                        # The microphone is gone: keep the output running
+                        self._detach_input(e)
+                        continue
+                    if overflowed:
+                        self.overruns += 1
+                    input_audio = self._to_frames(input_data)
+                
+                if self._stop_event.is_set():
+                    break
+                
+                # Process through delay line
+                chunk_start = time.perf_counter()
+                output_data = self._process_block(input_audio)
+                self.metrics.observe_chunk(time.perf_counter() - chunk_start)
+                
+                # Write to virtual audio device
+                if not self._stop_event.is_set():
+                    try:
+                        self._output_stream.write(
+                            output_data,
+                            exception_on_underflow=True
+                        )
+                    except IOError as e:
+                        if getattr(e, 'errno', None) != PA_OUTPUT_UNDERFLOWED:
+                            raise
+                        self.underruns += 1
+                    last_write = self._output_stream.get_time()
+                    
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    self._notify_stream_error(e)
+                break
+    
+    def _process_block(self, input_audio: np.ndarray) -> memoryview:
+        """Delay a block into the preallocated output block and return its bytes for write()"""
+        frames = len(input_audio)
+        delayed = self._delay(input_audio, self._block_out[:frames])
+        if self._recorder is not None:
+            self._recorder.push(delayed)
+        return self._block_out_bytes.frames(frames)
+    
+    def _wait_for_stream_time(self, due: float):
+        """Block until the output stream's clock reaches due"""
+        poll = self.chunk_size / self.sample_rate / 8
+        while not self._stop_event.is_set() and self._output_stream.get_time() < due:
+            self._stop_event.wait(poll)
+    
+    def _allocate_block_buffer(self) -> np.ndarray:
+        """Preallocate a callback block buffer with room for oversized callbacks"""
+        frame_shape = () if self.output_channels == 1 else (self.output_channels,)
+        return np.empty((self.chunk_size * 2,) + frame_shape, dtype=np.float32)
+    
+    def _allocate_engine_buffers(self):
+        """Preallocate every block the engines touch per chunk, plus byte views for stream writes"""
+        self._silence = self._allocate_block_buffer()
+        self._silence.fill(0.0)
+        self._block_out = self._allocate_block_buffer()
+        self._block_out_bytes = BlockBytes(self._block_out, self.chunk_size)
+        self._callback_in_buffer = self._allocate_block_buffer()
+        self._callback_out_buffer = self._allocate_block_buffer()
+        self._callback_out_bytes = BlockBytes(self._callback_out_buffer, self.chunk_size)
+    
+    def _input_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio input callback: delay the block and hand it to the output side"""
+        if self._input_detached:
+            return (None, PA_CONTINUE)  # Reconnected, but not yet handed the delay line
+        chunk_start = time.perf_counter()
+        if status & PA_INPUT_OVERFLOW:
+            self.overruns += 1
+        input_audio = self._to_frames(in_data)
+        delayed = self._delay(input_audio, self._callback_in_buffer[:frame_count])
+        if self._drift is not None:
+            self._drift.update(self._fifo.available(), frame_count, chunk_start)
+            delayed = self._resample_buffer[:self._drift.process(delayed, self._resample_buffer)]
+        if self._fifo.write(delayed) < len(delayed):
+            self.overruns += 1
+        self.metrics.observe_chunk(time.perf_counter() - chunk_start)
+        return (None, PA_CONTINUE)
+    
+    def _output_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio output callback: drain delayed audio, padding with silence on underrun"""
+        if status & PA_OUTPUT_UNDERFLOW:
+            self.underruns += 1
+        if self._input_detached:
+            self._feed_silence(frame_count)
+        out = self._callback_out_buffer[:frame_count]
+        read = self._fifo.read_into(out)
+        if read < frame_count:
+            out[read:] = 0.0
+            self.underruns += 1
+        if self._drift is not None:
+            self._drift.note_output(time.perf_counter())
+        if self._recorder is not None:
+            self._recorder.push(out)
+        return (self._callback_out_bytes.frames(frame_count), PA_CONTINUE)
+    
+    def _feed_silence(self, frame_count: int):
+        """Stand in for the input callback while the microphone is gone"""
+        # Also restore the cushion lost while the failure went unnoticed, so
+        # the reopened input splices in at the original latency
+        frames = min(frame_count + max(0, self._fifo_cushion - self._fifo.available()),
+                     len(self._callback_in_buffer))
+        delayed = self._delay(self._silence[:frames], self._callback_in_buffer[:frames])
+        self._fifo.write(delayed)
+        self.dropped_frames += frames
+        if self._reattach_requested:
+            # The reopened input is already running; hand the delay line back
+            # to it at this block boundary
+            if self._drift is not None:
+                self._drift.relearn()
+            self._reattach_requested = False
+            self._input_detached = False
+            self._reattach_done.set()
+    
+    def _prepare_fifo(self) -> int:
+        """Create the FIFO between the callbacks and prime it; returns the cushion in chunks"""
+        self._fifo = SPSCRingBuffer(self.chunk_size * 8, channels=self.output_channels)
+        # Silence gives the output side a cushion before the first input
+        # callback lands; drift compensation needs a second chunk of room
+        # for resampled blocks that come out a frame short
+        cushion_chunks = 1
+        if self.drift_compensation:
+            cushion_chunks = 2
+            if self._drift is None:
+                self._drift = DriftCompensator(self.sample_rate, max_block_size=self.chunk_size * 2,
+                                               channels=self.output_channels)
+            frame_shape = () if self.output_channels == 1 else (self.output_channels,)
+            self._resample_buffer = np.empty((self.chunk_size * 4 + 2,) + frame_shape, dtype=np.float32)
+        self._callback_out_buffer.fill(0.0)
+        self._fifo_cushion = cushion_chunks * self.chunk_size
+        for _ in range(cushion_chunks):
+            self._fifo.write(self._callback_out_buffer[:self.chunk_size])
+        return cushion_chunks
+    
+    def _run_callback_engine(self):
+        """Run both streams in PortAudio callback mode joined by a lock-free FIFO"""
+        cushion_chunks = self._prepare_fifo()
+        
+        self._output_stream = self._pa.open(
+            format=PA_FLOAT32,
+            channels=self.output_channels,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.chunk_size,
+            output_device_index=self.output_device,
+            stream_callback=self._output_callback,
+            start=False
+        )
+        if not self._input_detached:
+            self._input_stream = self._open_input_stream(self.input_device)
+        
+        if self.measured_latency_ms is None:
+            # The FIFO cushion adds its chunks on top of the two device buffers
+            self._apply_device_latency(
+                self._input_stream.get_input_latency()
+                + self._output_stream.get_output_latency()
+                + cushion_chunks * self.chunk_size / self.sample_rate
+            )
+            print("🎤 Virtual microphone active - audio processing started (callback engine)")
+        
+        self._output_stream.start_stream()
+        if self._input_stream is not None:
+            self._input_stream.start_stream()
+        self._supervise_streams()
+    
+    def _duplex_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio full-duplex callback: delay the input block straight into the output"""
+        chunk_start = time.perf_counter()
+        if status & PA_INPUT_OVERFLOW:
+            self.overruns += 1
+        if status & PA_OUTPUT_UNDERFLOW:
+            self.underruns += 1
+        input_audio = self._to_frames(in_data)
+        delayed = self._delay(input_audio, self._callback_out_buffer[:frame_count])
+        if self._recorder is not None:
+            self._recorder.push(delayed)
+        self.metrics.observe_chunk(time.perf_counter() - chunk_start)
+        return (self._callback_out_bytes.frames(frame_count), PA_CONTINUE)
+    
+    def _run_duplex_engine(self):
+        """Run input and output on one full-duplex stream with the delay applied in its callback"""
+        # A single stream serves as both input and output stream
+        self._input_stream = self._pa.open(
+            format=PA_FLOAT32,
+            channels=self.input_channels,
+            rate=self.sample_rate,
+            input=True,
+            output=True,
+            frames_per_buffer=self.chunk_size,
+            input_device_index=self.input_device,
+            output_device_index=self.output_device,
+            stream_callback=self._duplex_callback,
+            start=False
+        )
+        
+        if self.measured_latency_ms is None:
+            self._apply_device_latency(
+                self._input_stream.get_input_latency()
+                + self._input_stream.get_output_latency()
+            )
+            print("🎤 Virtual microphone active - audio processing started (duplex engine)")
+        
+        self._input_stream.start_stream()
+        self._supervise_streams()
+    
+    def _supervise_streams(self):
+        """Keep callback-driven streams open until stopped, swapping in reconnected inputs"""
+        # Audio is moved by the PortAudio callbacks; device health is the watchdog's job.
+        # Polling once per chunk keeps the gap before a lost input is replaced short.
+        poll = min(0.1, self.chunk_size / self.sample_rate)
+        while not self._stop_event.wait(poll) and not self._restart_requested:
+            if self._pending_input is not None:
+                self._attach_input(self._pending_input)
+            input_stream = self._input_stream
+            if input_stream is not None and not input_stream.is_active():
+                self._detach_input(RuntimeError("Input device stream stopped unexpectedly"))
+            output_stream = self._output_stream
+            if output_stream is not None and not output_stream.is_active():
+                if not self._stop_event.is_set():
+                    self._notify_stream_error(RuntimeError("Audio device stream stopped unexpectedly"))
+                break
+    
+    def _detach_input(self, e: Exception):
+        """Drop a failed input stream; silence feeds the delay line until it is reopened"""
+        stream, self._input_stream = self._input_stream, None
+        if stream is self._pending_input:
+            # It died before the output callback handed the delay line over
+            self._pending_input = None
+            self._reattach_requested = False
+        if stream is not None:
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception:
+                pass
+        self._lost_at = time.perf_counter()
+        self._dropped_at_loss = self.dropped_frames
+        self._reconnect_backoff = self._reconnect_backoff_min
+        self._next_reconnect_at = self._lost_at + self._reconnect_backoff
+        self._input_detached = True
+        self._notify_stream_error(e)
+    
+    def _attach_input(self, stream):
+        """Splice a reopened input stream in where the silence left off"""
+        if self._input_stream is not stream:
+            stream.start_stream()
+            self._input_stream = stream
+        if self._active_engine == "callback" and self._input_detached:
+            # The output callback owns the delay line until it lets go
+            if not self._reattach_requested:
+                self._reattach_done.clear()
+                self._reattach_requested = True
+            if not self._reattach_done.wait(1.0):
+                # Handing over now would leave two producers on the FIFO; the
+                # request stands and the supervisor checks again next poll
+                return
+        self._input_detached = False
+        # Cleared last so the watchdog cannot open a second stream meanwhile
+        self._pending_input = None
+        self._record_reconnect()
+    
+    def _record_reconnect(self):
+        """Log reconnect time for the metrics and let the watchdog announce it"""
+        elapsed_ms = (time.perf_counter() - self._lost_at) * 1000 if self._lost_at else 0.0
+        self.reconnect_times_ms.append(elapsed_ms)
+        self._reconnect_report = (elapsed_ms, self.dropped_frames - self._dropped_at_loss)
+        self._lost_at = None
+        self._reconnect_backoff = self._reconnect_backoff_min
+        self._watchdog_wake.set()
+    
+    def _restart_streams(self):
+        """Reopen every stream on a fresh backend so hotplugged devices become visible"""
+        self._restart_requested = False
+        self._cleanup_streams()
+        self._pa = create_audio_backend()
+        registry = get_device_registry()
+        registry.refresh()
+        output_index = registry.find_device(self._output_device_name, "output")
+        if output_index is not None:
+            self.output_device = output_index
+        input_index = registry.find_device(self._input_device_name, "input")
+        if input_index is None:
+            return
+        self.input_device = input_index
+        if self._active_engine == "duplex" and self._lost_at is not None:
+            # The output went down with the input; let silence cover the gap
+            # so stale audio from before the drop does not resume
+            gap = int((time.perf_counter() - self._lost_at) * self.sample_rate)
+            self._fill_silence(min(gap, self._delay_line.max_delay_samples + self.chunk_size))
+            self.dropped_frames += gap
+        self._input_detached = False
+        self._record_reconnect()
+    
+    def _fill_silence(self, frames: int):
+        """Push frames of silence through the delay line while no stream is running"""
+        scratch = self._allocate_block_buffer()[:self.chunk_size]
+        while frames > 0:
+            n = min(frames, self.chunk_size)
+            self._delay_line.process(self._silence[:n], scratch[:n])
+            frames -= n
+    
+    def _attempt_reconnect(self, now: float):
+        """Try to reopen the lost microphone by name, backing off on failure"""
+        pa = self._pa
+        if pa is None:
+            return
+        if self._active_engine == "duplex" or not pa.live_device_scan:
+            # Only a fresh backend sees replugged devices. Rebuilding the
+            # streams interrupts the output, so wait until the delayed audio
+            # from before the drop has played out.
+            if self._active_engine == "duplex" or now - self._lost_at >= self.delay_ms / 1000:
+                self._restart_requested = True
+            else:
+                self._next_reconnect_at = self._lost_at + self.delay_ms / 1000
+                return
+        else:
+            registry = get_device_registry()
+            try:
+                registry.refresh()
+            except Exception:
+                pass
+            index = registry.find_device(self._input_device_name, "input")
+            if index is not None:
+                try:
+                    self._pending_input = self._open_input_stream(index)
+                    self.input_device = index
+                    return
+                except Exception:
+                    pass
+        self._next_reconnect_at = now + self._reconnect_backoff
+        self._reconnect_backoff = min(self._reconnect_backoff * 2, self._reconnect_backoff_max)
+    
+    def _shares_host_api(self) -> bool:
+        """Check whether the input and output devices belong to the same host API"""
+        registry = get_device_registry()
+        try:
+            input_info = (
+                registry.default_device_info("input")
+                if self.input_device is None
+                else registry.device_info(self.input_device)
+            )
+            output_info = (
+                registry.default_device_info("output")
+                if self.output_device is None
+                else registry.device_info(self.output_device)
+            )
+        except Exception:
+            return False
+        if input_info is None or output_info is None:
+            return False
+        return int(input_info.get('hostApi', -1)) == int(output_info.get('hostApi', -2))
+    
+    def _apply_device_latency(self, device_latency: float):
+        """Report end-to-end latency and, if enabled, shorten the delay line to hit the target"""
+        device_ms = device_latency * 1000
+        self._device_latency_ms = device_ms
+        delay_ms = self.delay_ms
+        if self.compensate_latency:
+            delay_ms = max(0.0, self.delay_ms - device_ms)
+            self._delay_line = self._create_delay_line(delay_ms)
+            if device_ms > self.delay_ms:
+                print(f"⚠️ Device latency ({device_ms:.1f}ms) exceeds the requested delay - cannot compensate fully")
+        self.measured_latency_ms = delay_ms + device_ms
+        print(f"⏱️  Latency: {delay_ms:.1f}ms delay line + {device_ms:.1f}ms device = "
+              f"{self.measured_latency_ms:.1f}ms end-to-end")
+    
+    def _report_xruns(self):
+        """Print underrun/overrun counters for the session"""
+        print(f"📊 Underruns: {self.underruns}, Overruns: {self.overruns} ({self.engine} engine)")
+        if self.reconnect_times_ms or self.dropped_frames:
+            stats = self.reconnect_stats()
+            print(f"🔌 Reconnects: {stats['reconnects']} "
+                  f"(avg {stats['avg_reconnect_ms']:.0f}ms, max {stats['max_reconnect_ms']:.0f}ms), "
+                  f"dropped frames: {stats['dropped_frames']} ({stats['dropped_seconds']:.2f}s)")
+        if self._drift is not None:
+            stats = self._drift.stats()
+            print(f"📈 Clock drift: {stats['drift_ppm']:+.1f} ppm "
+                  f"(correction range {stats['min_correction_ppm']:+.1f} to {stats['max_correction_ppm']:+.1f} ppm, "
+                  f"max delay error {stats['max_delay_error_ms']:.2f}ms)")
+    
+    def metrics_snapshot(self) -> dict:
+        """Point-in-time health metrics; safe to call from any thread"""
+        fifo = self._fifo
+        drift = self._drift
+        recorder = self._recorder
+        return {
+            'timestamp': time.time(),
+            'engine': self._active_engine,
+            'running': bool(self.is_running()),
+            'chunks': self.metrics.chunks,
+            'chunk_seconds_sum': self.metrics.seconds_sum,
+            'chunk_seconds_max': self.metrics.seconds_max,
+            'chunk_seconds_buckets': self.metrics.histogram(),
+            'input_overflows': self.overruns,
+            'output_underruns': self.underruns,
+            'delay_ms': self.delay_ms,
+            'latency_ms': self.measured_latency_ms,
+            'delay_line_fill_frames': self._delay_line.fill_frames(),
+            'fifo_fill_frames': fifo.available() if fifo is not None else None,
+            'dropped_frames': self.dropped_frames,
+            'reconnects': len(self.reconnect_times_ms),
+            'input_connected': not self._input_detached,
+            'drift_ppm': drift.drift_ppm if drift is not None else None,
+            'recording_dropped_frames': recorder.lost_frames() if recorder is not None else None,
+        }
+    
+    def reconnect_stats(self) -> dict:
+        """Input reconnect count and timing, and frames replaced with silence"""
+        times = self.reconnect_times_ms
+        return {
+            'reconnects': len(times),
+            'avg_reconnect_ms': sum(times) / len(times) if times else 0.0,
+            'max_reconnect_ms': max(times) if times else 0.0,
+            'dropped_frames': self.dropped_frames,
+            'dropped_seconds': self.dropped_frames / self.sample_rate,
+            'input_connected': not self._input_detached,
+        }
+    
+    def drift_stats(self) -> Optional[dict]:
+        """Clock drift statistics, or None when drift compensation is off"""
+        return self._drift.stats() if self._drift is not None else None
     
     def _cleanup_streams(self):
         """Safely cleanup audio streams and PyAudio instance"""
         try:
+            pending, self._pending_input = self._pending_input, None
+            if pending:
+                try:
+                    pending.close()
+                except Exception:
+                    pass
+                
             if self._input_stream:
                 try:
                     self._input_stream.stop_stream()
@@ -295,12 +2921,25 @@ class VirtualMicrophone:
             return False
             
         self._stop_event.clear()
+        self._device_lost.clear()
+        self._stream_failure = None
+        self._input_detached = False
+        self._restart_requested = False
+        if self.record_path:
+            self._recorder = RecordingTap(self.record_path, self.sample_rate, self.output_channels)
+            self._recorder.start()
         self._audio_thread = threading.Thread(
             target=self._process_audio,
             name="AudioProcessor",
             daemon=False
         )
+        self._watchdog_thread = threading.Thread(
+            target=self._run_watchdog,
+            name="DeviceWatchdog",
+            daemon=True
+        )
         self._audio_thread.start()
+        self._watchdog_thread.start()
         return True
     
     def stop(self):
@@ -311,20 +2950,444 @@ class VirtualMicrophone:
             if self._audio_thread.is_alive():
                 print("⚠️ Audio thread did not stop cleanly")
         
+        if self._watchdog_thread and self._watchdog_thread.is_alive():
+            self._stop_event.set()
+            self._watchdog_wake.set()
+            self._watchdog_thread.join(timeout=2.0)
+        
         self._cleanup_streams()
+        
+        if self._recorder is not None:
+            # The audio thread is gone, so the writer can flush the rest
+            self._recorder.close()
+            self._recorder.report()
+            self._recorder = None
     
     def is_running(self):
         """Check if the virtual microphone is running"""
         return self._audio_thread and self._audio_thread.is_alive() and not self._stop_event.is_set()
 
 
+# Prometheus exposition: snapshot key -> (metric name, type, help)
+_PROMETHEUS_METRICS = [
+    ('input_overflows', 'virtual_mic_input_overflows_total', 'counter', 'Input overflows reported by PortAudio'),
+    ('output_underruns', 'virtual_mic_output_underruns_total', 'counter', 'Output underruns'),
+    ('dropped_frames', 'virtual_mic_dropped_frames_total', 'counter', 'Input frames replaced with silence while the microphone was gone'),
+    ('reconnects', 'virtual_mic_reconnects_total', 'counter', 'Input device reconnects'),
+    ('recording_dropped_frames', 'virtual_mic_recording_dropped_frames_total', 'counter', 'Frames missing from --record because the writer fell behind'),
+    ('delay_ms', 'virtual_mic_delay_ms', 'gauge', 'Configured delay'),
+    ('latency_ms', 'virtual_mic_latency_ms', 'gauge', 'Measured end-to-end latency'),
+    ('delay_line_fill_frames', 'virtual_mic_delay_line_fill_frames', 'gauge', 'Frames of audio held for the current delay'),
+    ('fifo_fill_frames', 'virtual_mic_fifo_fill_frames', 'gauge', 'Frames queued between the input and output callbacks'),
+    ('drift_ppm', 'virtual_mic_drift_ppm', 'gauge', 'Estimated clock drift between input and output'),
+    ('input_connected', 'virtual_mic_input_connected', 'gauge', '1 while the input device is connected'),
+    ('running', 'virtual_mic_running', 'gauge', '1 while audio is being processed'),
+]
+
+
+def render_prometheus_metrics(snapshot: dict) -> str:
+    """Format a metrics snapshot in the Prometheus text exposition format"""
+    lines = [
+        '# HELP virtual_mic_chunk_processing_seconds Time spent processing each audio chunk',
+        '# TYPE virtual_mic_chunk_processing_seconds histogram',
+    ]
+    for bound, count in snapshot['chunk_seconds_buckets'].items():
+        lines.append(f'virtual_mic_chunk_processing_seconds_bucket{{le="{bound}"}} {count}')
+    lines.append(f"virtual_mic_chunk_processing_seconds_sum {snapshot['chunk_seconds_sum']!r}")
+    lines.append(f"virtual_mic_chunk_processing_seconds_count {snapshot['chunks']}")
+    for key, name, kind, help_text in _PROMETHEUS_METRICS:
+        value = snapshot.get(key)
+        if value is None:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if isinstance(value, (bool, int)):
+            lines.append(f'{name} {int(value)}')
+        else:
+            lines.append(f'{name} {float(value)!r}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """Publish VirtualMicrophone health metrics off the audio thread.
+
+    Serves ``/metrics`` in the Prometheus text format on a local port and/or
+    appends a JSON line to a log every ``interval`` seconds (``-`` logs to
+    stdout). Snapshots only read counters, so scraping costs the audio
+    thread nothing.
+    """
+
+    def __init__(self, virtual_mic: 'VirtualMicrophone', port: Optional[int] = None,
+                 log_path: Optional[str] = None, interval: float = 10.0, host: str = "127.0.0.1"):
+        self.virtual_mic = virtual_mic
+        self.port = port
+        self.host = host
+        self.log_path = log_path
+        self.interval = interval
+        self._server = None
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self.port is not None:
+            self._start_server()
+        if self.log_path:
+            thread = threading.Thread(target=self._run_log, name="MetricsLog", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _start_server(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                snapshot = exporter.virtual_mic.metrics_snapshot()
+                if self.path.split('?')[0] == '/metrics':
+                    body = render_prometheus_metrics(snapshot).encode()
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path.split('?')[0] == '/metrics.json':
+                    body = json.dumps(snapshot).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self._server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.port = self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        print(f"📈 Metrics: http://{self.host}:{self.port}/metrics")
+
+    def _write_log_line(self):
+        line = json.dumps(self.virtual_mic.metrics_snapshot())
+        if self.log_path == '-':
+            print(line, flush=True)
+        else:
+            with open(self.log_path, 'a') as log:
+                log.write(line + '\n')
+
+    def _run_log(self):
+        while not self._stop_event.wait(self.interval):
+            self._write_log_line()
+
+    def stop(self):
+        """Stop serving; a final JSON line records the end-of-session totals"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.log_path:
+            self._write_log_line()
+
+
+def _start_metrics_exporter(args, virtual_mic: 'VirtualMicrophone') -> Optional[MetricsExporter]:
+    """Start the exporter requested by --metrics-port/--metrics-log, if any"""
+    if args.metrics_port is None and not args.metrics_log:
+        return None
+    exporter = MetricsExporter(virtual_mic, port=args.metrics_port,
+                               log_path=args.metrics_log, interval=args.metrics_interval)
+    exporter.start()
+    return exporter
+
+
+class Route:
+    """One (input device/channel → output device/channel, delay) path of a multi-route setup"""
+
+    def __init__(self, name: str, input_device: Optional[int], output_device: Optional[int],
+                 delay_ms: float, input_channel: int = 0, output_channel: int = 0):
+        self.name = name
+        self.input_device = input_device
+        self.output_device = output_device
+        self.delay_ms = delay_ms
+        self.input_channel = input_channel
+        self.output_channel = output_channel
+
+
+def _resolve_route_device(value, direction: str) -> Optional[int]:
+    """Accept a device index, a device name, or null for the default device"""
+    if value is None or isinstance(value, int):
+        return value
+    index = get_device_registry().find_device(str(value), direction)
+    if index is None:
+        raise ValueError(f"No {direction} device named '{value}'")
+    return index
+
+
+def load_routes_config(path: str):
+    """Read a multi-route JSON config; returns (settings, routes).
+
+    Routes name their devices by index or by name, so a config keeps working
+    when device indices shift::
+
+        {"sample_rate": 48000, "buffer": 512,
+         "routes": [{"name": "Host", "input": "Shure MV7", "output": "BlackHole 16ch",
+                     "output_channel": 0, "delay_ms": 140}, ...]}
+    """
+    with open(path) as f:
+        config = json.load(f)
+    entries = config.get('routes') if isinstance(config, dict) else None
+    if not entries:
+        raise ValueError("Config needs a non-empty 'routes' list")
+    routes = []
+    for i, entry in enumerate(entries):
+        if 'output' not in entry:
+            raise ValueError(f"Route {i + 1} has no 'output' device")
+        delay_ms = float(entry.get('delay_ms', 140))
+        if delay_ms < 0:
+            raise ValueError(f"Route {i + 1} has a negative delay")
+        routes.append(Route(
+            name=str(entry.get('name', f'route {i + 1}')),
+            input_device=_resolve_route_device(entry.get('input'), "input"),
+            output_device=_resolve_route_device(entry['output'], "output"),
+            delay_ms=delay_ms,
+            input_channel=int(entry.get('input_channel', 0)),
+            output_channel=int(entry.get('output_channel', 0)),
+        ))
+    settings = {
+        'sample_rate': int(config.get('sample_rate', 44100)),
+        'buffer': int(config.get('buffer', DEFAULT_CHUNK_SIZE)),
+    }
+    return settings, routes
+
+
+class MultiRouteMicrophone:
+    """Several delayed virtual microphones on one shared engine thread.
+
+    Streams are opened once per distinct device on a single backend, so
+    routes that share a microphone or a multi-channel virtual device share
+    its stream. Every chunk, one column per route is gathered into a
+    ``(frames, routes)`` block and pushed through a single multi-channel
+    DelayLine whose per-channel offsets carry the per-route delays, then
+    scattered back to the output streams. CPU time is tracked per stream
+    and per batch and attributed to routes for the session report.
+    """
+
+    def __init__(self, routes: List[Route], sample_rate: int = 44100, chunk_size: int = 1024):
+        if not routes:
+            raise ValueError("At least one route is required")
+        self.routes = list(routes)
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+
+        # One stream per distinct device, wide enough for every channel routed through it
+        self._input_devices = list(dict.fromkeys(r.input_device for r in self.routes))
+        self._output_devices = list(dict.fromkeys(r.output_device for r in self.routes))
+        self._input_channels = [
+            1 + max(r.input_channel for r in self.routes if r.input_device == d) for d in self._input_devices]
+        self._output_channels = [
+            1 + max(r.output_channel for r in self.routes if r.output_device == d) for d in self._output_devices]
+        for d, channels in zip(self._output_devices, self._output_channels):
+            claimed = [r.output_channel for r in self.routes if r.output_device == d]
+            if len(claimed) != len(set(claimed)):
+                raise ValueError(f"Two routes write to the same channel of output device {d}")
+
+        # Gather/scatter index arrays: (route columns, device channels) per stream
+        self._gather = []
+        for d in self._input_devices:
+            cols = [i for i, r in enumerate(self.routes) if r.input_device == d]
+            self._gather.append((np.array(cols, dtype=np.intp),
+                                 np.array([self.routes[i].input_channel for i in cols], dtype=np.intp)))
+        self._scatter = []
+        for d in self._output_devices:
+            cols = [i for i, r in enumerate(self.routes) if r.output_device == d]
+            self._scatter.append((np.array(cols, dtype=np.intp),
+                                  np.array([self.routes[i].output_channel for i in cols], dtype=np.intp)))
+
+        # All routes share one delay line: the shortest delay is the base,
+        # the rest ride on per-channel offsets
+        delays = [ms_to_delay_samples(r.delay_ms, sample_rate) for r in self.routes]
+        base = min(delays)
+        self._delay_line = DelayLine(base, max_block_size=chunk_size, channels=len(self.routes),
+                                     channel_offsets=[d - base for d in delays])
+        self._batch_in = np.zeros((chunk_size, len(self.routes)), dtype=np.float32)
+        self._batch_out = np.zeros((chunk_size, len(self.routes)), dtype=np.float32)
+        self._out_blocks = [np.zeros((chunk_size, c), dtype=np.float32) for c in self._output_channels]
+        self._out_bytes = [BlockBytes(block, chunk_size) for block in self._out_blocks]
+
+        # Per-stream xrun and CPU accounting
+        self.overruns = [0] * len(self._input_devices)
+        self.underruns = [0] * len(self._output_devices)
+        self._input_cpu = [0.0] * len(self._input_devices)
+        self._output_cpu = [0.0] * len(self._output_devices)
+        self._batch_cpu = 0.0
+        self.chunks = 0
+
+        self._stop_event = threading.Event()
+        self._audio_thread = None
+        self._pa = None
+        self._input_streams = []
+        self._output_streams = []
+
+    def _open_streams(self):
+        self._pa = create_audio_backend()
+        for device, channels in zip(self._input_devices, self._input_channels):
+            self._input_streams.append(self._pa.open(
+                format=PA_FLOAT32, channels=channels, rate=self.sample_rate, input=True,
+                frames_per_buffer=self.chunk_size, input_device_index=device))
+        for device, channels in zip(self._output_devices, self._output_channels):
+            self._output_streams.append(self._pa.open(
+                format=PA_FLOAT32, channels=channels, rate=self.sample_rate, output=True,
+                frames_per_buffer=self.chunk_size, output_device_index=device))
+
+    def _process_audio(self):
+        """Shared engine loop: read every input, delay all routes in one batch, write every output"""
+        try:
+            self._open_streams()
+            print(f"🎤 {len(self.routes)} routes active on {len(self._input_streams)} input and "
+                  f"{len(self._output_streams)} output stream(s)")
+            cpu = time.thread_time
+            while not self._stop_event.is_set():
+                for i, stream in enumerate(self._input_streams):
+                    data, overflowed = read_input(stream, self.chunk_size)
+                    if overflowed:
+                        self.overruns[i] += 1
+                    # Blocking waits cost no CPU, so only the copy-out is measured
+                    start = cpu()
+                    cols, channels = self._gather[i]
+                    block = np.frombuffer(data, dtype=np.float32).reshape(-1, self._input_channels[i])
+                    self._batch_in[:, cols] = block[:, channels]
+                    self._input_cpu[i] += cpu() - start
+
+                start = cpu()
+                self._delay_line.process(self._batch_in, self._batch_out)
+                for j, (cols, channels) in enumerate(self._scatter):
+                    self._out_blocks[j][:, channels] = self._batch_out[:, cols]
+                self._batch_cpu += cpu() - start
+
+                for j, stream in enumerate(self._output_streams):
+                    start = cpu()
+                    data = self._out_bytes[j].frames(self.chunk_size)
+                    self._output_cpu[j] += cpu() - start
+                    try:
+                        stream.write(data, exception_on_underflow=True)
+                    except IOError as e:
+                        if getattr(e, 'errno', None) != PA_OUTPUT_UNDERFLOWED:
+                            raise
+                        self.underruns[j] += 1
+                self.chunks += 1
+        except Exception as e:
+            if not self._stop_event.is_set():
+                print(f"❌ Multi-route audio error: {e}")
+        finally:
+            self._cleanup_streams()
+
+    def route_stats(self) -> List[dict]:
+        """Per-route xruns and CPU cost (ms per second of audio).
+
+        Stream costs are split across the routes sharing the stream and the
+        batched delay cost is split evenly, since it is one vectorized call.
+        """
+        audio_seconds = self.chunks * self.chunk_size / self.sample_rate
+        stats = []
+        for r in self.routes:
+            i = self._input_devices.index(r.input_device)
+            j = self._output_devices.index(r.output_device)
+            cpu = (self._input_cpu[i] / len(self._gather[i][0])
+                   + self._output_cpu[j] / len(self._scatter[j][0])
+                   + self._batch_cpu / len(self.routes))
+            stats.append({
+                'name': r.name,
+                'delay_ms': r.delay_ms,
+                'overruns': self.overruns[i],
+                'underruns': self.underruns[j],
+                'cpu_ms_per_s': cpu * 1000 / audio_seconds if audio_seconds else 0.0,
+            })
+        return stats
+
+    def report(self, process_cpu_seconds: Optional[float] = None):
+        """Print per-route and aggregate cost for the session"""
+        audio_seconds = self.chunks * self.chunk_size / self.sample_rate
+        stats = self.route_stats()
+        for route, stat in zip(self.routes, stats):
+            print(f"📊 Route '{stat['name']}': {_get_device_name(route.input_device, 'input')} "
+                  f"ch{route.input_channel} → {_get_device_name(route.output_device, 'output')} "
+                  f"ch{route.output_channel}, {stat['delay_ms']:g}ms - overruns {stat['overruns']}, "
+                  f"underruns {stat['underruns']}, CPU {stat['cpu_ms_per_s']:.3f} ms/s")
+        total = sum(stat['cpu_ms_per_s'] for stat in stats)
+        line = (f"📊 All {len(stats)} routes: {audio_seconds:.1f}s of audio, "
+                f"engine CPU {total:.3f} ms per second of audio")
+        if process_cpu_seconds is not None and audio_seconds:
+            line += f" ({process_cpu_seconds * 1000 / audio_seconds:.2f} ms/s for the whole process)"
+        print(line)
+
+    def _cleanup_streams(self):
+        for stream in self._input_streams + self._output_streams:
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception:
+                pass
+        self._input_streams = []
+        self._output_streams = []
+        if self._pa:
+            try:
+                self._pa.terminate()
+            except Exception:
+                pass
+            self._pa = None
+
+    def start(self):
+        if self._audio_thread and self._audio_thread.is_alive():
+            return False
+        self._stop_event.clear()
+        self._audio_thread = threading.Thread(target=self._process_audio, name="MultiRouteEngine", daemon=False)
+        self._audio_thread.start()
+        return True
+
+    def stop(self):
+        if self._audio_thread and self._audio_thread.is_alive():
+            self._stop_event.set()
+            self._audio_thread.join(timeout=2.0)
+        self._cleanup_streams()
+
+    def is_running(self):
+        return self._audio_thread and self._audio_thread.is_alive() and not self._stop_event.is_set()
+
+
+def run_multi_route(args, explicit_buffer: bool = False):
+    """Run every route of a --routes config in this process until interrupted"""
+    try:
+        settings, routes = load_routes_config(args.routes)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load routes from {args.routes}: {e}")
+        sys.exit(1)
+    chunk_size = args.buffer if explicit_buffer else settings['buffer']
+    multi = MultiRouteMicrophone(routes, sample_rate=settings['sample_rate'], chunk_size=chunk_size)
+    print(f"🎛️  Multi-route mode: {len(routes)} routes, {settings['sample_rate']}Hz, {chunk_size}-frame chunks")
+    for route in routes:
+        print(f"   {route.name}: {_get_device_name(route.input_device, 'input')} ch{route.input_channel} → "
+              f"{_get_device_name(route.output_device, 'output')} ch{route.output_channel} (+{route.delay_ms:g}ms)")
+    print("Press Ctrl+C to stop")
+    
+    cpu_start = time.process_time()
+    multi.start()
+    try:
+        while multi.is_running():
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping routes...")
+    multi.stop()
+    multi.report(time.process_time() - cpu_start)
+
+
 def find_virtual_devices():
     """Find virtual audio devices like VB-Cable"""
-    p = pyaudio.PyAudio()
     virtual_devices = []
     
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
+    for i, info in enumerate(get_device_registry().devices()):
         name = str(info.get('name', '')).lower()
         
         # Look for common virtual audio device names
@@ -332,25 +3395,20 @@ def find_virtual_devices():
         if any(keyword in name for keyword in virtual_keywords):
             virtual_devices.append((i, str(info.get('name', '')), info))
     
-    p.terminate()
     return virtual_devices
 
 
 def get_device_list_with_info():
     """Get list of all audio devices with detailed information"""
-    p = pyaudio.PyAudio()
+    registry = get_device_registry()
     
     devices = []
     virtual_devices = []
     
     # Get host API info to identify virtual/software devices
-    host_apis = {}
-    for i in range(p.get_host_api_count()):
-        api_info = p.get_host_api_info_by_index(i)
-        host_apis[i] = api_info
+    host_apis = dict(enumerate(registry.host_apis()))
     
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
+    for i, info in enumerate(registry.devices()):
         name = str(info.get('name', ''))
         inputs = int(info.get('maxInputChannels', 0))
         outputs = int(info.get('maxOutputChannels', 0))
@@ -414,7 +3472,6 @@ def get_device_list_with_info():
         if is_virtual:
             virtual_devices.append(device_info)
     
-    p.terminate()
     return devices, virtual_devices
 
 
@@ -567,6 +3624,37 @@ def get_device_selection(prompt: str, devices: List[dict], filter_func=None, use
             return None
 
 
+def run_with_delay_keys(virtual_mic: VirtualMicrophone):
+    """Keep the main thread alive, adjusting the delay live from single keystrokes"""
+    import select
+    import termios
+    import tty
+    
+    steps = {'+': 10, '=': 10, '-': -10, '_': -10, ']': 1, '[': -1}
+    
+    if not sys.stdin.isatty():
+        while virtual_mic.is_running():
+            time.sleep(0.1)
+        return
+    
+    print("🎚️  Adjust delay live: +/- for ±10ms, ]/[ for ±1ms")
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        while virtual_mic.is_running():
+            ready, _, _ = select.select([sys.stdin], [], [], 0.1)
+            if not ready:
+                continue
+            step = steps.get(sys.stdin.read(1))
+            if step is None:
+                continue
+            applied = virtual_mic.set_delay(virtual_mic.delay_ms + step)
+            print(f"🎚️  Delay: {applied:g}ms")
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
 def interactive_main():
     """Interactive CLI main function"""
     print("🎤 Virtual Microphone Audio Delay Tool")
@@ -642,13 +3730,16 @@ def interactive_main():
     input_device = next(d for d in devices if d['id'] == input_device_id)
     output_device = next(d for d in devices if d['id'] == output_device_id)
     
+    profile = load_device_profile(input_device['name'], output_device['name'], 44100, "blocking")
+    chunk_size = int(profile['chunk_size']) if profile else DEFAULT_CHUNK_SIZE
+    
     # Configuration lines with bold on even lines (2nd, 4th, 6th)
     config_lines = [
         f"Input device:  {input_device['name']} (ID: {input_device_id})",
         f"Output device: {output_device['name']} (ID: {output_device_id})",
         f"Delay:         {delay_ms}ms",
         f"Sample rate:   44100 Hz",
-        f"Buffer size:   1024"
+        f"Buffer size:   {chunk_size}" + (" (auto-tuned)" if profile else "")
     ]
     
     for i, line in enumerate(config_lines, 1):
@@ -677,7 +3768,7 @@ def interactive_main():
     virtual_mic = VirtualMicrophone(
         delay_ms=delay_ms,
         sample_rate=44100,
-        chunk_size=1024,
+        chunk_size=chunk_size,
         input_device=input_device_id,
         output_device=output_device_id
     )
@@ -701,8 +3792,7 @@ def interactive_main():
             sys.exit(1)
         
         # Keep main thread alive while virtual microphone is running
-        while virtual_mic.is_running():
-            time.sleep(0.1)
+        run_with_delay_keys(virtual_mic)
             
         print("✅ Virtual microphone stopped")
         
@@ -717,6 +3807,30 @@ def interactive_main():
         sys.exit(1)
 
 
+def _parse_channel_map(value: str) -> List[int]:
+    """Parse a comma-separated channel map such as "0,1" """
+    import argparse
+    try:
+        channel_map = [int(part) for part in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid channel map: {value}")
+    if not channel_map or min(channel_map) < 0:
+        raise argparse.ArgumentTypeError(f"invalid channel map: {value}")
+    return channel_map
+
+
+def _parse_channel_offsets(value: str) -> List[float]:
+    """Parse comma-separated per-channel delay offsets in milliseconds"""
+    import argparse
+    try:
+        offsets = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid channel offsets: {value}")
+    if min(offsets) < 0:
+        raise argparse.ArgumentTypeError("channel offsets must be positive")
+    return offsets
+
+
 def main():
     """Main function with backward compatibility for command-line arguments"""
     import argparse
@@ -726,8 +3840,9 @@ def main():
                        help='Delay in milliseconds (default: 140ms)')
     parser.add_argument('-r', '--rate', type=int, default=44100,
                        help='Sample rate in Hz (default: 44100)')
-    parser.add_argument('-b', '--buffer', type=int, default=1024,
-                       help='Buffer size (default: 1024)')
+    parser.add_argument('-b', '--buffer', type=int,
+                       help=f'Buffer size (default: the --auto-tune profile for the devices, '
+                            f'else {DEFAULT_CHUNK_SIZE})')
     parser.add_argument('-i', '--input-device', type=int,
                        help='Input device ID (physical microphone)')
     parser.add_argument('-o', '--output-device', type=int,
@@ -738,9 +3853,103 @@ def main():
                        help='Auto-detect virtual audio devices')
     parser.add_argument('--test-alert', action='store_true',
                        help='Test macOS alert functionality')
+    parser.add_argument('--engine', choices=['blocking', 'callback', 'duplex'], default='blocking',
+                       help='Audio engine: blocking read/write loop, PortAudio callbacks, '
+                            'or one full-duplex stream (default: blocking)')
+    parser.add_argument('-c', '--channels', type=int, default=1,
+                       help='Number of input channels to capture (default: 1)')
+    parser.add_argument('--channel-map', type=_parse_channel_map,
+                       help='Comma-separated input channel for each output channel, e.g. "0,0" or "1,0"')
+    parser.add_argument('--channel-offsets', type=_parse_channel_offsets,
+                       help='Comma-separated extra delay in ms per output channel, e.g. "0,2.5"')
+    parser.add_argument('--compensate-latency', action='store_true',
+                       help='Subtract measured device latency from --delay so end-to-end delay hits the target')
+    parser.add_argument('--drift-compensation', action='store_true',
+                       help='Resample to track clock drift between input and output devices (callback engine)')
+    parser.add_argument('--gain', type=float, default=0.0, metavar='DB',
+                       help='Gain applied after the delay, in dB (default: 0)')
+    parser.add_argument('--highpass', type=float, metavar='HZ',
+                       help='Biquad high-pass after the delay, e.g. 80 to remove rumble')
+    parser.add_argument('--noise-gate', type=float, metavar='DBFS',
+                       help='Mute the delayed signal while its level stays below this threshold, e.g. -50')
+    parser.add_argument('--limiter', type=float, metavar='DBFS',
+                       help='Peak limiter ceiling after the delay, e.g. -1')
+    parser.add_argument('--record', metavar='PATH',
+                       help='Also write the delayed output to PATH (.wav, or .flac with soundfile installed)')
+    parser.add_argument('--simulate-drift', type=float, metavar='PPM',
+                       help='Simulate input/output clock drift offline and report compensation accuracy')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Benchmark the delay engine CPU cost and exit')
+    parser.add_argument('--routes', metavar='CONFIG',
+                       help='Run every (input, output, delay) route of a JSON config in this one process')
+    parser.add_argument('--alloc-check', action='store_true',
+                       help='Check with tracemalloc that the engines allocate nothing per chunk in steady state')
+    parser.add_argument('--auto-tune', action='store_true',
+                       help='Find the smallest buffer the devices run without xruns and save it as their profile')
+    parser.add_argument('--tune-seconds', type=float, default=3.0, metavar='SECONDS',
+                       help='Seconds of audio per --auto-tune trial (default: 3)')
+    parser.add_argument('--backend', choices=['pyaudio', 'fake'], default='pyaudio',
+                       help='Audio backend: real devices through PyAudio, or simulated devices (default: pyaudio)')
+    parser.add_argument('--load-test', type=float, metavar='SPEED',
+                       help='Run the engine against the fake backend at SPEED times real time and report its cost')
+    parser.add_argument('--load-seconds', type=float, default=60.0,
+                       help='Seconds of audio to push through a load test (default: 60)')
+    parser.add_argument('--fake-jitter', type=float, default=0.0, metavar='MS',
+                       help='Fake backend: random callback/read timing jitter in ms')
+    parser.add_argument('--fake-disconnect-after', type=float, metavar='SECONDS',
+                       help='Fake backend: disconnect the input device after this many seconds of audio')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                       help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics (0 picks a free port)')
+    parser.add_argument('--metrics-log', metavar='PATH',
+                       help="Append a JSON line of health metrics to PATH periodically ('-' for stdout)")
+    parser.add_argument('--metrics-interval', type=float, default=10.0, metavar='SECONDS',
+                       help='Seconds between --metrics-log lines (default: 10)')
+    parser.add_argument('--fake-reconnect-after', type=float, metavar='SECONDS',
+                       help='Fake backend: plug the input device back in this many seconds after it disconnects')
+    parser.add_argument('--fake-overflow-every', type=int, default=0, metavar='N',
+                       help='Fake backend: force an input overflow every N reads')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    offline_parser = subparsers.add_parser(
+        'offline', help='Delay a WAV file offline (no audio hardware needed)')
+    offline_parser.add_argument('input_wav', help='PCM WAV file to read')
+    offline_parser.add_argument('output_wav', help='Delayed WAV file to write')
+    offline_parser.add_argument('-d', '--delay', type=int, default=140,
+                               help='Delay in milliseconds (default: 140ms)')
+    offline_parser.add_argument('-b', '--buffer', type=int, default=4096,
+                               help='Block size in frames (default: 4096)')
+    offline_parser.add_argument('--channel-map', type=_parse_channel_map,
+                               help='Comma-separated input channel for each output channel')
+    offline_parser.add_argument('--channel-offsets', type=_parse_channel_offsets,
+                               help='Comma-separated extra delay in ms per output channel')
+    offline_parser.add_argument('--trim', action='store_true',
+                               help='Keep the original length instead of flushing the delayed tail')
     
     args = parser.parse_args()
     
+    # An explicit -b always wins over a saved profile
+    explicit_buffer = args.buffer is not None
+    if not explicit_buffer and args.command != 'offline':
+        args.buffer = DEFAULT_CHUNK_SIZE
+    
+    if args.command == 'offline':
+        if args.delay < 0:
+            print("❌ Delay must be positive")
+            sys.exit(1)
+        run_offline(args)
+        return
+    
+    if args.benchmark:
+        run_benchmark(args.delay, args.rate, args.buffer)
+        return
+    
+    if args.alloc_check:
+        sys.exit(0 if run_allocation_check(args) else 1)
+    
+    if args.simulate_drift is not None:
+        run_drift_simulation(args.simulate_drift, args.rate, args.buffer)
+        return
+    
     # Test alert functionality if requested
     if args.test_alert:
         if platform.system() == "Darwin":
@@ -758,6 +3967,30 @@ def main():
             print("⚠️ macOS alerts are only available on macOS")
         return
     
+    if args.highpass is not None and not 0 < args.highpass < args.rate / 2:
+        print(f"❌ High-pass cutoff must be between 0 and {args.rate // 2}Hz")
+        sys.exit(1)
+    
+    if args.record and args.record.lower().endswith('.flac') and not SOUNDFILE_AVAILABLE:
+        print("❌ FLAC recording needs soundfile")
+        print("💡 Install it with: pip3 install soundfile, or record to a .wav file")
+        sys.exit(1)
+    
+    if args.load_test is not None:
+        if args.load_test <= 0:
+            print("❌ Load test speed must be positive")
+            sys.exit(1)
+        run_load_test(args)
+        return
+    
+    if args.backend == 'fake':
+        set_audio_backend(lambda: _fake_backend_from_args(args))
+    elif not PYAUDIO_AVAILABLE:
+        print("❌ PyAudio is not installed")
+        print("💡 Install it with: brew install portaudio && pip3 install pyaudio")
+        print("💡 The offline, --benchmark, --simulate-drift and --load-test modes work without it")
+        sys.exit(1)
+    
     # If no arguments provided, run interactive mode
     if len(sys.argv) == 1:
         interactive_main()
@@ -768,10 +4001,35 @@ def main():
         list_audio_devices()
         return
     
+    if args.routes:
+        run_multi_route(args, explicit_buffer)
+        return
+    
     if args.delay < 0:
         print("❌ Delay must be positive")
         sys.exit(1)
     
+    if args.channels < 1:
+        print("❌ Channel count must be at least 1")
+        sys.exit(1)
+    
+    if args.channel_map and max(args.channel_map) >= args.channels:
+        print(f"❌ Channel map refers to input channel {max(args.channel_map)}, "
+              f"but only {args.channels} channel(s) are captured")
+        sys.exit(1)
+    
+    if args.drift_compensation and args.engine == 'duplex':
+        print("💡 Duplex streams share one clock - drift compensation is not needed")
+        args.drift_compensation = False
+    elif args.drift_compensation and args.engine == 'blocking':
+        print("💡 Drift compensation uses the callback engine")
+        args.engine = 'callback'
+    
+    output_channels = len(args.channel_map) if args.channel_map else args.channels
+    if args.channel_offsets and len(args.channel_offsets) != output_channels:
+        print(f"❌ Expected {output_channels} channel offsets, got {len(args.channel_offsets)}")
+        sys.exit(1)
+    
     # Auto-detect virtual devices if requested
     if args.auto_detect:
         virtual_devices = find_virtual_devices()
@@ -798,9 +4056,22 @@ def main():
         print("💡 Or specify --output-device <ID>")
         sys.exit(1)
     
-    print(f"🎤 Setting up virtual microphone")
     input_name = _get_device_name(args.input_device, direction="input")
     output_name = _get_device_name(args.output_device, direction="output")
+    
+    if args.auto_tune:
+        run_auto_tune(args, input_name, output_name)
+        return
+    
+    profile = None
+    if not explicit_buffer:
+        profile = load_device_profile(input_name, output_name, args.rate, args.engine)
+        if profile and int(profile.get('chunk_size', 0)) > 0:
+            args.buffer = int(profile['chunk_size'])
+        else:
+            profile = None
+    
+    print(f"🎤 Setting up virtual microphone")
     input_id = (
         args.input_device
         if args.input_device is not None
@@ -813,7 +4084,18 @@ def main():
     print(f"   Output device: {output_name} (ID: {output_id_label})")
     print(f"   Delay: {args.delay}ms")
     print(f"   Sample rate: {args.rate}Hz")
-    print(f"   Buffer size: {args.buffer}")
+    print(f"   Buffer size: {args.buffer}" + (" (auto-tuned profile)" if profile else ""))
+    print(f"   Engine: {args.engine}")
+    print(f"   Channels: {args.channels} in → {output_channels} out")
+    if args.channel_map:
+        print(f"   Channel map: {args.channel_map}")
+    if args.channel_offsets:
+        print(f"   Channel offsets: {args.channel_offsets} ms")
+    dsp = build_dsp_chain(args.rate, output_channels, **_dsp_kwargs(args))
+    if dsp:
+        print(f"   Cleanup: {dsp.describe()}")
+    if args.record:
+        print(f"   Recording to: {args.record}")
     print()
     print("🔧 This creates a virtual microphone that your recording software can select")
     print("📹 In your recording software, select the virtual audio device as your microphone")
@@ -827,7 +4109,15 @@ def main():
         sample_rate=args.rate,
         chunk_size=args.buffer,
         input_device=args.input_device,
-        output_device=args.output_device
+        output_device=args.output_device,
+        engine=args.engine,
+        compensate_latency=args.compensate_latency,
+        channels=args.channels,
+        channel_map=args.channel_map,
+        channel_offsets_ms=args.channel_offsets,
+        drift_compensation=args.drift_compensation,
+        record_path=args.record,
+        **_dsp_kwargs(args)
     )
     
     # Set up signal handlers for clean shutdown
@@ -848,9 +4138,12 @@ def main():
             print("❌ Failed to start virtual microphone")
             sys.exit(1)
         
+        exporter = _start_metrics_exporter(args, virtual_mic)
+        if exporter is not None:
+            atexit.register(exporter.stop)
+        
         # Keep main thread alive while virtual microphone is running
-        while virtual_mic.is_running():
-            time.sleep(0.1)
+        run_with_delay_keys(virtual_mic)
             
         print("✅ Virtual microphone stopped")
         
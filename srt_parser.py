@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Streaming SRT cue parser shared by the title and description generators
+Reads transcripts line by line, or through a memory-mapped window for large files,
+and yields typed cue records
+"""
+
+import os
+import re
+import sys
+import mmap
+import time
+import argparse
+import tempfile
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# Precompiled once; a timestamp line looks like 00:00:00,000 --> 00:00:06,300
+TIMESTAMP_LINE = re.compile(
+    r'(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}),(\d{3})'
+)
+# Bytes form for memory-mapped input: anchored to a line start, consumes the line
+TIMESTAMP_LINE_BYTES = re.compile(
+    rb'^(?:\xef\xbb\xbf)?[ \t]*(\d{2}):(\d{2}):(\d{2}),(\d{3})[ \t]*-->[ \t]*'
+    rb'(\d{2}):(\d{2}):(\d{2}),(\d{3})[^\n]*',
+    re.M,
+)
+UTF8_BOM = b'\xef\xbb\xbf'
+TWO_DIGITS = {b'%02d' % n: n for n in range(100)}
+
+MMAP_MIN_BYTES = 8 * 1024 * 1024   # smaller files are read line by line
+MMAP_WINDOW = 4 * 1024 * 1024      # bytes mapped at once; bounds resident memory
+
+CHAPTER_TITLE_WORDS = 8
+SRT_CLOCK_MS = 100 * 3600 * 1000
+BENCHMARK_HOURS = 4
+BENCHMARK_CUE_SECONDS = 3
+RSS_BENCHMARK_MB = 500
+
+
+class Cue(NamedTuple):
+    """One subtitle cue with times in milliseconds"""
+    index: int
+    start_ms: int
+    end_ms: int
+    text: str
+
+
+def _to_ms(hours: str, minutes: str, seconds: str, millis: str) -> int:
+    """Convert SRT time fields to milliseconds"""
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    """Yield cues from an iterable of SRT lines without buffering the file.
+
+    A number-only line counts as a cue index when a timestamp line follows
+    it; anywhere else it is treated as cue text. Text before the first
+    timestamp line is ignored.
+    """
+    index = start_ms = end_ms = None
+    text_lines: List[str] = []
+    pending_number = None
+
+    for raw in lines:
+        line = raw.strip()
+        match = TIMESTAMP_LINE.match(line) if '-->' in line else None
+        if match:
+            if start_ms is not None:
+                yield Cue(index, start_ms, end_ms, ' '.join(text_lines))
+            fields = match.groups()
+            index = int(pending_number) if pending_number is not None else (index or 0) + 1
+            start_ms, end_ms = _to_ms(*fields[:4]), _to_ms(*fields[4:])
+            text_lines = []
+            pending_number = None
+            continue
+
+        if pending_number is not None and start_ms is not None:
+            text_lines.append(pending_number)
+        pending_number = None
+
+        if not line:
+            continue
+        if line.isdigit():
+            pending_number = line
+        elif start_ms is not None:
+            text_lines.append(line)
+
+    if start_ms is not None:
+        if pending_number is not None:
+            text_lines.append(pending_number)
+        yield Cue(index, start_ms, end_ms, ' '.join(text_lines))
+
+
+def read_cues(transcript_path: str) -> Iterator[Cue]:
+    """Stream cues from an SRT file on disk, memory-mapping large files"""
+    if os.path.getsize(transcript_path) >= MMAP_MIN_BYTES:
+        yield from read_cues_mapped(transcript_path)
+        return
+    with open(transcript_path, 'r', encoding='utf-8-sig') as f:
+        yield from iter_cues(f)
+
+
+def _split_body(body: bytes, closes_cue: bool) -> Tuple[bytes, Optional[bytes]]:
+    """Join the text lines that follow a timestamp line.
+
+    When another timestamp line follows, a number-only last line is that
+    cue's index and is returned separately, as iter_cues treats it.
+    """
+    lines = body.splitlines()
+    number = None
+    if closes_cue and lines and lines[-1].strip().isdigit():
+        number = lines.pop().strip()
+    return b' '.join(filter(None, map(bytes.strip, lines))), number
+
+
+def _match_ms(match) -> Tuple[int, int]:
+    """Start and end in milliseconds from a bytes timestamp match"""
+    h1, m1, s1, f1, h2, m2, s2, f2 = match.groups()
+    return (((TWO_DIGITS[h1] * 60 + TWO_DIGITS[m1]) * 60 + TWO_DIGITS[s1]) * 1000 + int(f1),
+            ((TWO_DIGITS[h2] * 60 + TWO_DIGITS[m2]) * 60 + TWO_DIGITS[s2]) * 1000 + int(f2))
+
+
+def read_cues_mapped(transcript_path: str, window: int = MMAP_WINDOW) -> Iterator[Cue]:
+    """Stream cues by scanning the file through a sliding memory-mapped window.
+
+    Timestamp lines are found with a bytes pattern straight from the
+    mapping and only cue text is copied out and decoded, so resident memory
+    stays around one window whatever the file size. A cue cut off by the
+    end of a window is parsed again from the next one; a window that holds
+    no complete cue is doubled.
+    """
+    with open(transcript_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        scan_from = 0
+        last_index = 0
+        number = None
+        while scan_from < size:
+            base = scan_from - scan_from % mmap.ALLOCATIONGRANULARITY
+            length = min(window, size - base)
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=base) as view:
+                if hasattr(view, 'madvise'):
+                    view.madvise(mmap.MADV_SEQUENTIAL)
+                cursor = scan_from - base
+                prev = None
+                for match in TIMESTAMP_LINE_BYTES.finditer(view, cursor):
+                    body = view[cursor:match.start()]
+                    if prev is None and scan_from == 0 and body.startswith(UTF8_BOM):
+                        body = body[len(UTF8_BOM):]
+                    text, found = _split_body(body, closes_cue=True)
+                    if prev is not None:
+                        yield Cue(prev_index, *prev_ms, text.decode('utf-8'))
+                        last_index = prev_index
+                    if body:
+                        number = found
+                    prev_index = int(number) if number is not None else last_index + 1
+                    prev, prev_ms, cursor = match, _match_ms(match), match.end()
+
+                if base + length == size:
+                    if prev is not None:
+                        text = _split_body(view[cursor:], closes_cue=False)[0]
+                        yield Cue(prev_index, *prev_ms, text.decode('utf-8'))
+                    return
+                if prev is not None:
+                    resume = base + prev.start()
+                else:
+                    # Text before the first cue: keep only a trailing index line
+                    line_end = view.rfind(b'\n', cursor) + 1
+                    resume = base + line_end if line_end > cursor else scan_from
+                    if resume > scan_from:
+                        number = _split_body(view[cursor:line_end], closes_cue=True)[1]
+            if resume == scan_from:
+                window *= 2
+            scan_from = resume
+
+
+def format_chapter_time(ms: int) -> str:
+    """Format a cue start as M:SS, or H:MM:SS past the first hour"""
+    total_seconds = ms // 1000
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def chapter_title(text: str) -> str:
+    """Shorten cue text to a chapter title"""
+    words = text.split()[:CHAPTER_TITLE_WORDS]
+    return ' '.join(words).replace('.', '').replace(',', '')
+
+
+def read_transcript(transcript_path: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Build clean transcript text and chapter markers in a single pass"""
+    texts = []
+    chapters = []
+    for cue in read_cues(transcript_path):
+        if not cue.text:
+            continue
+        texts.append(cue.text)
+        chapters.append((format_chapter_time(cue.start_ms), chapter_title(cue.text)))
+    return ' '.join(texts), chapters
+
+
+def _format_srt_time(ms: int) -> str:
+    """Format milliseconds as an SRT timestamp"""
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+def write_synthetic_srt(path: str, hours: float, cue_seconds: float = BENCHMARK_CUE_SECONDS) -> int:
+    """Write a synthetic transcript of the given length, returning the cue count.
+
+    SRT hours have two digits, so past 100 hours the clock wraps around as
+    if several recordings were concatenated.
+    """
+    cue_ms = int(cue_seconds * 1000)
+    cue_count = int(hours * 3600 * 1000) // cue_ms
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(cue_count):
+            start = i * cue_ms % SRT_CLOCK_MS
+            f.write(f"{i + 1}\n{_format_srt_time(start)} --> {_format_srt_time(start + cue_ms - 100)}\n")
+            f.write(f"So in segment {i} we deploy the worker, and then\n")
+            f.write("we run the sandbox against the edge network.\n\n")
+    return cue_count
+
+
+def _legacy_read_transcript(transcript_path: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Reference two-pass parse: read, split and match every line twice"""
+    pattern = r'\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}'
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    text = ' '.join(
+        line.strip() for line in lines
+        if line.strip() and not line.strip().isdigit() and not re.match(pattern, line.strip())
+    )
+
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    chapters = []
+    current_time = current_content = ""
+    for line in lines:
+        if re.match(pattern, line.strip()):
+            if current_time and current_content:
+                chapters.append((current_time, chapter_title(current_content)))
+            h, m, s = line.strip().split(' --> ')[0].split(',')[0].split(':')
+            current_time = format_chapter_time((int(h) * 3600 + int(m) * 60 + int(s)) * 1000)
+            current_content = ""
+        elif line.strip() and not line.strip().isdigit():
+            current_content += line.strip() + " "
+    if current_time and current_content:
+        chapters.append((current_time, chapter_title(current_content)))
+    return text, chapters
+
+
+def _measure(parse, transcript_path: str) -> Tuple[float, int, Tuple[str, List[Tuple[str, str]]]]:
+    """Time a parse, then repeat it under tracemalloc for its peak allocation"""
+    started = time.perf_counter()
+    result = parse(transcript_path)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    parse(transcript_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def run_benchmark(hours: float) -> bool:
+    """Compare the streaming parser with the legacy two-pass parse"""
+    with tempfile.NamedTemporaryFile(suffix='.srt', delete=False) as f:
+        transcript_path = f.name
+    try:
+        cue_count = write_synthetic_srt(transcript_path, hours)
+        print(f"Synthetic transcript: {hours:g} h, {cue_count} cues, "
+              f"{os.path.getsize(transcript_path) / 1e6:.1f} MB")
+        legacy_time, legacy_peak, legacy = _measure(_legacy_read_transcript, transcript_path)
+        stream_time, stream_peak, streamed = _measure(read_transcript, transcript_path)
+    finally:
+        os.remove(transcript_path)
+    matches = legacy == streamed
+
+    print(f"  Legacy two-pass:  {legacy_time * 1000:8.1f} ms, peak {legacy_peak / 1e6:6.1f} MB")
+    print(f"  Streaming:        {stream_time * 1000:8.1f} ms, peak {stream_peak / 1e6:6.1f} MB")
+    print(f"  Speedup: {legacy_time / stream_time:.1f}x, output {'identical' if matches else 'DIFFERS'}")
+    return matches
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _count_nothing(transcript_path: str) -> int:
+    """Baseline probe: interpreter and module import only"""
+    return 0
+
+
+def _count_read_split(transcript_path: str) -> int:
+    """Count cues the original way: read the whole file and split it"""
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    return sum(1 for line in lines if TIMESTAMP_LINE.match(line.strip()))
+
+
+def _count_line_cues(transcript_path: str) -> int:
+    """Count cues streamed line by line from a text file"""
+    with open(transcript_path, 'r', encoding='utf-8-sig') as f:
+        return sum(1 for _ in iter_cues(f))
+
+
+def _count_mapped_cues(transcript_path: str) -> int:
+    """Count cues streamed from the memory-mapped window"""
+    return sum(1 for _ in read_cues_mapped(transcript_path))
+
+
+INGEST_PROBES = {
+    'baseline': _count_nothing,
+    'read + split': _count_read_split,
+    'line by line': _count_line_cues,
+    'mmap window': _count_mapped_cues,
+}
+
+
+def _probe_ingest(name: str, transcript_path: str) -> Tuple[int, float, float]:
+    """Run one ingestion path, returning (cues, seconds, peak RSS in MB)"""
+    started = time.perf_counter()
+    cues = INGEST_PROBES[name](transcript_path)
+    return cues, time.perf_counter() - started, _peak_rss_mb()
+
+
+def run_rss_benchmark(megabytes: float) -> bool:
+    """Compare peak RSS of each ingestion path on a synthetic transcript"""
+    if not RESOURCE_AVAILABLE:
+        print("Error: The RSS benchmark needs the resource module (Unix only)")
+        return False
+
+    with tempfile.NamedTemporaryFile(suffix='.srt', delete=False) as f:
+        transcript_path = f.name
+    try:
+        write_synthetic_srt(transcript_path, 1)
+        hours = megabytes * 1e6 / os.path.getsize(transcript_path)
+        cue_count = write_synthetic_srt(transcript_path, hours)
+        print(f"Synthetic transcript: {os.path.getsize(transcript_path) / 1e6:.0f} MB, {cue_count} cues")
+
+        counts = set()
+        for name in INGEST_PROBES:
+            # A fresh process per probe so each peak RSS is its own
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                cues, elapsed, peak = pool.submit(_probe_ingest, name, transcript_path).result()
+            if name != 'baseline':
+                counts.add(cues)
+            print(f"  {name:<14} {elapsed:6.1f} s, peak RSS {peak:7.1f} MB")
+    finally:
+        os.remove(transcript_path)
+
+    matches = counts == {cue_count}
+    print(f"  Cue counts {'agree' if matches else 'DIFFER'}")
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse SRT transcripts into cues')
+    parser.add_argument('transcript_path', nargs='?', help='Path to SRT transcript file')
+    parser.add_argument('--benchmark', type=float, nargs='?', const=BENCHMARK_HOURS, metavar='HOURS',
+                        help=f'Benchmark on a synthetic transcript (default: {BENCHMARK_HOURS} hours)')
+
+    parser.add_argument('--rss-benchmark', type=float, nargs='?', const=RSS_BENCHMARK_MB, metavar='MB',
+                        help=f'Compare peak RSS of ingestion paths (default: {RSS_BENCHMARK_MB:g} MB file)')
+
+    args = parser.parse_args()
+
+    if args.rss_benchmark is not None:
+        sys.exit(0 if run_rss_benchmark(args.rss_benchmark) else 1)
+    if args.benchmark is not None:
+        sys.exit(0 if run_benchmark(args.benchmark) else 1)
+    if not args.transcript_path:
+        parser.error("transcript_path is required unless a benchmark is requested")
+
+    try:
+        for cue in read_cues(args.transcript_path):
+            print(f"{cue.index}\t{format_chapter_time(cue.start_ms)}\t{cue.text}")
+    except FileNotFoundError:
+        print(f"Error: File {args.transcript_path} not found")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'scripts')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def fake_backend():
+    import virtual_mic_delay
+
+    previous = virtual_mic_delay._backend_factory
+    # The blocking engine's only output cushion is the device latency; 50 ms
+    # keeps test-runner scheduling stalls from counting as an underrun
+    backend = virtual_mic_delay.FakeAudioBackend(speed=1.0, latency=0.05)
+    virtual_mic_delay.set_audio_backend(lambda: backend)
+    yield backend
+    virtual_mic_delay.set_audio_backend(previous)
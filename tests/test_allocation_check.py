@@ -0,0 +1,24 @@
+import pytest
+
+import virtual_mic_delay as vmd
+
+CONFIGS = {
+    'mono': {},
+    'stereo-offsets': {'channels': 2, 'channel_offsets_ms': [0.0, 5.0]},
+    'cleanup-chain': {'highpass_hz': 80.0, 'noise_gate_db': -50.0, 'limiter_db': -1.0},
+}
+
+
+@pytest.mark.parametrize('engine', ['blocking', 'callback', 'duplex'])
+@pytest.mark.parametrize('config', sorted(CONFIGS))
+def test_engine_chunk_path_is_allocation_free(fake_backend, engine, config):
+    result = vmd.measure_steady_state_allocations(engine, chunk_size=256, delay_ms=100,
+                                                  **CONFIGS[config])
+
+    # Nothing is kept per chunk
+    assert result['retained_bytes_per_chunk'] < 1.0
+    # What is allocated and freed within a chunk is object headers only: far
+    # below one block, and no bigger when the block is four times larger
+    assert result['largest_transient_bytes'] < 1024
+    assert result['block_scaling_bytes'] < 256
+    assert result['allocation_free']
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from caption_readers import detect_format
+from transcript import Transcript
+
+
+@pytest.mark.parametrize('first_line', ['[Music]', '[Intro] Welcome back', '{laughs} So anyway'])
+def test_bracket_led_text_is_read_as_plain_text(tmp_path, first_line):
+    path = tmp_path / 'talk.txt'
+    path.write_text(f"{first_line}\nToday we look at Workers.\n", encoding='utf-8')
+
+    assert detect_format(str(path)) == 'txt'
+    transcript = Transcript.from_file(str(path))
+    assert [cue.text for cue in transcript] == [first_line, 'Today we look at Workers.']
+
+
+@pytest.mark.parametrize('document', [
+    [{'start': 0.0, 'end': 1.5, 'text': ' Hello'}],
+    {'text': 'Hello', 'segments': [{'start': 0.0, 'end': 1.5, 'text': ' Hello'}]},
+])
+def test_whisper_json_is_still_detected(tmp_path, document):
+    path = tmp_path / 'talk.json'
+    path.write_text(json.dumps(document, indent=2), encoding='utf-8')
+
+    assert detect_format(str(path)) == 'json'
+    assert [(cue.start_ms, cue.end_ms, cue.text) for cue in Transcript.from_file(str(path))] == [(0, 1500, 'Hello')]
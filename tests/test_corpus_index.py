@@ -0,0 +1,29 @@
+import sys
+
+import pytest
+
+import corpus_index
+from corpus_index import CorpusIndex
+
+
+def test_a_file_that_is_not_a_database_is_reported(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'notes.db'
+    path.write_text('not a database\n', encoding='utf-8')
+
+    with pytest.raises(ValueError, match='not a database'):
+        CorpusIndex(str(path))
+
+    monkeypatch.setattr(sys, 'argv', ['corpus_index.py', str(path)])
+    with pytest.raises(SystemExit) as exit_info:
+        corpus_index.main()
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().out == f"Error: Cannot open corpus {path}: file is not a database\n"
+    assert path.read_text(encoding='utf-8') == 'not a database\n'
+
+
+def test_missing_corpus_is_not_created(tmp_path):
+    path = tmp_path / 'missing.db'
+
+    with pytest.raises(FileNotFoundError):
+        CorpusIndex(str(path))
+    assert not path.exists()
@@ -0,0 +1,9 @@
+from keyword_matcher import KeywordMatcher
+
+
+def test_matches_ignore_case_next_to_characters_that_grow_when_lowercased():
+    matcher = KeywordMatcher(['Workers', 'Durable Objects'])
+    text = 'İstanbul: Workers and durable objects'
+
+    assert matcher.counts(text) == {'Workers': 1, 'Durable Objects': 1}
+    assert [text[hit.start:hit.end] for hit in matcher.finditer(text)] == ['Workers', 'durable objects']
@@ -0,0 +1,26 @@
+from title_engine import HOOK_TEMPLATES, LIST_NUMBERS, count_candidates
+
+
+def _every_filling(topic_count, pair_count=None):
+    if pair_count is None:
+        pair_count = topic_count * (topic_count - 1)
+    total = 0
+    for texts in HOOK_TEMPLATES.values():
+        for text in texts:
+            fillings = pair_count if '{b}' in text else topic_count
+            total += fillings * len(LIST_NUMBERS) if '{n}' in text else fillings
+    return total
+
+
+def test_disjoint_topics_fill_every_template_slot():
+    topics = [("server components", 3), ("hydration", 2), ("streaming", 1)]
+
+    assert count_candidates(topics) == _every_filling(3)
+
+
+def test_topics_sharing_a_word_never_fill_one_title():
+    shared = [("components", 2), ("server components", 1)]
+    disjoint = [("components", 2), ("hydration", 1)]
+
+    assert count_candidates(shared) == _every_filling(2, pair_count=0)
+    assert count_candidates(disjoint) == _every_filling(2)
@@ -0,0 +1,20 @@
+from srt_parser import Cue
+from transcript import Transcript
+
+
+def test_find_keeps_offsets_when_lowercasing_grows_the_text():
+    transcript = Transcript([Cue(1, 0, 1000, 'İstanbul talk about Workers'),
+                             Cue(2, 1000, 2000, 'More workers here')])
+
+    assert transcript.contains('Workers')
+    hits = transcript.find('workers')
+    assert [position for position, _ in hits] == [0, 1]
+    assert [transcript.text[offset:offset + 7] for _, offset in hits] == ['Workers', 'workers']
+
+
+def test_cues_are_stored_in_start_order():
+    transcript = Transcript([Cue(2, 5000, 6000, 'second'), Cue(1, 0, 1000, 'first')])
+
+    assert [cue.text for cue in transcript] == ['first', 'second']
+    assert transcript.cue_at(500) == 0
+    assert transcript.text == 'first second'
@@ -0,0 +1,187 @@
+import time
+import wave
+
+import numpy as np
+import pytest
+
+import virtual_mic_delay as vmd
+
+
+def _write_wav(path, samples: np.ndarray, sample_rate: int):
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype('<i2').tobytes())
+
+
+def _read_wav(path) -> np.ndarray:
+    with wave.open(str(path), 'rb') as wav:
+        data = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        return data.reshape(-1, wav.getnchannels())
+
+
+def test_fifo_hands_over_samples_across_the_wrap():
+    fifo = vmd.SPSCRingBuffer(8)
+    out = np.empty(5, dtype=np.float32)
+    fifo.write(np.arange(5, dtype=np.float32))
+    fifo.read_into(out)
+
+    # The second block wraps around the end of the ring
+    assert fifo.write(np.arange(5, 10, dtype=np.float32)) == 5
+    assert fifo.read_into(out) == 5
+    np.testing.assert_array_equal(out, np.arange(5, 10))
+
+
+def test_fifo_reports_short_writes_and_reads():
+    fifo = vmd.SPSCRingBuffer(4)
+    out = np.zeros(4, dtype=np.float32)
+
+    # A full ring takes what fits (an overrun); an empty one gives what it has (an underrun)
+    assert fifo.write(np.ones(6, dtype=np.float32)) == 4
+    assert fifo.free() == 0
+    assert fifo.read_into(out[:3]) == 3
+    assert fifo.read_into(out) == 1
+    assert fifo.available() == 0
+
+
+@pytest.mark.parametrize('drift_ppm', [100.0, -100.0])
+def test_drift_compensation_holds_the_delay(drift_ppm):
+    uncompensated = vmd.simulate_clock_drift(drift_ppm, 300.0, compensate=False)
+    compensated = vmd.simulate_clock_drift(drift_ppm, 300.0, compensate=True)
+
+    # 100 ppm over the settled 240 s is about 24 ms of drift left alone
+    assert uncompensated['max_delay_error_ms'] > 20.0
+    assert compensated['max_delay_error_ms'] <= 0.5
+    assert compensated['estimated_ppm'] == pytest.approx(drift_ppm, abs=5.0)
+    assert compensated['underruns'] == compensated['overruns'] == 0
+
+
+def test_offline_delay_is_sample_exact_with_tail(tmp_path):
+    sample_rate = 44100
+    samples = np.random.default_rng(0).integers(-30000, 30000, sample_rate, dtype=np.int32)
+    _write_wav(tmp_path / 'in.wav', samples, sample_rate)
+
+    # A block size that does not divide the delay exercises the ring wrap
+    results = vmd.delay_wav_file(str(tmp_path / 'in.wav'), str(tmp_path / 'out.wav'), 100, block_size=1000)
+
+    delay = vmd.ms_to_delay_samples(100, sample_rate)
+    out = _read_wav(tmp_path / 'out.wav')[:, 0]
+    assert results['input_frames'] == len(samples)
+    assert results['output_frames'] == len(out) == len(samples) + delay
+    assert not out[:delay].any()
+    np.testing.assert_array_equal(out[delay:], samples)
+
+
+def test_offline_trim_keeps_input_length(tmp_path):
+    sample_rate = 8000
+    samples = np.random.default_rng(1).integers(-30000, 30000, (sample_rate, 2), dtype=np.int32)
+    _write_wav(tmp_path / 'in.wav', samples, sample_rate)
+
+    vmd.delay_wav_file(str(tmp_path / 'in.wav'), str(tmp_path / 'out.wav'), 50, block_size=256, trim=True)
+
+    delay = vmd.ms_to_delay_samples(50, sample_rate)
+    out = _read_wav(tmp_path / 'out.wav')
+    assert out.shape == samples.shape
+    np.testing.assert_array_equal(out[delay:], samples[:-delay])
+
+
+def test_offline_delay_matches_the_live_engine(tmp_path):
+    sample_rate = 48000
+    samples = np.zeros(sample_rate // 2, dtype=np.int32)
+    samples[0] = 20000
+    _write_wav(tmp_path / 'in.wav', samples, sample_rate)
+
+    vmd.delay_wav_file(str(tmp_path / 'in.wav'), str(tmp_path / 'out.wav'), 140, block_size=512)
+
+    mic = vmd.VirtualMicrophone(delay_ms=140, sample_rate=sample_rate, chunk_size=512)
+    impulse_at = int(np.flatnonzero(_read_wav(tmp_path / 'out.wav')[:, 0])[0])
+    assert impulse_at == mic._delay_line.delay_samples == 140 * 48 - 1
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoStreams(vmd.AudioBackend):
+        def get_device_count(self):
+            return 0
+
+    with pytest.raises(TypeError, match='open'):
+        NoStreams()
+
+
+@pytest.mark.parametrize('engine', ['blocking', 'callback', 'duplex'])
+def test_fake_backend_runs_without_xruns_at_real_time(fake_backend, engine):
+    # Callback engines get one period of slack; 2048 frames (46 ms) is
+    # longer than a test runner's scheduling stalls
+    mic = vmd.VirtualMicrophone(delay_ms=100, sample_rate=44100, chunk_size=2048,
+                                input_device=0, output_device=1, engine=engine)
+    mic.start()
+    try:
+        # Let the streams settle, so stream start does not count
+        time.sleep(0.5)
+        underruns, overruns = mic.underruns, mic.overruns
+        time.sleep(2.0)
+        assert mic.is_running()
+    finally:
+        mic.stop()
+
+    assert mic.underruns - underruns == 0
+    assert mic.overruns - overruns == 0
+    assert sum(stream.output_frames for stream in fake_backend.streams) > 2 * 44100
+
+
+def test_callback_reattach_waits_for_the_output_callback(fake_backend):
+    mic = vmd.VirtualMicrophone(delay_ms=100, chunk_size=256, input_device=0, output_device=1,
+                                engine='callback')
+    mic._allocate_engine_buffers()
+    mic._prepare_fifo()
+    mic._input_detached = True
+    mic._lost_at = time.perf_counter()
+    stream = fake_backend.open(rate=44100, channels=1, frames_per_buffer=256, input=True,
+                               input_device_index=0, start=False)
+    mic._pending_input = stream
+
+    # No output callback runs, so the hand-over times out and nothing changes hands
+    mic._attach_input(stream)
+    assert mic._input_detached
+    assert mic._pending_input is stream
+    assert not mic.reconnect_times_ms
+
+    mic._output_callback(None, 256, None, 0)
+    mic._attach_input(stream)
+    assert not mic._input_detached
+    assert mic._pending_input is None
+    assert len(mic.reconnect_times_ms) == 1
+    stream.close()
+
+
+def test_read_input_counts_portaudio_overflow_and_keeps_audio():
+    backend = vmd.FakeAudioBackend(device_buffers=2)
+    stream = backend.open(rate=44100, channels=1, frames_per_buffer=256, input=True, input_device_index=0)
+    stream.read(256)
+    # Fall well behind the two-buffer device
+    time.sleep(0.1)
+
+    data, overflowed = vmd.read_input(stream, 256)
+    assert overflowed
+    assert len(data) == 256 * 4
+    assert vmd.read_input(stream, 256)[1] is False
+
+
+def test_blocking_engine_keeps_sending_audio_through_overflows():
+    backend = vmd.FakeAudioBackend(latency=0.05, overflow_every=10, capture_output=True)
+    previous = vmd._backend_factory
+    vmd.set_audio_backend(lambda: backend)
+    try:
+        mic = vmd.VirtualMicrophone(delay_ms=50, sample_rate=44100, chunk_size=1024,
+                                    input_device=0, output_device=1)
+        mic.start()
+        time.sleep(1.0)
+        mic.stop()
+    finally:
+        vmd.set_audio_backend(previous)
+
+    assert mic.overruns >= 3
+    output = np.frombuffer(backend.captured_output(), dtype=np.float32).reshape(-1, 1024)
+    # Past the 50 ms of priming silence, no chunk was replaced with silence
+    assert np.abs(output[3:]).max(axis=1).min() > 0.1
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Template-slot title engine for YouTube titles
+Fills hook templates from transcript topics, then ranks and dedupes the candidates
+"""
+
+import sys
+import time
+import heapq
+import string
+import argparse
+from collections import Counter
+from itertools import permutations, product
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from corpus_index import STOPWORDS
+from keyword_matcher import WORD
+
+DEFAULT_TITLE_COUNT = 30
+STYLE_CAP_SLACK = 2        # each style may take this many titles over an even share
+MAX_TOPICS = 40
+MAX_TOPIC_USES = 8         # titles naming the same topic, while others are left
+MAX_TEMPLATE_USES = 2
+TAGGED_SHARE = 8 / 30      # parenthetical tags: "use sparingly: 6-10 across all 30"
+POOL_PER_TEMPLATE = 40
+NEAR_DUPLICATE = 0.6       # Jaccard overlap of content words
+MAX_TITLE_WORDS = 10
+BENCHMARK_TOPICS = 40
+
+# Hook styles from prompts/YT_TITLES.md; {a} is the lead topic, {b} a second
+# topic and {n} a list number
+HOOK_TEMPLATES: Dict[str, Tuple[str, ...]] = {
+    'why': (
+        "Why {a} Changes Everything",
+        "Why {a} Changes Everything for {b}",
+        "Why Developers Are Choosing {a} Over {b}",
+        "Why {a} Is Perfect for {b}",
+        "Why You Need to Try {a} Today",
+        "Why Everyone Is Talking About {a}",
+        "Why {a} Just Got a Huge Upgrade",
+        "Why {a} Makes {b} Easy",
+    ),
+    'how': (
+        "How to Use {a} with {b}",
+        "How to Build {b} with {a}",
+        "How {a} Actually Works",
+        "How {a} Beats {b}",
+        "How to Get Started with {a} Fast",
+        "How to Run {b} on {a}",
+        "How I Use {a} for {b}",
+        "How {a} Makes {b} Fast",
+    ),
+    'insider': (
+        "The Hidden Truth About {a}",
+        "{a}: The Secret Weapon for {b}",
+        "What Nobody Tells You About {a}",
+        "The Real Reason {a} Matters Now",
+        "Inside {a}: {b} Explained",
+        "{a} Explained in Plain English",
+        "The {a} Detail Everyone Misses",
+        "What {a} Means for {b}",
+    ),
+    'contrast': (
+        "{a} vs {b}: Who Wins?",
+        "Is {a} Worth the Hype?",
+        "The Problem with {a}",
+        "Stop Using {b} Until You See {a}",
+        "No More {b}: {a} Is Here",
+        "Why {a} Might Fail Against {b}",
+        "{a} or {b}? The Honest Answer",
+        "The End of {b}? {a} Explained",
+    ),
+    'number': (
+        "{n} Reasons to Choose {a}",
+        "{n} Things {a} Does Better Than {b}",
+        "{n} Ways {a} Beats {b}",
+        "{n} Minutes to Master {a}",
+        "The 1 {a} Feature That Changes {b}",
+        "{n} {a} Tips You Need to Know",
+        "{n} Mistakes to Avoid with {a}",
+        "Top {n} {a} Tricks for {b}",
+    ),
+}
+LIST_NUMBERS = ('3', '5', '7', '10')
+PARENTHETICAL_TAGS = (
+    "(Deep dive)", "(Full demo)", "(Tiny detail)", "(Side-by-side)",
+    "(Secret sauce)", "(Not hype)", "(Explained)", "(Tutorial)",
+)
+
+# Scoring rules of scripts/youtube_title_optimiser.py, which cannot be
+# imported as it stands, plus topic salience, brevity and working-title bias
+POWER_WORDS = frozenset([
+    "amazing", "secret", "instant", "unbelievable", "proven", "exclusive",
+    "urgent", "shocking", "easy", "free", "guaranteed", "limited", "now",
+    "today", "immediately", "best", "worst", "how", "what", "why"
+])
+QUESTION_STARTS = ('How', 'What', 'Why', 'When', 'Where')
+CLICHES = ('this will', "you won't believe", 'shocking', 'amazing', 'unbelievable')
+POWER_WORD_POINTS = 2.5
+MAX_POWER_POINTS = 25
+NUMBER_POINTS = 15
+QUESTION_POINTS = 15
+FORMAT_POINTS = 10
+NO_CLICHE_POINTS = 10
+STRONG_OPENER_POINTS = 5
+LEAD_SALIENCE_POINTS = 20
+SECOND_SALIENCE_POINTS = 10
+WORKING_TITLE_POINTS = 3
+MAX_WORKING_TITLE_POINTS = 15
+LONG_TITLE_PENALTY = 10
+MAX_SCORED_CHARS = 200
+
+
+def _length_points(chars: int) -> int:
+    if 50 <= chars <= 60:
+        return 20
+    if 40 <= chars < 50 or 60 < chars <= 70:
+        return 15
+    if chars < 40:
+        return 10
+    return 0
+
+
+LENGTH_POINTS = [_length_points(chars) for chars in range(MAX_SCORED_CHARS + 1)]
+
+
+class TitleCandidate(NamedTuple):
+    """A ranked title and the topics filling its slots, lead topic first"""
+    title: str
+    style: str
+    score: float
+    topics: Tuple[str, ...]
+
+
+class _Template(NamedTuple):
+    """A hook template with the parts of its score that do not depend on the slots"""
+    style: str
+    text: str
+    slots: Tuple[str, ...]
+    chars: int
+    words: int
+    power: int
+    points: float           # number, question, format, cliche and opener points
+    leads_with_topic: bool
+    has_number: bool
+    overlap: int
+
+
+class _Slot(NamedTuple):
+    """Score inputs of one slot value"""
+    text: str
+    words_set: frozenset
+    chars: int
+    words: int
+    power: int
+    has_number: bool
+    strong_opener: bool
+    lead_points: float
+    second_points: float
+    overlap: int
+
+
+def display_term(term: str) -> str:
+    """Title-case lowercase words and keep deliberate casing (SDK, Node.js)"""
+    return ' '.join(word[:1].upper() + word[1:] if word.islower() else word for word in term.split())
+
+
+def content_words(text: str) -> frozenset:
+    """Lowercased words of a title that carry meaning"""
+    return frozenset(word for word in WORD.findall(text.lower()) if word not in STOPWORDS)
+
+
+def _compile_template(style: str, text: str, bias: frozenset) -> _Template:
+    slots = tuple(field for _, field, _, _ in string.Formatter().parse(text) if field)
+    fixed = text.format(a='', b='', n='')
+    words = fixed.lower().split()
+    leads_with_topic = text.startswith('{a}') or text.startswith('{b}')
+    has_number = 'n' in slots or any(ch.isdigit() for ch in fixed)
+    points = FORMAT_POINTS
+    if has_number:
+        points += NUMBER_POINTS
+    if '?' in fixed or (not leads_with_topic and text.startswith(QUESTION_STARTS)):
+        points += QUESTION_POINTS
+    if not any(cliche in fixed.lower() for cliche in CLICHES):
+        points += NO_CLICHE_POINTS
+    if not leads_with_topic and not text.startswith('{') and len(words[0]) > 3:
+        points += STRONG_OPENER_POINTS
+    return _Template(
+        style, text, slots, len(fixed), len(words), sum(word in POWER_WORDS for word in words),
+        points, leads_with_topic, has_number, len(content_words(fixed) & bias),
+    )
+
+
+def _topic_slots(topics: Sequence[Tuple[str, float]], bias: frozenset) -> List[_Slot]:
+    top_weight = max((weight for _, weight in topics), default=0) or 1
+    slots = []
+    for term, weight in topics:
+        text = display_term(term)
+        words = text.lower().split()
+        salience = weight / top_weight
+        slots.append(_Slot(
+            text, content_words(text), len(text), len(words), sum(word in POWER_WORDS for word in words),
+            any(ch.isdigit() for ch in text), len(words[0]) > 3,
+            LEAD_SALIENCE_POINTS * salience, SECOND_SALIENCE_POINTS * salience,
+            len(content_words(text) & bias),
+        ))
+    return slots
+
+
+def _number_slots() -> List[_Slot]:
+    return [_Slot(number, frozenset(), len(number), 1, 0, True, False, 0, 0, 0) for number in LIST_NUMBERS]
+
+
+def _iter_scored(template: _Template, topics: List[_Slot],
+                 numbers: List[_Slot]) -> Iterator[Tuple[float, int, int, int]]:
+    """Lazily score every filling of one template as (score, -a, -b, -n).
+
+    Nothing is rendered here: title length, word count and points are sums
+    of the precomputed template and slot parts. Negated positions make ties
+    prefer the more salient topics and smaller numbers. Two topics sharing
+    a word ("components", "server components") never fill the same title.
+    """
+    if 'b' in template.slots:
+        pairs = ((a, b) for a, b in permutations(range(len(topics)), 2)
+                 if not topics[a].words_set & topics[b].words_set)
+    else:
+        pairs = ((a, -1) for a in range(len(topics)))
+    number_range = range(len(numbers)) if 'n' in template.slots else (-1,)
+    opener = STRONG_OPENER_POINTS if template.leads_with_topic else 0
+
+    for (a, b), n in product(pairs, number_range):
+        lead = topics[a]
+        chars = template.chars + lead.chars
+        words = template.words + lead.words
+        power = template.power + lead.power
+        overlap = template.overlap + lead.overlap
+        points = template.points + lead.lead_points
+        if opener and lead.strong_opener:
+            points += opener
+        has_number = template.has_number or lead.has_number
+        if b >= 0:
+            second = topics[b]
+            chars += second.chars
+            words += second.words
+            power += second.power
+            overlap += second.overlap
+            points += second.second_points
+            has_number = has_number or second.has_number
+        if n >= 0:
+            chars += numbers[n].chars
+        if has_number and not template.has_number:
+            points += NUMBER_POINTS
+        points += min(power * POWER_WORD_POINTS, MAX_POWER_POINTS)
+        points += min(overlap * WORKING_TITLE_POINTS, MAX_WORKING_TITLE_POINTS)
+        points += LENGTH_POINTS[min(chars, MAX_SCORED_CHARS)]
+        if words >= MAX_TITLE_WORDS:
+            points -= LONG_TITLE_PENALTY
+        yield points, -a, -b, -n
+
+
+def _render(template: _Template, topics: List[_Slot], numbers: List[_Slot],
+            a: int, b: int, n: int) -> str:
+    return template.text.format(
+        a=topics[a].text,
+        b=topics[b].text if b >= 0 else '',
+        n=numbers[n].text if n >= 0 else '',
+    )
+
+
+def _length_score(title: str) -> int:
+    """Length points less the long-title penalty"""
+    score = LENGTH_POINTS[min(len(title), MAX_SCORED_CHARS)]
+    return score - LONG_TITLE_PENALTY if len(title.split()) >= MAX_TITLE_WORDS else score
+
+
+class _Pick(NamedTuple):
+    score: float
+    style: int
+    title: str
+    template: int
+    topics: Tuple[int, ...]
+
+
+def _select(pool: List[_Pick], limit: int) -> List[_Pick]:
+    """Greedy pick by score that skips near-duplicates and spreads styles, templates and topics.
+
+    The style, template and topic limits are relaxed in a second pass when the pool
+    is too small to fill the list with them.
+    """
+    style_cap = -(-limit // len(HOOK_TEMPLATES)) + STYLE_CAP_SLACK
+    chosen: List[_Pick] = []
+    chosen_words: List[frozenset] = []
+
+    for is_capped in (True, False):
+        style_counts = Counter(pick.style for pick in chosen)
+        template_counts = Counter(pick.template for pick in chosen)
+        topic_counts = Counter(topic for pick in chosen for topic in pick.topics)
+        for pick in pool:
+            if len(chosen) == limit:
+                return chosen
+            if is_capped and (style_counts[pick.style] >= style_cap
+                              or template_counts[pick.template] >= MAX_TEMPLATE_USES
+                              or any(topic_counts[topic] >= MAX_TOPIC_USES for topic in pick.topics)):
+                continue
+            words = content_words(pick.title)
+            if any(len(words & kept) >= NEAR_DUPLICATE * len(words | kept) for kept in chosen_words):
+                continue
+            chosen.append(pick)
+            chosen_words.append(words)
+            style_counts[pick.style] += 1
+            template_counts[pick.template] += 1
+            topic_counts.update(pick.topics)
+    return chosen
+
+
+def _add_tags(chosen: List[_Pick], limit: int) -> List[_Pick]:
+    """Append a different parenthetical tag to the few titles it helps most"""
+    unused = list(PARENTHETICAL_TAGS)
+
+    def fitting(pick: _Pick) -> List[str]:
+        words = content_words(pick.title)
+        return [tag for tag in unused if not content_words(tag) & words]
+
+    def gain(pick: _Pick, tag: str) -> int:
+        return _length_score(f"{pick.title} {tag}") - _length_score(pick.title)
+
+    order = sorted(
+        (i for i, pick in enumerate(chosen) if '(' not in pick.title and fitting(pick)),
+        key=lambda i: (-max(gain(chosen[i], tag) for tag in fitting(chosen[i])), -chosen[i].score, i),
+    )
+    tagged = list(chosen)
+    for i in order[:max(1, round(limit * TAGGED_SHARE))]:
+        pick = chosen[i]
+        tags = fitting(pick)
+        if not tags:
+            continue
+        tag = max(tags, key=lambda tag: gain(pick, tag))
+        if gain(pick, tag) < 0:
+            continue
+        unused.remove(tag)
+        tagged[i] = pick._replace(score=pick.score + gain(pick, tag), title=f"{pick.title} {tag}")
+    return tagged
+
+
+def _prepare(topics: Sequence[Tuple[str, float]],
+             working_title: str) -> Optional[Tuple[List[_Slot], List[_Slot], List[Tuple[int, _Template]]]]:
+    """Topic slots, number slots and numbered templates to fill, or None without topics"""
+    seen = set()
+    unique_topics = []
+    for term, weight in topics:
+        if term.lower() not in seen:
+            seen.add(term.lower())
+            unique_topics.append((term, weight))
+    if not unique_topics:
+        return None
+
+    bias = content_words(working_title)
+    topic_slots = _topic_slots(unique_topics[:MAX_TOPICS], bias)
+    texts = [(style, text) for style, style_texts in HOOK_TEMPLATES.items() for text in style_texts]
+    templates = []
+    for template_no, (style, text) in enumerate(texts):
+        template = _compile_template(style, text, bias)
+        if 'b' in template.slots and len(topic_slots) < 2:
+            continue
+        templates.append((template_no, template))
+    return topic_slots, _number_slots(), templates
+
+
+def rank_titles(topics: Sequence[Tuple[str, float]], working_title: str = "",
+                limit: int = DEFAULT_TITLE_COUNT) -> Tuple[List[TitleCandidate], int]:
+    """Titles for weighted (topic, weight) pairs and the 1-based number of the best.
+
+    Titles are grouped by hook style (why, how, insider, contrast, number)
+    and ordered by score within each style; the best pick is the top score.
+    """
+    prepared = _prepare(topics, working_title)
+    if prepared is None:
+        return [], 0
+    topic_slots, numbers, templates = prepared
+    styles = list(HOOK_TEMPLATES)
+
+    pool = []
+    for template_no, template in templates:
+        for score, *negated in heapq.nlargest(
+                POOL_PER_TEMPLATE, _iter_scored(template, topic_slots, numbers)):
+            a, b, n = (-position for position in negated)
+            title = _render(template, topic_slots, numbers, a, b, n)
+            pool.append(_Pick(score, styles.index(template.style), title, template_no,
+                              (a, b) if b >= 0 else (a,)))
+    pool.sort(key=lambda pick: (-pick.score, pick.style, pick.title))
+
+    chosen = _add_tags(_select(pool, limit), limit)
+    chosen.sort(key=lambda pick: (pick.style, -pick.score))
+    ranked = [TitleCandidate(pick.title, styles[pick.style], pick.score,
+                             tuple(topic_slots[topic].text for topic in pick.topics))
+              for pick in chosen]
+    if not ranked:
+        return [], 0
+    best_pick = max(range(len(ranked)), key=lambda i: (ranked[i].score, -i)) + 1
+    return ranked, best_pick
+
+
+def count_candidates(topics: Sequence[Tuple[str, float]], working_title: str = "") -> int:
+    """How many fillings rank_titles scores for weighted (topic, weight) pairs"""
+    prepared = _prepare(topics, working_title)
+    if prepared is None:
+        return 0
+    topic_slots, numbers, templates = prepared
+    return sum(sum(1 for _ in _iter_scored(template, topic_slots, numbers)) for _, template in templates)
+
+
+def run_benchmark(topic_count: int) -> bool:
+    """Time ranking every candidate for a synthetic topic list"""
+    topics = [(f"topic{i} feature{i}", topic_count - i) for i in range(topic_count)]
+    working_title = "topic3 feature3 deep dive"
+    candidates = count_candidates(topics, working_title)
+    started = time.perf_counter()
+    ranked, best_pick = rank_titles(topics, working_title)
+    elapsed = time.perf_counter() - started
+    print(f"{topic_count} topics: {candidates} candidates ranked in {elapsed * 1000:.1f} ms "
+          f"({candidates / elapsed / 1e3:.0f}k/s), {len(ranked)} kept")
+    if ranked:
+        print(f"  Best pick #{best_pick}: {ranked[best_pick - 1].title}")
+    return len(ranked) == DEFAULT_TITLE_COUNT and elapsed < 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank template titles for a list of topics')
+    parser.add_argument('topics', nargs='*', help='Topics, most important first')
+    parser.add_argument('--working-title', default='', help='Bias titles toward these words')
+    parser.add_argument('--limit', type=int, default=DEFAULT_TITLE_COUNT, help='Number of titles')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=BENCHMARK_TOPICS, metavar='TOPICS',
+                        help=f'Benchmark with synthetic topics (default: {BENCHMARK_TOPICS})')
+
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        sys.exit(0 if run_benchmark(args.benchmark) else 1)
+    if not args.topics:
+        parser.error("at least one topic is required unless --benchmark is given")
+
+    weighted = [(topic, len(args.topics) - i) for i, topic in enumerate(args.topics)]
+    ranked, best_pick = rank_titles(weighted, args.working_title, args.limit)
+    for i, candidate in enumerate(ranked, 1):
+        print(f"#{i:<3} {candidate.score:5.1f}  {candidate.style:<8}  {candidate.title}")
+    if ranked:
+        print(f"\nBest Pick: #{best_pick}")
+
+
+if __name__ == "__main__":
+    main()
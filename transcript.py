@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Columnar transcript store for large SRT files
+Keeps cue times in int arrays and cue text as spans of one joined buffer
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from caption_readers import get_reader
+from srt_parser import Cue, chapter_title, format_chapter_time, read_cues, write_synthetic_srt
+
+BENCHMARK_HOURS = 10
+BENCHMARK_CUE_SECONDS = 2
+BENCHMARK_LOOKUPS = 10000
+
+
+class Transcript:
+    """Cues stored column by column.
+
+    start_ms, end_ms and index are array('q') columns, so they can be
+    wrapped without copying (e.g. numpy.frombuffer) when NumPy is around.
+    text is one buffer with cues joined by single spaces; cue i covers
+    text[text_start[i]:text_end[i]], and empty cues have an empty span.
+    Cues are sorted by start before the columns are filled, so time lookups
+    can bisect. Untimed transcripts (plain text) keep their cues but have no
+    chapters.
+    """
+
+    def __init__(self, cues: Iterable[Cue] = (), is_timed: bool = True):
+        self.is_timed = is_timed
+        self.index = array('q')
+        self.start_ms = array('q')
+        self.end_ms = array('q')
+        self.text_start = array('q')
+        self.text_end = array('q')
+        self._folded = None
+        self._folded_offsets = None
+        # Stable, and linear for the usual already-ordered file
+        self.text = self._append_columns(sorted(cues, key=lambda cue: cue.start_ms))
+
+    def _append_columns(self, cues: Iterable[Cue]) -> str:
+        """Fill the columns from a cue stream and return the joined text buffer"""
+        parts = []
+        position = 0
+        for cue in cues:
+            if cue.text:
+                if parts:
+                    position += 1  # the joining space
+                parts.append(cue.text)
+            self.index.append(cue.index)
+            self.start_ms.append(cue.start_ms)
+            self.end_ms.append(cue.end_ms)
+            self.text_start.append(position)
+            position += len(cue.text)
+            self.text_end.append(position)
+        return ' '.join(parts)
+
+    @classmethod
+    def from_srt(cls, transcript_path: str) -> 'Transcript':
+        """Build a transcript from an SRT file in one streaming pass"""
+        return cls(read_cues(transcript_path))
+
+    @classmethod
+    def from_file(cls, transcript_path: str, format_name: Optional[str] = None) -> 'Transcript':
+        """Build a transcript from any supported caption format, sniffing it if not named"""
+        reader = get_reader(transcript_path, format_name)
+        return cls(reader.read(transcript_path), reader.is_timed)
+
+    def __len__(self) -> int:
+        return len(self.start_ms)
+
+    def __iter__(self) -> Iterator[Cue]:
+        for i in range(len(self)):
+            yield self.cue(i)
+
+    def cue(self, i: int) -> Cue:
+        """Materialize cue i as a record"""
+        return Cue(self.index[i], self.start_ms[i], self.end_ms[i], self.cue_text(i))
+
+    def cue_text(self, i: int) -> str:
+        """Text of cue i, sliced from the shared buffer"""
+        return self.text[self.text_start[i]:self.text_end[i]]
+
+    def between(self, start_ms: int, end_ms: int) -> range:
+        """Positions of cues starting in [start_ms, end_ms), found by bisection"""
+        return range(bisect_left(self.start_ms, start_ms), bisect_left(self.start_ms, end_ms))
+
+    def cue_at(self, ms: int) -> Optional[int]:
+        """Position of the latest-starting cue that is on screen at ms"""
+        i = bisect_right(self.start_ms, ms) - 1
+        if i >= 0 and ms < self.end_ms[i]:
+            return i
+        return None
+
+    def text_between(self, start_ms: int, end_ms: int) -> str:
+        """Transcript text of the cues starting in [start_ms, end_ms) as one slice"""
+        cues = self.between(start_ms, end_ms)
+        if not cues:
+            return ''
+        return self.text[self.text_start[cues.start]:self.text_end[cues.stop - 1]].strip()
+
+    def chapters(self, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Chapter markers (time, title) for non-empty cues, stopping at limit"""
+        chapters = []
+        if not self.is_timed:
+            return chapters
+        for i in range(len(self)):
+            if limit is not None and len(chapters) >= limit:
+                break
+            if self.text_end[i] > self.text_start[i]:
+                chapters.append((format_chapter_time(self.start_ms[i]), chapter_title(self.cue_text(i))))
+        return chapters
+
+    def _folded_text(self) -> str:
+        """Lowercased buffer for case-insensitive search, built on first use"""
+        if self._folded is None:
+            folded = self.text.lower()
+            if len(folded) != len(self.text):
+                # Some characters (e.g. 'İ') grow when lowercased; fold char by
+                # char and map each folded offset back to the original buffer
+                parts = []
+                self._folded_offsets = array('q')
+                for position, char in enumerate(self.text):
+                    lowered = char.lower()
+                    parts.append(lowered)
+                    self._folded_offsets.extend([position] * len(lowered))
+                folded = ''.join(parts)
+            self._folded = folded
+        return self._folded
+
+    def find(self, keyword: str) -> List[Tuple[int, int]]:
+        """Case-insensitive occurrences of keyword as (cue position, buffer offset)"""
+        haystack = self._folded_text()
+        needle = keyword.lower()
+        hits = []
+        offset = haystack.find(needle)
+        while needle and offset != -1:
+            original = offset if self._folded_offsets is None else self._folded_offsets[offset]
+            hits.append((bisect_right(self.text_start, original) - 1, original))
+            offset = haystack.find(needle, offset + 1)
+        return hits
+
+    def contains(self, keyword: str) -> bool:
+        """Whether keyword appears anywhere in the transcript, ignoring case"""
+        return keyword.lower() in self._folded_text() if keyword else True
+
+
+def _measure(build) -> Tuple[float, int, object]:
+    """Time a build, then repeat it under tracemalloc for its retained size"""
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    del result
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, retained, result
+
+
+def _time_lookups(lookup, span_ms: int, count: int) -> float:
+    """Average microseconds per lookup over evenly spread times"""
+    step = max(1, span_ms // count)
+    started = time.perf_counter()
+    for ms in range(0, step * count, step):
+        lookup(ms)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def run_benchmark(hours: float) -> bool:
+    """Compare a list of cue tuples with the columnar store"""
+    with tempfile.NamedTemporaryFile(suffix='.srt', delete=False) as f:
+        transcript_path = f.name
+    try:
+        cue_count = write_synthetic_srt(transcript_path, hours, BENCHMARK_CUE_SECONDS)
+        print(f"Synthetic transcript: {hours:g} h, {cue_count} cues")
+        list_time, list_size, cues = _measure(lambda: list(read_cues(transcript_path)))
+        store_time, store_size, transcript = _measure(lambda: Transcript.from_srt(transcript_path))
+    finally:
+        os.remove(transcript_path)
+
+    span_ms = transcript.end_ms[-1]
+    scan_us = _time_lookups(lambda ms: [c for c in cues if c.start_ms <= ms < c.end_ms], span_ms, 200)
+    bisect_us = _time_lookups(transcript.cue_at, span_ms, BENCHMARK_LOOKUPS)
+    matches = list(transcript) == cues
+
+    print(f"  Cue tuples:  build {list_time * 1000:7.1f} ms, {list_size / 1e6:6.1f} MB, "
+          f"lookup {scan_us:9.1f} us (linear scan)")
+    print(f"  Columnar:    build {store_time * 1000:7.1f} ms, {store_size / 1e6:6.1f} MB, "
+          f"lookup {bisect_us:9.1f} us (bisect)")
+    print(f"  Round trip {'identical' if matches else 'DIFFERS'}")
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect a transcript through the columnar cue store')
+    parser.add_argument('transcript_path', nargs='?', help='Path to .srt, .vtt, .txt or Whisper .json transcript')
+    parser.add_argument('--find', metavar='KEYWORD', help='List cues mentioning a keyword')
+    parser.add_argument('--benchmark', type=float, nargs='?', const=BENCHMARK_HOURS, metavar='HOURS',
+                        help=f'Benchmark on a synthetic transcript (default: {BENCHMARK_HOURS} hours)')
+
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        sys.exit(0 if run_benchmark(args.benchmark) else 1)
+    if not args.transcript_path:
+        parser.error("transcript_path is required unless --benchmark is given")
+
+    try:
+        transcript = Transcript.from_file(args.transcript_path)
+    except FileNotFoundError:
+        print(f"Error: File {args.transcript_path} not found")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+    if args.find:
+        for position, _ in transcript.find(args.find):
+            print(f"{format_chapter_time(transcript.start_ms[position])} {transcript.cue_text(position)}")
+    else:
+        for time_label, title in transcript.chapters():
+            print(f"{time_label} {title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,171 +1,119 @@
 #!/usr/bin/env python3
 """
-YouTube Title Generator for Cloudflare Sandbox SDK transcript
-Processes SRT files and generates compelling YouTube titles
+YouTube Title Generator for video transcripts
+Finds a transcript's topics and ranks compelling YouTube titles built from them
 """
 
-import re
 import sys
 import argparse
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+
+from caption_readers import read_captions
+from corpus_index import distinctive_terms, term_counts
+from keyword_matcher import DEFAULT_VOCABULARY, KeywordMatcher, load_vocabulary
+from title_engine import display_term, rank_titles
+
+CORPUS_TOPICS = 10
+CORPUS_TOPIC_WEIGHT = 0.5   # below any vocabulary hit mentioned at least half as often as the top one
+FALLBACK_TOPICS = 8
 
 
 def parse_srt(transcript_path: str) -> str:
-    """Parse SRT file and extract clean transcript text"""
+    """Parse an SRT, VTT, TXT or Whisper JSON transcript into clean text"""
     try:
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        return ' '.join(cue.text for cue in read_captions(transcript_path) if cue.text)
     except FileNotFoundError:
         print(f"Error: File {transcript_path} not found")
         sys.exit(1)
     except Exception as e:
         print(f"Error reading file: {e}")
         sys.exit(1)
-    
-    # Remove indices, timestamps, and arrows
-    lines = content.split('\n')
-    clean_lines = []
-    
-    for line in lines:
-        # Skip empty lines
-        if not line.strip():
-            continue
-            
-        # Skip index lines (numbers only)
-        if line.strip().isdigit():
-            continue
-            
-        # Skip timestamp lines (format: 00:00:00,000 --> 00:00:06,300)
-        if re.match(r'\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}', line.strip()):
-            continue
-            
-        # Clean up the line and add to transcript
-        clean_line = line.strip()
-        if clean_line:
-            clean_lines.append(clean_line)
-    
-    return ' '.join(clean_lines)
-
-
-def extract_keywords(transcript: str) -> List[str]:
-    """Extract key topics and technologies from transcript"""
-    # Common tech terms and specific terms from this transcript
-    tech_keywords = [
-        'Cloudflare', 'Sandbox SDK', 'AI agent', 'workers', 'durable objects',
-        'containers', 'Docker', 'Node.js', 'Python', 'Bun', 'Ubuntu', 'TypeScript',
-        'Anthropic', 'Haiku', 'Daytona', 'Vercel', 'edge network', 'RPC',
-        'code execution', 'isolated environment', 'Git repos', 'processes'
-    ]
-    
-    found_keywords = []
-    transcript_lower = transcript.lower()
-    
-    for keyword in tech_keywords:
-        if keyword.lower() in transcript_lower:
-            found_keywords.append(keyword)
-    
-    return found_keywords
 
 
-def generate_titles(transcript: str, working_title: str = "") -> Tuple[List[str], int]:
-    """Generate 30 compelling YouTube titles based on transcript"""
-    keywords = extract_keywords(transcript)
-    
-    # Title templates and angles
-    title_templates = [
-        # Why-led curiosity
-        "Why Cloudflare's Sandbox SDK Changes Everything for AI Code",
-        "Why Developers Are Choosing Cloudflare Over Daytona",
-        "Why the New Cloudflare Sandbox Is Perfect for AI Agents",
-        "Why You Need to Try Cloudflare's Sandbox SDK Today",
-        "Why Cloudflare Workers Just Got a Huge Upgrade",
-        
-        # How-led curiosity
-        "How to Run AI-Generated Code Safely with Cloudflare",
-        "How to Execute Python in Cloudflare's New Sandbox",
-        "How to Build AI Agents with Cloudflare Sandbox SDK",
-        "How Cloudflare's Sandbox Beats Vercel and Daytona",
-        "How to Deploy Code Execution at the Edge",
-        
-        # Authority/Insider
-        "The Hidden Truth About Cloudflare's Sandbox SDK",
-        "Cloudflare's Secret Weapon for AI Code Execution",
-        "What Cloudflare Doesn't Tell You About Their Sandbox",
-        "The Real Reason Cloudflare Released This Now",
-        "Inside Cloudflare's Sandbox Architecture",
-        
-        # Counterintuitive/Contrast
-        "Cloudflare's Sandbox Is Too Late (Or Is It?)",
-        "Why Cloudflare's Sandbox Might Fail Against Daytona",
-        "The Problem with Cloudflare's New Sandbox SDK",
-        "Cloudflare Sandbox vs The Competition: Who Wins?",
-        "Is Cloudflare's Sandbox Worth the Hype?",
-        
-        # Timeliness/Trends
-        "Cloudflare Just Changed the Game for AI Development",
-        "The Future of Code Execution Is Here (Cloudflare)",
-        "2024's Most Important Developer Tool: Cloudflare Sandbox",
-        "Why Everyone's Talking About Cloudflare's New SDK",
-        "The Sandbox War: Cloudflare vs Everyone Else",
-        
-        # Numbers/Specifics
-        "7 Reasons to Choose Cloudflare's Sandbox SDK",
-        "5 Things Cloudflare's Sandbox Does Better",
-        "3 Ways Cloudflare Beats Daytona at Sandboxing",
-        "10 Minutes to Master Cloudflare's Sandbox SDK",
-        "The 1 Feature That Makes Cloudflare Sandbox Special",
-        
-        # Direct/Technical
-        "Cloudflare Sandbox SDK: Complete Guide",
-        "Running AI Code with Cloudflare Workers",
-        "Cloudflare's Answer to Safe Code Execution",
-        "The Ultimate Cloudflare Sandbox Tutorial",
-        "Cloudflare Sandbox: Everything You Need to Know"
-    ]
-    
-    # Add parenthetical tags to some titles
-    parenthetical_tags = [
-        "(AI safe)", "(Edge computing)", "(Not Daytona)", "(Workers upgrade)", 
-        "(Code execution)", "(Isolated)", "(New SDK)", "(vs Vercel)", 
-        "(Tutorial)", "(Deep dive)"
-    ]
-    
-    titles = []
-    for i, template in enumerate(title_templates[:30]):
-        if i % 3 == 0 and i < len(parenthetical_tags):  # Add parenthetical to ~1/3 of titles
-            title = f"{template} {parenthetical_tags[i % len(parenthetical_tags)]}"
-        else:
-            title = template
-        
-        # Ensure title is under 10 words when possible
-        words = title.split()
-        if len(words) > 10:
-            # Shorten by removing less critical words
-            title = ' '.join(words[:10])
-        
-        titles.append(title)
-    
-    # Select best title (typically one with strong hook and specificity)
-    best_pick = 2  # "Why Developers Are Choosing Cloudflare Over Daytona"
-    
-    return titles, best_pick
+def extract_keywords(transcript: str, vocab: str = DEFAULT_VOCABULARY) -> List[str]:
+    """Extract key topics and technologies from transcript using a vocabulary file"""
+    matcher = load_vocabulary(vocab)
+    counts = matcher.counts(transcript)
+    return [keyword for keyword in matcher.keywords if keyword in counts]
+
+
+class TranscriptTopics(NamedTuple):
+    """Topics of one transcript, found once and shared by titles and descriptions"""
+    keywords: List[str]                   # vocabulary hits, most mentioned first
+    distinctive: List[str]                # corpus terms, most distinctive first
+    weighted: List[Tuple[str, float]]     # title engine input
+
+
+def find_topics(transcript: str, matcher: KeywordMatcher,
+                corpus: Optional[str] = None) -> TranscriptTopics:
+    """Weighted topics for the title engine, most mentioned first.
+
+    Vocabulary hits are weighted by mention count. Distinctive corpus terms
+    follow at lower weight. Without either, the most frequent words stand in.
+    """
+    counts = matcher.counts(transcript)
+    keywords = sorted((keyword for keyword in matcher.keywords if keyword in counts),
+                      key=lambda keyword: -counts[keyword])
+    weighted = [(keyword, counts[keyword] / counts[keywords[0]]) for keyword in keywords]
+
+    distinctive = distinctive_terms(transcript, corpus, limit=CORPUS_TOPICS) if corpus else []
+    weighted += [(term, CORPUS_TOPIC_WEIGHT * (len(distinctive) - i) / len(distinctive))
+                 for i, term in enumerate(distinctive)]
+    if not weighted:
+        frequent = [(term, count) for term, count in term_counts(transcript)[0].most_common()
+                    if ' ' not in term][:FALLBACK_TOPICS]
+        weighted = [(term, count / frequent[0][1]) for term, count in frequent]
+    return TranscriptTopics(keywords, distinctive, weighted)
+
+
+def generate_titles(transcript: str, working_title: str = "", vocab: str = DEFAULT_VOCABULARY,
+                    corpus: Optional[str] = None) -> Tuple[List[str], int]:
+    """Generate 30 compelling YouTube titles from the transcript's topics.
+
+    Returns the titles grouped by hook style and the 1-based number of the
+    highest-scoring one. The working title, if given, biases the ranking.
+    """
+    topics = find_topics(transcript, load_vocabulary(vocab), corpus)
+    ranked, best_pick = rank_titles(topics.weighted, working_title or "")
+    return [candidate.title for candidate in ranked], best_pick
 
 
 def main():
     parser = argparse.ArgumentParser(description='Generate YouTube titles from transcript')
-    parser.add_argument('transcript_path', help='Path to SRT transcript file')
+    parser.add_argument('transcript_path', help='Path to .srt, .vtt, .txt or Whisper .json transcript')
     parser.add_argument('--working-title', help='Optional working title to influence style')
+    parser.add_argument('--vocab', default=DEFAULT_VOCABULARY,
+                        help=f'Keyword vocabulary name under vocab/ or file path (default: {DEFAULT_VOCABULARY})')
+    parser.add_argument('--corpus', help='Corpus of past transcripts (see corpus_index.py) for distinctive topics')
     
     args = parser.parse_args()
     
     # Parse transcript
     transcript = parse_srt(args.transcript_path)
     
-    # Generate titles
-    titles, best_pick = generate_titles(transcript, args.working_title)
+    # Find topics once; titles, topics and keywords below all share them
+    try:
+        matcher = load_vocabulary(args.vocab)
+    except FileNotFoundError:
+        print(f"Error: Vocabulary {args.vocab} not found")
+        sys.exit(1)
+    try:
+        topics = find_topics(transcript, matcher, args.corpus)
+    except FileNotFoundError:
+        print(f"Error: Corpus {args.corpus} not found")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    ranked, best_pick = rank_titles(topics.weighted, args.working_title or "")
+    titles = [candidate.title for candidate in ranked]
+    if not titles:
+        print("Error: No topics found in transcript")
+        sys.exit(1)
     
     # Output formatting
-    print("Clickbait/Curiosity-First (#1–#30)\n")
+    print(f"Clickbait/Curiosity-First (#1–#{len(titles)})\n")
     
     for i, title in enumerate(titles, 1):
         print(f"- #{i} {title}")
@@ -173,13 +121,20 @@ def main():
     print("\nBest Pick:")
     print(f"- #{best_pick} {titles[best_pick-1]}")
     
+    if args.corpus:
+        print("\nDistinctive Topics:")
+        for term in topics.distinctive:
+            print(f"- {term}")
+    
     print("\nWhy These Work:")
     print("- Strong curiosity hooks with 'Why' and 'How' starts")
-    print("- Specific technical keywords (Cloudflare, Sandbox, AI, Workers)")
+    if topics.keywords:
+        print(f"- Specific technical keywords ({', '.join(map(display_term, topics.keywords[:4]))})")
     print("- Competitive angle creates urgency and interest")
     
     print("\nNext Step:")
-    print("- Reply with a title number (e.g., #3) to get a keyword-optimized YouTube description.")
+    print("- Run description_generator.py with a title number (e.g., 3) and the same transcript and options"
+          " to get a keyword-optimized YouTube description for that title.")
 
 
 if __name__ == "__main__":